@@ -0,0 +1,94 @@
+"""Offline aerodrome database with prefix search.
+
+aerodromes.csv (or MB_AERODROMES_PATH) has the columns icao, name, elev_ft
+and optionally runways, as "designator:tora_m:lda_m" entries separated by
+";". An OurAirports airports.csv export (ident, name, elevation_ft) can be
+dropped in as is. Elevations are a convenience for filling the form and
+must still be checked against the current AIP.
+
+The file is parsed once per process into sorted key lists. Searching is a
+bisect on those lists, so it does not depend on the size of the file.
+"""
+import csv
+import os
+import threading
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "aerodromes.csv"
+
+def _fold(text):
+    """Lower-case, accent-free form used for name matching."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower().strip()
+
+def _runways(value):
+    runways = []
+    for entry in (value or "").split(";"):
+        if not entry.strip():
+            continue
+        designator, tora, lda = (entry.split(":") + ["", ""])[:3]
+        runways.append({
+            "designator": designator.strip(),
+            "tora_m": float(tora) if tora.strip() else None,
+            "lda_m": float(lda) if lda.strip() else None,
+        })
+    return runways
+
+class AerodromeDB:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = Path(path)
+        self.records = {}
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                icao = (row.get("icao") or row.get("ident") or "").strip().upper()
+                elev = (row.get("elev_ft") or row.get("elevation_ft") or "").strip()
+                if not icao or not elev:
+                    continue
+                self.records[icao] = {
+                    "icao": icao,
+                    "name": (row.get("name") or "").strip(),
+                    "elev_ft": float(elev),
+                    "runways": _runways(row.get("runways")),
+                }
+        # Sorted (key, icao) pairs: the code itself plus every word of the name and the whole name
+        keys = set()
+        for icao, rec in self.records.items():
+            keys.add((icao.lower(), icao))
+            name = _fold(rec["name"])
+            if name:
+                keys.add((name, icao))
+                keys.update((word, icao) for word in name.replace("-", " ").split() if len(word) > 2)
+        pairs = sorted(keys)
+        self._keys = [k for k, _ in pairs]
+        self._codes = [c for _, c in pairs]
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, icao):
+        return self.records.get((icao or "").strip().upper())
+
+    def search(self, prefix, limit=8):
+        """Records whose ICAO code or a word of the name starts with prefix, ICAO matches first."""
+        prefix = _fold(prefix or "")
+        if not prefix:
+            return []
+        found = []
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            found.append(self._codes[i])
+            i += 1
+        codes = sorted(dict.fromkeys(found), key=lambda c: (not c.lower().startswith(prefix), c))
+        return [self.records[c] for c in codes[:limit]]
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_aerodromes():
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = AerodromeDB(os.environ.get("MB_AERODROMES_PATH") or DEFAULT_PATH)
+    return _default
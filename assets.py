@@ -0,0 +1,112 @@
+"""Process-wide cache for static files (aircraft icons, AFM PDFs).
+
+Files are read, base64-encoded and fingerprinted once and shared by every
+session. Each entry is re-validated against the file mtime at most every
+check_interval seconds, so a rerun normally does no disk I/O at all. The
+cache is bounded by max_bytes (least recently used entries are dropped), so
+adding aircraft types does not grow memory without limit.
+"""
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class Asset:
+    __slots__ = ("path", "data", "mtime", "sha256", "checked_at", "_b64")
+
+    def __init__(self, path, data, mtime):
+        self.path = path
+        self.data = data
+        self.mtime = mtime
+        self.sha256 = hashlib.sha256(data).hexdigest() if data is not None else None
+        self.checked_at = time.monotonic()
+        self._b64 = None
+
+    @property
+    def exists(self):
+        return self.data is not None
+
+    @property
+    def b64(self):
+        if self._b64 is None and self.data is not None:
+            self._b64 = base64.b64encode(self.data).decode()
+        return self._b64
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else 0
+
+class AssetRegistry:
+    def __init__(self, max_bytes=64 * 1024 * 1024, check_interval=5.0):
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _load(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return Asset(path, None, None)
+        with open(path, "rb") as f:
+            return Asset(path, f.read(), mtime)
+
+    def _store(self, path, asset):
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self._size -= old.size
+        self._entries[path] = asset
+        self._size += asset.size
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def get(self, path):
+        """Return the Asset for path (asset.exists is False for missing files)."""
+        path = os.fspath(path)
+        now = time.monotonic()
+        with self._lock:
+            asset = self._entries.get(path)
+            if asset is not None:
+                self._entries.move_to_end(path)
+                if now - asset.checked_at < self.check_interval:
+                    self.hits += 1
+                    return asset
+        if asset is not None:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == asset.mtime:
+                asset.checked_at = now
+                with self._lock:
+                    self.hits += 1
+                return asset
+            with self._lock:
+                self.reloads += 1
+        asset = self._load(path)
+        with self._lock:
+            self.misses += 1
+            self._store(path, asset)
+        return asset
+
+    def preload(self, paths):
+        for path in paths:
+            if path:
+                self.get(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
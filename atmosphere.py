@@ -0,0 +1,29 @@
+"""Pressure and density altitude for arrays of aerodromes and conditions.
+
+Same rules of thumb the page has always used: 27 ft per hPa from standard
+pressure, ISA lapse of 2 °C per 1000 ft and 120 ft of density altitude per
+°C above ISA. Every function takes scalars or NumPy arrays (broadcast
+against each other) and returns arrays.
+"""
+import numpy as np
+
+STANDARD_QNH = 1013.25
+FT_PER_HPA = 27
+ISA_SEA_LEVEL_TEMP = 15
+ISA_LAPSE_PER_1000FT = 2
+DA_FT_PER_DEG = 120
+
+def pressure_altitude(elev_ft, qnh):
+    return np.asarray(elev_ft, dtype=float) + (STANDARD_QNH - np.asarray(qnh, dtype=float)) * FT_PER_HPA
+
+def isa_temperature(pa_ft):
+    return ISA_SEA_LEVEL_TEMP - ISA_LAPSE_PER_1000FT * (np.asarray(pa_ft, dtype=float) / 1000)
+
+def density_altitude(pa_ft, temp):
+    pa_ft = np.asarray(pa_ft, dtype=float)
+    return pa_ft + DA_FT_PER_DEG * (np.asarray(temp, dtype=float) - isa_temperature(pa_ft))
+
+def conditions(elev_ft, qnh, temp):
+    """(pa_ft, da_ft) arrays for any number of aerodromes at once."""
+    pa_ft = pressure_altitude(elev_ft, qnh)
+    return pa_ft, density_altitude(pa_ft, temp)
@@ -0,0 +1,111 @@
+import numpy as np
+
+from envelope import get_envelope
+from limits import limit_rules
+from stations import station_table
+
+# fuel_limit_by codes
+FUEL_LIMIT_LABELS = ("Maximum Weight", "Tank Capacity", "Manual Entry", "CG Envelope")
+LIMIT_WEIGHT, LIMIT_TANK, LIMIT_MANUAL, LIMIT_CG = 0, 1, 2, 3
+
+def alert_messages(mask, ac):
+    """Messages for one row's alert bitmask (bit n = limit rule n), as compute_mass_balance()."""
+    return limit_rules(ac).messages(mask=mask)
+
+def evaluate_batch(ac, ew, ew_moment, payload, fuel_vol=None, category=None):
+    """Evaluate many loadings in one pass.
+
+    payload maps station input keys (see stations.py) to arrays; all inputs
+    broadcast against each other. fuel_vol=None (or NaN rows) selects
+    automatic maximum fuel, anything else is a manual volume. category picks
+    the CG envelope for the whole batch. Returns a dict of column arrays;
+    severity has one ok/warn/bad code (limits.OK/WARN/BAD) per limit rule.
+    """
+    table = station_table(ac)
+    shape = np.broadcast_shapes(np.shape(ew), np.shape(ew_moment), np.shape(fuel_vol) if fuel_vol is not None else (),
+                                *(np.shape(v) for v in payload.values()))
+    ew = np.broadcast_to(np.asarray(ew, dtype=float), shape).ravel()
+    ew_moment = np.broadcast_to(np.asarray(ew_moment, dtype=float), shape).ravel()
+    n = ew.size
+    inputs = table.input_matrix({k: np.broadcast_to(np.asarray(v, dtype=float), shape).ravel() for k, v in payload.items()}, n)
+    if fuel_vol is None:
+        fuel_vol = np.full(shape, np.nan)
+    fuel_vol = np.broadcast_to(np.asarray(fuel_vol, dtype=float), shape).ravel()
+
+    # (n, n_stations) weights; moments are one matrix-vector product
+    station_weights = table.station_weights(inputs)
+    payload_weight = station_weights.sum(axis=1)
+
+    fuel_density = ac['fuel_density']
+    max_vol = table.max_fuel_volume
+    useful_load = ac['max_takeoff_weight'] - (ew + payload_weight)
+    tank_capacity_weight = max_vol * fuel_density
+    fuel_weight_limit = np.maximum(0.0, useful_load)
+    auto = np.isnan(fuel_vol)
+
+    # Automatic maximum fuel
+    auto_by_tank = fuel_weight_limit > tank_capacity_weight
+    auto_weight = np.where(auto_by_tank, tank_capacity_weight, fuel_weight_limit)
+    # ...then the most fuel that also keeps the CG inside the envelope
+    env = get_envelope(ac, category)
+    auto_by_cg = np.zeros(n, dtype=bool)
+    if env is not None and auto.any():
+        best, limited = env.max_fuel(
+            ew[auto] + payload_weight[auto], ew_moment[auto] + station_weights[auto] @ table.arms,
+            table.fuel_arm, auto_weight[auto])
+        auto_weight[auto] = best
+        auto_by_cg[auto] = limited
+
+    # Manual volume, clamped to tank then to weight
+    manual_vol = np.minimum(np.where(auto, 0.0, fuel_vol), max_vol)
+    manual_weight = np.minimum(manual_vol * fuel_density, fuel_weight_limit)
+    manual_clamped = (np.where(auto, 0.0, fuel_vol) > max_vol) | (manual_vol * fuel_density > fuel_weight_limit)
+    manual_vol = manual_weight / fuel_density
+    manual_by_tank = manual_vol >= max_vol
+    manual_by_weight = (manual_weight > useful_load) & (useful_load < tank_capacity_weight)
+
+    fuel_weight = np.where(auto, auto_weight, manual_weight)
+    fuel_vol_out = np.where(auto, np.where(auto_by_tank & ~auto_by_cg, max_vol, auto_weight / fuel_density), manual_vol)
+    fuel_limit_by = np.where(
+        auto,
+        np.where(auto_by_cg, LIMIT_CG, np.where(auto_by_tank, LIMIT_TANK, LIMIT_WEIGHT)),
+        np.where(manual_by_tank, LIMIT_TANK, np.where(manual_by_weight, LIMIT_WEIGHT, LIMIT_MANUAL)),
+    ).astype(np.int8)
+
+    m_fuel = fuel_weight * table.fuel_arm
+    total_weight = ew + payload_weight + fuel_weight
+    total_moment = ew_moment + station_weights @ table.arms + m_fuel
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cg = np.where(total_weight > 0, total_moment / total_weight, 0.0)
+
+    # One pass over every limit rule; alerts and colours both come from the severities
+    rules = limit_rules(ac)
+    cg_margin = env.margin(cg, total_weight) if env is not None else np.full(n, np.inf)
+    severity = rules.evaluate({
+        "total_weight": total_weight, "cg": cg, "cg_margin": cg_margin if env is not None else None,
+        "fuel_vol": fuel_vol_out, "fuel_weight": fuel_weight,
+        "station_weights": station_weights, "inputs": inputs,
+    }, category)
+    station_color = np.stack(
+        [rules.codes(severity, f"station:{name}") for name in table.names], axis=-1,
+    ) if table.names else np.zeros((n, 0), dtype=np.int8)
+
+    return {
+        "fuel_vol": fuel_vol_out,
+        "fuel_weight": fuel_weight,
+        "fuel_limit_by": fuel_limit_by,
+        "manual_fuel_clamped": manual_clamped & ~auto,
+        "station_weights": station_weights,
+        "station_moments": station_weights * table.arms,
+        "m_empty": ew_moment,
+        "m_fuel": m_fuel,
+        "total_weight": total_weight,
+        "total_moment": total_moment,
+        "cg": cg,
+        "cg_margin": cg_margin,
+        "alerts": rules.alert_mask(severity),
+        "severity": severity,
+        "total_weight_color": rules.codes(severity, "total_weight"),
+        "station_color": station_color,
+        "cg_color": rules.codes(severity, "cg"),
+    }
@@ -0,0 +1,266 @@
+"""Daily dispatch: pair the day's crews with the available aircraft.
+
+    python dispatch.py crews.csv aircraft.csv -o assignments.csv --objective fuel
+
+crews.csv (or Parquet) has one row per crew: crew (an id), slot (crews in
+the same slot fly at the same time; blank = one slot for the day), one
+column per station input key (student, instructor, bag1 for the P2008) and
+optionally required_endurance (h). aircraft.csv lists the aircraft flying
+that day: registration, aircraft (type), ew, ew_moment and burn_rate (L/h);
+blank type and empty weight/moment are taken from the fleet registry, a
+blank burn rate from --burn-rate.
+
+Every crew/aircraft pair is evaluated in one evaluate_batch() call per type,
+with automatic maximum fuel. A pair is feasible without alerts (MTOW,
+station limits, CG envelope) and, for a crew with a required endurance, with
+enough fuel above the reserve to fly it. Per slot, crews and aircraft with no
+feasible pair are set aside and the rest are assigned with the Hungarian
+algorithm, one aircraft per crew, to maximise the total usable fuel
+(--objective fuel) or the total endurance margin (--objective endurance).
+--pack dispatch.pdf also writes the day's dispatch pack: one report per
+assigned crew, with automatic maximum fuel, in one PDF (see report_pack.py).
+"""
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from batch import FUEL_LIMIT_LABELS, alert_messages, evaluate_batch
+from engine import Loading, aircraft_data, compute_mass_balance
+from fleet import default_fleet
+from mission_batch import _num, iter_schedule
+from stations import station_table
+
+OBJECTIVES = ("fuel", "endurance")
+FIELDS = ["crew", "slot", "status", "registration", "fuel_vol", "fuel_limit_by", "endurance_margin_h", "reason"]
+ENDURANCE_MESSAGE = "Not enough fuel for the required endurance."
+
+def load_aircraft(rows, burn_rate=None):
+    """Aircraft dicts (registration, aircraft, ew, ew_moment, burn_rate) from rows, filled from the fleet registry."""
+    fleet = default_fleet()
+    out = []
+    for row in rows:
+        registration = str(row.get("registration") or "").strip().upper()
+        record = fleet.get(registration) if registration else None
+        aircraft = str(row.get("aircraft") or "").strip() or (record["type"] if record else next(iter(aircraft_data)))
+        if aircraft not in aircraft_data:
+            raise ValueError(f"{registration}: unknown aircraft type {aircraft!r}")
+        out.append({
+            "registration": registration,
+            "aircraft": aircraft,
+            "ew": _num(row, "ew", record["empty_weight"] if record else 0.0),
+            "ew_moment": _num(row, "ew_moment", record["empty_moment"] if record else 0.0),
+            "burn_rate": _num(row, "burn_rate", burn_rate),
+        })
+    return out
+
+def load_crews(rows):
+    """Crew dicts (crew, slot, row, required_endurance); row keeps the station input columns."""
+    return [{
+        "crew": str(row.get("crew") or "").strip() or str(n),
+        "slot": str(row.get("slot") or "").strip(),
+        "row": row,
+        "required_endurance": _num(row, "required_endurance"),
+    } for n, row in enumerate(rows, start=1)]
+
+def pair_matrix(aircraft, crews, category=None, reserve_vol=0.0):
+    """(aircraft, crews) arrays for every pair: fuel_vol, fuel_limit_by, alerts, margin_h and feasible."""
+    shape = (len(aircraft), len(crews))
+    out = {
+        "fuel_vol": np.zeros(shape),
+        "fuel_limit_by": np.zeros(shape, dtype=np.int8),
+        "alerts": np.zeros(shape, dtype=np.uint32),
+    }
+    required = np.array([c["required_endurance"] for c in crews], dtype=float)
+    burn = np.array([a["burn_rate"] if a["burn_rate"] is not None else np.nan for a in aircraft], dtype=float)
+    # One evaluate_batch() per type: aircraft down the rows, crews across
+    for aircraft_type in dict.fromkeys(a["aircraft"] for a in aircraft):
+        ac = aircraft_data[aircraft_type]
+        rows = np.array([n for n, a in enumerate(aircraft) if a["aircraft"] == aircraft_type])
+        payload = {key: np.array([_num(c["row"], key) for c in crews])[None, :] for key in station_table(ac).input_keys}
+        res = evaluate_batch(
+            ac,
+            np.array([aircraft[n]["ew"] for n in rows])[:, None],
+            np.array([aircraft[n]["ew_moment"] for n in rows])[:, None],
+            payload, category=category,
+        )
+        for name in out:
+            out[name][rows] = res[name].reshape(rows.size, len(crews))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        endurance = (out["fuel_vol"] - reserve_vol) / burn[:, None]
+    out["margin_h"] = endurance - required[None, :]
+    needs = required > 0
+    if needs.any() and not (burn > 0).all():
+        raise ValueError("A positive burn rate is needed for every aircraft when crews have a required endurance")
+    out["feasible"] = (out["alerts"] == 0) & (~needs[None, :] | (out["margin_h"] >= 0))
+    return out
+
+def linear_assignment(cost):
+    """Minimum-cost assignment of rows to distinct columns (rows <= columns).
+
+    Shortest augmenting paths with potentials (Hungarian algorithm), O(n^2 m),
+    with the inner scan over columns vectorised. Returns the column of each
+    row.
+    """
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=int)  # row (1-based) holding each column, 0 = free
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            j1 = int(np.argmin(np.where(free, minv[1:], np.inf))) + 1
+            delta = minv[j1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+    cols = np.full(n, -1)
+    taken = np.flatnonzero(owner[1:])
+    cols[owner[1:][taken] - 1] = taken
+    return cols
+
+def _solve(feasible, score):
+    """Pairs (aircraft, crew) maximising the number of crews flown, then the total score."""
+    pairs = []
+    # Prune: aircraft and crews without a single feasible pair take no part
+    ac_idx = np.flatnonzero(feasible.any(axis=1))
+    crew_idx = np.flatnonzero(feasible.any(axis=0))
+    if not ac_idx.size or not crew_idx.size:
+        return pairs
+    ok = feasible[np.ix_(ac_idx, crew_idx)]
+    gain = np.where(ok, score[np.ix_(ac_idx, crew_idx)], 0.0)
+    # An infeasible pair costs more than any total score can win back
+    penalty = np.abs(gain).sum() + 1.0
+    cost = np.where(ok, -gain, penalty)
+    transpose = cost.shape[0] > cost.shape[1]
+    cols = linear_assignment(cost.T if transpose else cost)
+    for r, c in enumerate(cols):
+        a, k = (c, r) if transpose else (r, c)
+        if c >= 0 and ok[a, k]:
+            pairs.append((ac_idx[a], crew_idx[k]))
+    return pairs
+
+def assign(aircraft, crews, objective="fuel", category=None, reserve_vol=0.0):
+    """One result dict per crew (FIELDS), in crew order, plus the pair matrix.
+
+    The pair matrix also holds "assigned": the index in aircraft of each
+    crew's aircraft, -1 when it has none.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    if objective == "endurance" and any(a["burn_rate"] is None or a["burn_rate"] <= 0 for a in aircraft):
+        raise ValueError("The endurance objective needs a positive burn rate for every aircraft")
+    pairs = pair_matrix(aircraft, crews, category, reserve_vol)
+    score = pairs["fuel_vol"] if objective == "fuel" else pairs["margin_h"]
+    chosen = {}
+    for slot in dict.fromkeys(c["slot"] for c in crews):
+        idx = np.array([n for n, c in enumerate(crews) if c["slot"] == slot])
+        for a, k in _solve(pairs["feasible"][:, idx], score[:, idx]):
+            chosen[idx[k]] = a
+    pairs["assigned"] = np.full(len(crews), -1, dtype=int)
+    for n, a in chosen.items():
+        pairs["assigned"][n] = a
+
+    results = []
+    for n, crew in enumerate(crews):
+        entry = dict.fromkeys(FIELDS, "")
+        entry.update(crew=crew["crew"], slot=crew["slot"])
+        a = chosen.get(n)
+        if a is not None:
+            margin = pairs["margin_h"][a, n]
+            entry.update(
+                status="assigned",
+                registration=aircraft[a]["registration"],
+                fuel_vol=round(float(pairs["fuel_vol"][a, n]), 1),
+                fuel_limit_by=FUEL_LIMIT_LABELS[pairs["fuel_limit_by"][a, n]],
+                endurance_margin_h=round(float(margin), 2) if np.isfinite(margin) else "",
+            )
+        elif pairs["feasible"][:, n].any():
+            entry.update(status="no aircraft left", reason="Every feasible aircraft is taken in this slot.")
+        else:
+            entry["status"] = "no feasible aircraft"
+            if aircraft:
+                # Explain with the aircraft that comes closest (fewest alerts)
+                bits = np.array([bin(int(m)).count("1") for m in pairs["alerts"][:, n]])
+                best = int(np.argmin(bits))
+                ac = aircraft_data[aircraft[best]["aircraft"]]
+                messages = alert_messages(pairs["alerts"][best, n], ac) or [ENDURANCE_MESSAGE]
+                entry["reason"] = f"{aircraft[best]['registration'] or aircraft[best]['aircraft']}: " + " | ".join(messages)
+        results.append(entry)
+    return results, pairs
+
+def write_pack(out, aircraft, crews, pairs, category=None, flight_date="", pilot_name=""):
+    """Dispatch pack with a report per assigned crew (pairs from assign()), to a path or binary file; returns the page count."""
+    from report_pack import ReportPack
+    with ReportPack(out, title=f"Dispatch pack {flight_date}".strip()) as pack:
+        # By index: registrations may be blank or repeated
+        for crew, index in zip(crews, pairs["assigned"]):
+            if index < 0:
+                continue
+            a = aircraft[index]
+            ac = aircraft_data[a["aircraft"]]
+            loading = Loading(
+                ew=a["ew"], ew_moment=a["ew_moment"], category=category,
+                payload={key: _num(crew["row"], key) for key in station_table(ac).input_keys},
+            )
+            flight = " ".join(s for s in (flight_date, crew["slot"]) if s)
+            pack.add(ac, a["aircraft"], a["registration"], crew["crew"], flight, pilot_name,
+                     loading, compute_mass_balance(ac, loading), [])
+    return pack.pages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign the day's crews to aircraft.")
+    parser.add_argument("crews", help="CSV or Parquet file, one row per crew")
+    parser.add_argument("aircraft", help="CSV or Parquet file, one row per available aircraft")
+    parser.add_argument("-o", "--out", default="assignments.csv", help="output CSV (default: assignments.csv)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="fuel", help="maximise total usable fuel or endurance margin")
+    parser.add_argument("--burn-rate", type=float, default=None, help="burn rate (L/h) for aircraft without one")
+    parser.add_argument("--reserve", type=float, default=0.0, help="reserve fuel (L) kept out of the endurance")
+    parser.add_argument("--category", default=None, help="CG envelope category (default: the type's first)")
+    parser.add_argument("--pack", default=None, help="also write a dispatch pack PDF for the assigned crews")
+    parser.add_argument("--date", default="", help="flight date printed on the pack's reports")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    try:
+        aircraft = load_aircraft(iter_schedule(args.aircraft), args.burn_rate)
+        crews = load_crews(iter_schedule(args.crews))
+        results, pairs = assign(aircraft, crews, args.objective, args.category, args.reserve)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    assigned = sum(r["status"] == "assigned" for r in results)
+    print(f"{len(crews)} crews, {len(aircraft)} aircraft: {assigned} assigned, "
+          f"{len(crews) - assigned} not assigned ({time.perf_counter() - start:.2f} s)")
+    print(f"Assignments: {args.out}")
+    if args.pack:
+        pages = write_pack(args.pack, aircraft, crews, pairs, args.category, args.date)
+        print(f"Dispatch pack: {args.pack} ({pages} pages)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from atmosphere import conditions
+from fleet import default_fleet
+from performance import distances, performance_tables
+from stations import station_table
+from envelope import envelopes, get_envelope
+from limits import limit_rules
+
+# --- AIRCRAFT DATA --- (loaded from fleet.json, kept up to date by default_fleet().refresh())
+aircraft_data = default_fleet().types
+
+def get_limits_text(ac):
+    units = ac["units"]["weight"]
+    arm_unit = ac["units"]["arm"]
+    table = station_table(ac)
+    lines = [
+        f"Max Takeoff Weight: {ac['max_takeoff_weight']} {units}",
+        f"Max Fuel Volume: {table.max_fuel_volume} L",
+    ]
+    for label, max_weight in zip(table.limit_labels, table.max_weights):
+        if max_weight is not None:
+            lines.append(f"Max {label}: {max_weight:g} {units}")
+    if ac.get("envelopes"):
+        for name, env in envelopes(ac).items():
+            lines.append(f"CG Envelope ({name}): {env.cg_range[0]} to {env.cg_range[1]} {arm_unit}")
+    elif ac['cg_limits']:
+        lines.append(f"CG Limits: {ac['cg_limits'][0]} to {ac['cg_limits'][1]} {arm_unit}")
+    # Extra limits declared under "limits" in fleet.json
+    for rule in limit_rules(ac).declared:
+        unit = "L" if rule.name == "fuel_vol" else arm_unit if rule.name == "cg" else units
+        bounds = [f"Min {rule.min:g} {unit}"] if rule.min is not None else []
+        bounds += [f"Max {rule.max:g} {unit}"] if rule.max is not None else []
+        if bounds:
+            lines.append(f"{rule.label}: {', '.join(bounds)}")
+    return lines
+
+def aerodrome_performance(icao, elev_ft, qnh, temp):
+    return aerodromes_performance([{"icao": icao, "elev_ft": elev_ft, "qnh": qnh, "temp": temp}])[0]
+
+def aerodromes_performance(aerodromes, ac=None, mass=None):
+    """PA/DA for a list of {"icao", "elev_ft", "qnh", "temp"} dicts in one vectorized pass.
+
+    With ac and mass, each entry also gets "distances" from the type's POH
+    tables (value None when the conditions are outside the table).
+    """
+    if not aerodromes:
+        return []
+    elev_ft = np.array([float(a["elev_ft"]) for a in aerodromes])
+    qnh = np.array([float(a["qnh"]) for a in aerodromes])
+    temp = np.array([float(a["temp"]) for a in aerodromes])
+    pa_ft, da_ft = conditions(elev_ft, qnh, temp)
+    tables = performance_tables(ac) if ac is not None and mass is not None else {}
+    dist = distances(ac, pa_ft, temp, mass) if tables else {}
+    perf_outputs = []
+    for n, a in enumerate(aerodromes):
+        po = {
+            "icao": a["icao"],
+            "elev_ft": a["elev_ft"],
+            "qnh": a["qnh"],
+            "temp": a["temp"],
+            "pa_ft": float(pa_ft[n]),
+            "da_ft": float(da_ft[n])
+        }
+        if a.get("runways"):
+            po["runways"] = a["runways"]
+        if tables:
+            po["distances"] = [
+                {"label": table.label, "unit": table.unit, "value": None if np.isnan(dist[name][n]) else float(dist[name][n])}
+                for name, table in tables.items()
+            ]
+        perf_outputs.append(po)
+    return perf_outputs
+
+@dataclass
+class Loading:
+    """One loading of an aircraft.
+
+    payload maps the station input keys declared in fleet.json (e.g. student,
+    instructor, bag1) to weights. fuel_vol=None means automatic maximum fuel.
+    category picks the CG envelope (see envelope.py); None is the type's first.
+    """
+    ew: float = 0.0
+    ew_moment: float = 0.0
+    payload: dict = field(default_factory=dict)
+    fuel_vol: float = None
+    category: str = None
+
+    def payload_weight(self, ac):
+        """Weight at the type's stations; keys the type does not declare carry no weight."""
+        return float(station_table(ac).input_vector(self.payload).sum())
+
+@dataclass
+class MBResult:
+    fuel_vol: float
+    fuel_weight: float
+    fuel_limit_by: str
+    ew_arm: float
+    m_empty: float
+    station_weights: list
+    station_moments: list
+    tank_weights: list
+    tank_moments: list
+    m_fuel: float
+    total_weight: float
+    total_moment: float
+    cg: float
+    alert_list: list = field(default_factory=list)
+    manual_fuel_warning: str = None
+    # "ok"/"warn"/"bad" per limit rule (see limits.py), e.g. limit_status["total_weight"]
+    limit_status: dict = field(default_factory=dict)
+
+    def status(self, name):
+        return self.limit_status.get(name, "ok")
+
+    def items(self, loading, ac):
+        table = station_table(ac)
+        rows = [("Empty Weight", loading.ew, self.ew_arm, self.m_empty)]
+        rows += list(zip(table.names, self.station_weights, table.arms.tolist(), self.station_moments))
+        rows += list(zip(table.tank_names, self.tank_weights, table.tank_arms.tolist(), self.tank_moments))
+        return rows
+
+def compute_fuel(ac, loading):
+    table = station_table(ac)
+    fuel_density = ac['fuel_density']
+    max_vol = table.max_fuel_volume
+    useful_load = ac['max_takeoff_weight'] - (loading.ew + loading.payload_weight(ac))
+    tank_capacity_weight = max_vol * fuel_density
+    manual_fuel_warning = None
+    if loading.fuel_vol is None:
+        fuel_weight_possible = max(0.0, useful_load)
+        if fuel_weight_possible <= tank_capacity_weight:
+            fuel_weight = fuel_weight_possible
+            fuel_vol = fuel_weight / fuel_density
+            fuel_limit_by = "Maximum Weight"
+        else:
+            fuel_weight = tank_capacity_weight
+            fuel_vol = max_vol
+            fuel_limit_by = "Tank Capacity"
+        # Then the most fuel that also keeps the CG inside the envelope
+        env = get_envelope(ac, loading.category)
+        if env is not None:
+            station_weights = table.station_weights(table.input_vector(loading.payload))
+            zero_fuel_weight = loading.ew + float(station_weights.sum())
+            zero_fuel_moment = loading.ew_moment + float(station_weights @ table.arms)
+            best, limited = env.max_fuel(zero_fuel_weight, zero_fuel_moment, table.fuel_arm, fuel_weight)
+            if limited:
+                fuel_weight = float(best)
+                fuel_vol = fuel_weight / fuel_density
+                fuel_limit_by = "CG Envelope"
+        return fuel_vol, fuel_weight, fuel_limit_by, manual_fuel_warning
+
+    fuel_vol = loading.fuel_vol
+    fuel_weight = fuel_vol * fuel_density
+    fuel_weight_limit = max(0.0, useful_load)
+    if fuel_vol > max_vol:
+        manual_fuel_warning = f"Fuel volume exceeds maximum tank capacity ({max_vol:.1f} L). Using limit."
+        fuel_vol = max_vol
+        fuel_weight = fuel_vol * fuel_density
+    if fuel_weight > fuel_weight_limit:
+        manual_fuel_warning = f"Fuel weight exceeds limit by aircraft weight ({fuel_weight_limit:.1f} kg). Using limit."
+        fuel_weight = fuel_weight_limit
+        fuel_vol = fuel_weight / fuel_density
+    if fuel_vol >= max_vol or (fuel_weight > useful_load and useful_load < tank_capacity_weight):
+        fuel_limit_by = "Tank Capacity" if fuel_vol >= max_vol else "Maximum Weight"
+    else:
+        fuel_limit_by = "Manual Entry"
+    return fuel_vol, fuel_weight, fuel_limit_by, manual_fuel_warning
+
+def compute_mass_balance(ac, loading):
+    table = station_table(ac)
+    fuel_vol, fuel_weight, fuel_limit_by, manual_fuel_warning = compute_fuel(ac, loading)
+
+    station_weights = table.station_weights(table.input_vector(loading.payload))
+    tank_weights = table.tank_shares * fuel_weight
+    station_moments = station_weights * table.arms
+    tank_moments = tank_weights * table.tank_arms
+
+    m_empty = loading.ew_moment
+    m_fuel = float(tank_moments.sum())
+    total_weight = loading.ew + float(station_weights.sum()) + fuel_weight
+    total_moment = m_empty + float(station_weights @ table.arms) + m_fuel
+    cg = (total_moment / total_weight) if total_weight > 0 else 0
+
+    rules = limit_rules(ac)
+    severity = rules.evaluate({
+        "total_weight": total_weight, "cg": cg, "fuel_vol": fuel_vol, "fuel_weight": fuel_weight,
+        "station_weights": station_weights, "inputs": table.input_vector(loading.payload),
+    }, loading.category)
+
+    return MBResult(
+        fuel_vol=fuel_vol,
+        fuel_weight=fuel_weight,
+        fuel_limit_by=fuel_limit_by,
+        ew_arm=loading.ew_moment / loading.ew if loading.ew > 0 else 0.0,
+        m_empty=m_empty,
+        station_weights=station_weights.tolist(),
+        station_moments=station_moments.tolist(),
+        tank_weights=tank_weights.tolist(),
+        tank_moments=tank_moments.tolist(),
+        m_fuel=m_fuel,
+        total_weight=total_weight,
+        total_moment=total_moment,
+        cg=cg,
+        alert_list=rules.messages(severity),
+        manual_fuel_warning=manual_fuel_warning,
+        limit_status=rules.statuses(severity),
+    )
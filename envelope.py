@@ -0,0 +1,169 @@
+"""CG envelopes as polygons in CG/weight space.
+
+A type in fleet.json may declare one polygon per category, vertices as
+[cg, weight] pairs in order around the boundary:
+
+    "envelopes": {
+      "Normal":  [[1.841, 450], [1.978, 450], [1.978, 650], [1.870, 650], [1.841, 550]],
+      "Utility": [...]
+    }
+
+Types without "envelopes" get a single "Normal" rectangle built from
+cg_limits, between zero weight and MTOW, which gives the same answers as the
+old min/max check: like that check it only looks at the CG, and weights
+above MTOW (reported by the weight rule) are evaluated at the top of it.
+
+Edges are precomputed once per type. Every check scans along the CG axis at
+the loading's weight, so containment and the margin to the boundary come out
+of the same (n, edges) arrays for a whole batch. A declared polygon is a
+true point-in-polygon test: weights below or above it are outside.
+"""
+import threading
+
+import numpy as np
+
+DEFAULT_CATEGORY = "Normal"
+# Warn band as a fraction of the envelope's CG width (see limits.py)
+WARN_FRACTION = 0.05
+
+class Envelope:
+    def __init__(self, name, points, cg_only=False):
+        pts = np.asarray(points, dtype=float)
+        if pts.ndim != 2 or pts.shape[0] < 3 or pts.shape[1] != 2:
+            raise ValueError(f"Envelope {name!r} needs at least three [cg, weight] points")
+        self.name = name
+        self.points = pts
+        self.cg_only = cg_only
+        x0, y0 = pts[:, 0], pts[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        # Horizontal edges never cross a constant-weight line
+        edge = y0 != y1
+        self._edges = list(zip(
+            x0[edge].tolist(), y0[edge].tolist(), ((x1 - x0)[edge] / (y1 - y0)[edge]).tolist(),
+            np.minimum(y0, y1)[edge].tolist(), np.maximum(y0, y1)[edge].tolist(),
+        ))
+        self.weight_range = (float(y0.min()), float(y0.max()))
+        self.cg_range = (float(x0.min()), float(x0.max()))
+        self.warn_band = (self.cg_range[1] - self.cg_range[0]) * WARN_FRACTION
+
+    def _clip(self, weight):
+        lo, hi = self.weight_range
+        return np.clip(np.asarray(weight, dtype=float), lo, np.nextafter(hi, lo))
+
+    def margin(self, cg, weight):
+        """Signed distance along the CG axis to the boundary: >= 0 inside, < 0 outside.
+
+        Weights outside the polygon's range have no boundary to measure to
+        and get -inf (cg_only envelopes clamp them instead).
+        """
+        cg, weight = np.broadcast_arrays(np.asarray(cg, dtype=float), np.asarray(weight, dtype=float))
+        if self.cg_only:
+            w = self._clip(weight)
+        else:
+            # Spans are half-open, so the top edge itself goes just below it
+            lo, hi = self.weight_range
+            w = np.where(weight == hi, np.nextafter(hi, lo), weight)
+        inside = np.zeros(w.shape, dtype=bool)
+        dist = np.full(w.shape, np.inf)
+        # One pass per edge over contiguous arrays; envelopes have a handful of edges
+        for x0, y0, slope, ylo, yhi in self._edges:
+            # Half-open spans so a shared vertex is counted once
+            hit = (w >= ylo) & (w < yhi)
+            d = x0 + (w - y0) * slope - cg
+            inside ^= hit & (d > 0)
+            np.minimum(dist, np.where(hit, np.abs(d), np.inf), out=dist)
+        return np.where(inside | (dist == 0), dist, -dist)
+
+    def contains(self, cg, weight):
+        return self.margin(cg, weight) >= 0
+
+    def max_fuel(self, weight, moment, fuel_arm, cap, samples=17, iterations=28):
+        """Largest fuel weight in [0, cap] that keeps the loading inside the envelope.
+
+        weight/moment are the zero-fuel totals; all arguments broadcast.
+        Adding fuel moves the loading along a curve towards fuel_arm. Rows
+        already inside at cap keep it; for the others the curve is sampled
+        and the last feasible sample is refined by bisection. Returns
+        (fuel, limited): limited marks rows where the envelope cut the fuel
+        below cap. Rows outside the envelope at every fuel load keep cap,
+        and the CG alert reports them.
+        """
+        weight, moment, cap = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (weight, moment, cap)))
+        shape = cap.shape
+        weight, moment, cap = weight.ravel(), moment.ravel(), cap.ravel()
+
+        def feasible(w, m, fuel):
+            w = w + fuel
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cg = np.where(w > 0, (m + fuel * fuel_arm) / w, 0.0)
+            return self.margin(cg, w) >= 0
+
+        fuel = cap.copy()
+        limited = np.zeros(cap.shape, dtype=bool)
+        rows = np.flatnonzero(~feasible(weight, moment, cap))
+        if rows.size:
+            w, m = weight[rows, None], moment[rows, None]
+            grid = cap[rows, None] * np.linspace(0.0, 1.0, samples)
+            ok = feasible(w, m, grid)
+            found = ok.any(axis=-1)
+            last = samples - 1 - np.argmax(ok[:, ::-1], axis=-1)
+            rows, w, m, grid, last = rows[found], w[found, 0], m[found, 0], grid[found], last[found]
+            lo = grid[np.arange(rows.size), last]
+            hi = grid[np.arange(rows.size), np.minimum(last + 1, samples - 1)]
+            for _ in range(iterations):
+                mid = (lo + hi) / 2
+                mid_ok = feasible(w, m, mid)
+                lo = np.where(mid_ok, mid, lo)
+                hi = np.where(mid_ok, hi, mid)
+            fuel[rows] = lo
+            limited[rows] = True
+        return fuel.reshape(shape), limited.reshape(shape)
+
+    def cg_limits(self, weight):
+        """Forward and aft CG limits at each weight, as two arrays."""
+        w = self._clip(weight)
+        fwd = np.full(w.shape, np.inf)
+        aft = np.full(w.shape, -np.inf)
+        for x0, y0, slope, ylo, yhi in self._edges:
+            hit = (w >= ylo) & (w < yhi)
+            x = x0 + (w - y0) * slope
+            np.minimum(fwd, np.where(hit, x, np.inf), out=fwd)
+            np.maximum(aft, np.where(hit, x, -np.inf), out=aft)
+        return fwd, aft
+
+    def cg_limits_at(self, weight):
+        """(forward, aft) CG limits at one weight."""
+        fwd, aft = self.cg_limits(weight)
+        return float(fwd), float(aft)
+
+def _build(ac):
+    if ac.get("envelopes"):
+        return {name: Envelope(name, pts) for name, pts in ac["envelopes"].items()}
+    if ac.get("cg_limits"):
+        mn, mx = ac["cg_limits"]
+        mtow = ac["max_takeoff_weight"]
+        return {DEFAULT_CATEGORY: Envelope(DEFAULT_CATEGORY, [[mn, 0.0], [mx, 0.0], [mx, mtow], [mn, mtow]], cg_only=True)}
+    return {}
+
+_envelopes = {}
+_lock = threading.Lock()
+
+def envelopes(ac):
+    """{category: Envelope} for a type dict, built once per dict object."""
+    entry = _envelopes.get(id(ac))
+    if entry is None or entry[0] is not ac:
+        with _lock:
+            entry = (ac, _build(ac))
+            _envelopes[id(ac)] = entry
+    return entry[1]
+
+def get_envelope(ac, category=None):
+    """Envelope for a category (first declared one by default); None if the type has no CG limits."""
+    envs = envelopes(ac)
+    if not envs:
+        return None
+    if category is None:
+        return next(iter(envs.values()))
+    if category not in envs:
+        raise ValueError(f"Unknown CG envelope category: {category}")
+    return envs[category]
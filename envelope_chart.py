@@ -0,0 +1,178 @@
+"""Loading graph: the CG envelope with the current loading plotted on it.
+
+The background (grid, envelope, MTOW line) depends only on the envelope, so
+it is drawn once per envelope: as a PNG for the PDF and as an Altair layer
+for the page. Every update only overlays the takeoff point and, when a fuel
+burn is planned, the line down to landing.
+
+The PNG is rasterised with NumPy (Envelope.margin() over the pixel grid) and
+written with zlib, so no plotting library is needed. It is kept in
+MB_CHART_CACHE (default: the system temp dir) under a name derived from the
+envelope. FPDF embeds an image once per document by name, so a multi-page
+document carries a single copy however many pages show the chart.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from envelope import get_envelope
+
+CHART_VERSION = 1
+PIXELS = (720, 480)
+NICE_STEPS = (1, 2, 2.5, 5)
+
+BACKGROUND = (255, 255, 255)
+GRID = (226, 226, 226)
+FILL = (214, 236, 214)
+BORDER = (40, 125, 40)
+MTOW_LINE = (200, 0, 0)
+
+@dataclass
+class ChartFrame:
+    cg_lo: float
+    cg_hi: float
+    w_lo: float
+    w_hi: float
+    cg_ticks: list
+    w_ticks: list
+
+    def x(self, cg):
+        """Fraction of the width (0 = left) for a CG."""
+        return (np.asarray(cg, dtype=float) - self.cg_lo) / (self.cg_hi - self.cg_lo)
+
+    def y(self, weight):
+        """Fraction of the height (0 = bottom) for a weight."""
+        return (np.asarray(weight, dtype=float) - self.w_lo) / (self.w_hi - self.w_lo)
+
+def _ticks(lo, hi, count=8):
+    raw = (hi - lo) / count
+    scale = 10.0 ** np.floor(np.log10(raw))
+    step = next(s * scale for s in NICE_STEPS + (10,) if s * scale >= raw)
+    first = np.ceil(lo / step) * step
+    return [round(float(v), 6) for v in np.arange(first, hi + step * 1e-9, step)]
+
+def chart_frame(env, mtow):
+    """Axis ranges: the envelope's CG range padded, weight from about half MTOW to just above MTOW."""
+    cg_lo, cg_hi = env.cg_range
+    pad = (cg_hi - cg_lo) * 0.2
+    w_lo = env.weight_range[0]
+    if w_lo <= 0:
+        # Envelopes built from cg_limits start at zero weight; no real loading does
+        w_lo = np.floor(mtow * 0.5 / 50) * 50
+    w_hi = max(env.weight_range[1], mtow) * 1.05
+    cg_lo, cg_hi = cg_lo - pad, cg_hi + pad
+    return ChartFrame(cg_lo, cg_hi, float(w_lo), float(w_hi), _ticks(cg_lo, cg_hi), _ticks(w_lo, w_hi))
+
+def _png(image):
+    """8-bit RGB PNG bytes for an (h, w, 3) uint8 array."""
+    h, w, _ = image.shape
+    raw = np.concatenate([np.zeros((h, 1), dtype=np.uint8), image.reshape(h, w * 3)], axis=1).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 9)) + chunk(b"IEND", b""))
+
+def render_background(env, frame, mtow, pixels=PIXELS):
+    """PNG bytes of the chart area: grid, filled envelope, MTOW line."""
+    width, height = pixels
+    # Pixel centres in CG/weight space, top row = heaviest
+    cg = frame.cg_lo + (np.arange(width) + 0.5) / width * (frame.cg_hi - frame.cg_lo)
+    weight = frame.w_hi - (np.arange(height) + 0.5) / height * (frame.w_hi - frame.w_lo)
+    cg_grid, w_grid = np.meshgrid(cg, weight)
+    lo, hi = env.weight_range
+    inside = (env.margin(cg_grid, w_grid) >= 0) & (w_grid >= lo) & (w_grid <= hi)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    for tick in frame.cg_ticks:
+        image[:, int(np.clip(frame.x(tick) * width, 0, width - 1))] = GRID
+    for tick in frame.w_ticks:
+        image[int(np.clip((1 - frame.y(tick)) * height, 0, height - 1)), :] = GRID
+    image[inside] = FILL
+    # Boundary: inside pixels with an outside neighbour, two pixels wide
+    edge = np.zeros_like(inside)
+    for shift, axis in ((1, 0), (-1, 0), (1, 1), (-1, 1), (2, 0), (-2, 0), (2, 1), (-2, 1)):
+        edge |= inside & ~np.roll(inside, shift, axis=axis)
+    image[edge] = BORDER
+    row = int(np.clip((1 - frame.y(mtow)) * height, 0, height - 1))
+    image[row:row + 2, ::12] = MTOW_LINE
+    for k in range(1, 7):
+        image[row:row + 2, k::12] = MTOW_LINE
+    return _png(image)
+
+def _cache_dir():
+    return Path(os.environ.get("MB_CHART_CACHE") or Path(tempfile.gettempdir()) / "mb-charts")
+
+_backgrounds = {}
+_lock = threading.Lock()
+
+def background(ac, category=None):
+    """(frame, png_path) for a type's envelope, drawn once per envelope; None without CG limits."""
+    env = get_envelope(ac, category)
+    if env is None:
+        return None
+    entry = _backgrounds.get(id(env))
+    if entry is not None and entry[0] is env:
+        return entry[1], entry[2]
+    with _lock:
+        mtow = float(ac["max_takeoff_weight"])
+        frame = chart_frame(env, mtow)
+        key = hashlib.sha1(repr((CHART_VERSION, env.points.tolist(), mtow, PIXELS)).encode()).hexdigest()[:16]
+        path = _cache_dir() / f"envelope-{key}.png"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(render_background(env, frame, mtow))
+            os.replace(tmp, path)
+        _backgrounds[id(env)] = (env, frame, str(path))
+    return frame, str(path)
+
+_layers = {}
+
+def _background_layer(env, frame, mtow):
+    entry = _layers.get(id(env))
+    if entry is not None and entry[0] is env:
+        return entry[1]
+    import altair as alt
+    pts = env.points.tolist()
+    lo, hi = env.weight_range
+    # Clip the drawn outline to the chart; cg_limits envelopes reach down to zero weight
+    outline = [{"CG": cg, "Weight": max(w, frame.w_lo), "order": n} for n, (cg, w) in enumerate(pts + pts[:1])]
+    x = alt.X("CG:Q", scale=alt.Scale(domain=[frame.cg_lo, frame.cg_hi], zero=False, nice=False))
+    y = alt.Y("Weight:Q", scale=alt.Scale(domain=[frame.w_lo, frame.w_hi], zero=False, nice=False))
+    shape = alt.Chart(alt.Data(values=outline)).mark_line(color="#287d28", strokeWidth=2, filled=True, fill="#d6ecd6").encode(
+        x=x, y=y, order="order:Q")
+    mtow_rule = alt.Chart(alt.Data(values=[{"Weight": mtow}])).mark_rule(color="#c80000", strokeDash=[6, 4]).encode(y="Weight:Q")
+    layer = alt.layer(shape, mtow_rule)
+    with _lock:
+        _layers[id(env)] = (env, layer)
+    return layer
+
+def envelope_chart(ac, loading, result, traj=None, status="ok"):
+    """Altair loading graph: cached envelope layer plus the takeoff point and burn line."""
+    env = get_envelope(ac, loading.category)
+    if env is None:
+        return None
+    import altair as alt
+    frame, _ = background(ac, loading.category)
+    units_wt, units_arm = ac['units']['weight'], ac['units']['arm']
+    layers = [_background_layer(env, frame, float(ac["max_takeoff_weight"]))]
+    if traj is not None:
+        burn = [{"CG": c, "Weight": w, "order": n} for n, (c, w) in enumerate(zip(traj.cg.tolist(), traj.total_weight.tolist()))]
+        layers.append(alt.Chart(alt.Data(values=burn)).mark_line(color="#1f77b4", strokeWidth=2).encode(
+            x="CG:Q", y="Weight:Q", order="order:Q"))
+    colour = {"ok": "#1e961e", "warn": "#c8961e", "bad": "#c80000"}.get(status, "#000000")
+    point = [{"CG": result.cg, "Weight": result.total_weight}]
+    layers.append(alt.Chart(alt.Data(values=point)).mark_point(filled=True, size=120, color=colour, stroke="black").encode(
+        x=alt.X("CG:Q", title=f"CG ({units_arm})"), y=alt.Y("Weight:Q", title=f"Weight ({units_wt})"),
+        tooltip=[alt.Tooltip("CG:Q", format=".3f"), alt.Tooltip("Weight:Q", format=".1f")]))
+    return alt.layer(*layers)
@@ -0,0 +1,130 @@
+"""Fleet registry: aircraft types and individual registrations.
+
+fleet.json (or MB_FLEET_PATH) looks like:
+
+    {
+      "version": 1,
+      "types": {"Tecnam P2008": {"max_takeoff_weight": 650, ..., "icon": "...", "afm": "..."}},
+      "aircraft": [
+        {"registration": "CS-XXX", "type": "Tecnam P2008",
+         "empty_weight": 0.0, "empty_moment": 0.0, "weighed": "YYYY-MM-DD"}
+      ]
+    }
+
+The file is loaded once per process and indexed by type and registration.
+refresh() re-reads it when its mtime changes. Only entries whose content
+changed are replaced; unchanged entries keep the same dict objects. A file
+that fails to load on refresh is logged and the previous registry kept.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+SUPPORTED_VERSIONS = (1,)
+DEFAULT_PATH = Path(__file__).resolve().parent / "fleet.json"
+
+log = logging.getLogger(__name__)
+
+def _fingerprint(entry):
+    return hashlib.sha1(json.dumps(entry, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _normalise_type(entry):
+    ac = dict(entry)
+    if ac.get("cg_limits") is not None:
+        ac["cg_limits"] = tuple(ac["cg_limits"])
+    return ac
+
+class FleetRegistry:
+    def __init__(self, path=DEFAULT_PATH, check_interval=2.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        # These dicts are updated in place so references handed out stay live
+        self.types = {}
+        self.aircraft = {}
+        self._by_type = {}
+        self._fingerprints = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.version = None
+        self.reloads = 0
+        self.load()
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        doc = json.loads(self.path.read_text(encoding="utf-8"))
+        version = doc.get("version")
+        if version not in SUPPORTED_VERSIONS:
+            raise ValueError(f"Unsupported fleet file version {version!r} in {self.path}")
+        types = doc.get("types", {})
+        records = {}
+        for rec in doc.get("aircraft", []):
+            reg = rec["registration"].strip().upper()
+            if rec.get("type") not in types:
+                raise ValueError(f"{reg}: unknown aircraft type {rec.get('type')!r}")
+            records[reg] = dict(rec, registration=reg)
+        with self._lock:
+            self._merge(self.types, types, "type:", _normalise_type)
+            self._merge(self.aircraft, records, "reg:", dict)
+            by_type = {}
+            for reg, rec in sorted(self.aircraft.items()):
+                by_type.setdefault(rec["type"], []).append(reg)
+            self._by_type = by_type
+            self.version = version
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+
+    def _merge(self, target, source, prefix, build):
+        for key in list(target):
+            if key not in source:
+                del target[key]
+                self._fingerprints.pop(prefix + key, None)
+        for key, entry in source.items():
+            fp = _fingerprint(entry)
+            if self._fingerprints.get(prefix + key) != fp:
+                target[key] = build(entry)
+                self._fingerprints[prefix + key] = fp
+
+    def refresh(self):
+        """Reload if the file changed; checks the mtime at most every check_interval seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            # Malformed or half-written: keep serving the last good registry, and
+            # don't parse this version of the file again
+            self._mtime = mtime
+            log.warning("Fleet file %s not reloaded, keeping the previous registry: %s", self.path, e)
+            return False
+        return True
+
+    def registrations(self, aircraft_type):
+        return list(self._by_type.get(aircraft_type, []))
+
+    def get(self, registration):
+        return self.aircraft.get(registration.strip().upper())
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_fleet():
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = FleetRegistry(os.environ.get("MB_FLEET_PATH") or DEFAULT_PATH)
+    return _default
@@ -0,0 +1,186 @@
+"""Declarative limit rules: every alert and ok/warn/bad colour comes from here.
+
+Each type gets one rule per limit fleet.json already states, in this order:
+
+    total_weight       max_takeoff_weight, "Total weight exceeds maximum takeoff weight."
+    station:<name>     each station's max_weight and alert
+    cg                 the CG envelope of the loading's category (envelope.py)
+
+and may add rules, or override one by name, with a "limits" list:
+
+    "limits": [
+      {"name": "input:bag1", "max": 10, "message": "Baggage above 10 kg needs the cargo net."},
+      {"name": "fuel_vol", "min": 30, "label": "Fuel", "message": "Less than 30 L of fuel."}
+    ]
+
+Alert messages follow the rule order unless the type lists rule names in
+"alert_order"; the listed rules come first, in that order, and the rest
+follow. The P2008 uses it to keep the baggage alert ahead of the seat alert:
+
+    "alert_order": ["total_weight", "station:Baggage", "station:Pilot & Passenger", "cg"]
+
+A rule's name is the quantity it checks: total_weight, fuel_vol, fuel_weight,
+cg, station:<name> or input:<key>. A rule is bad outside [min, max] and warn
+when it gets close. With only a max, warn is above warn_fraction of it (0.95
+unless the rule says otherwise). With only a min, warn is within the same
+share above it. With both, warn is within (1 - warn_fraction) of the range
+from either end. The envelope rule warns within envelope.WARN_FRACTION of
+the envelope's CG width.
+
+The rules are compiled once per type. evaluate() takes scalars or NumPy
+batches and returns one severity per rule in a single pass. Alerts, colours
+and batch bitmasks are all derived from that severity array.
+"""
+import threading
+
+import numpy as np
+
+from envelope import get_envelope
+from stations import station_table
+
+OK, WARN, BAD = 0, 1, 2
+SEVERITY_NAMES = ("ok", "warn", "bad")
+WARN_FRACTION = 0.95
+QUANTITIES = ("total_weight", "fuel_vol", "fuel_weight", "cg")
+
+class Rule:
+    def __init__(self, name, min=None, max=None, message=None, label=None, warn_fraction=WARN_FRACTION, envelope=False):
+        self.name = name
+        self.min = None if min is None else float(min)
+        self.max = None if max is None else float(max)
+        self.label = label or name
+        self.message = message or f"{self.label} outside allowed limits."
+        self.warn_fraction = float(warn_fraction)
+        self.envelope = envelope
+
+    def severity(self, value):
+        """Severity codes for plain min/max rules; value broadcasts."""
+        value = np.asarray(value, dtype=float)
+        lo, hi = self.min, self.max
+        if lo is not None and hi is not None:
+            band = (hi - lo) * (1.0 - self.warn_fraction)
+            warn = (value < lo + band) | (value > hi - band)
+            bad = (value < lo) | (value > hi)
+        elif hi is not None:
+            warn, bad = value > hi * self.warn_fraction, value > hi
+        elif lo is not None:
+            warn, bad = value < lo * (2.0 - self.warn_fraction), value < lo
+        else:
+            return np.zeros(value.shape, dtype=np.int8)
+        return np.where(bad, BAD, np.where(warn, WARN, OK)).astype(np.int8)
+
+def _default_rules(ac):
+    table = station_table(ac)
+    rules = [Rule("total_weight", max=ac["max_takeoff_weight"], label="Total Weight",
+                  message="Total weight exceeds maximum takeoff weight.")]
+    for name, label, max_weight, alert in zip(table.names, table.limit_labels, table.max_weights, table.alerts):
+        if max_weight is not None:
+            rules.append(Rule(f"station:{name}", max=max_weight, label=label, message=alert))
+    rules.append(Rule("cg", label="CG", message="CG outside safe envelope.", envelope=True))
+    return rules
+
+class LimitRules:
+    def __init__(self, ac):
+        self.ac = ac
+        table = station_table(ac)
+        rules = {r.name: r for r in _default_rules(ac)}
+        self.declared = []
+        for spec in ac.get("limits", []):
+            spec = dict(spec)
+            rule = Rule(spec.pop("name"), **spec)
+            self._getter(rule.name, table)  # fail on unknown quantities when the type loads
+            rules[rule.name] = rule
+            self.declared.append(rule)
+        self.rules = list(rules.values())
+        if len(self.rules) > 32:
+            raise ValueError("At most 32 limit rules per aircraft type")
+        self.names = [r.name for r in self.rules]
+        self.index = {name: n for n, name in enumerate(self.names)}
+        self._getters = [self._getter(r.name, table) for r in self.rules]
+        self._bits = np.left_shift(np.uint32(1), np.arange(len(self.rules), dtype=np.uint32))
+        order = list(ac.get("alert_order", []))
+        unknown = [name for name in order if name not in self.index]
+        if unknown:
+            raise ValueError(f"Unknown rule(s) in alert_order: {', '.join(unknown)}")
+        self.alert_order = [self.index[name] for name in order] + [
+            n for n, name in enumerate(self.names) if name not in order]
+
+    @staticmethod
+    def _getter(name, table):
+        if name in QUANTITIES:
+            return lambda values: values[name]
+        kind, _, key = name.partition(":")
+        if kind == "station" and key in table.names:
+            idx = table.names.index(key)
+            return lambda values: values["station_weights"][..., idx]
+        if kind == "input" and key in table.input_keys:
+            idx = table.input_keys.index(key)
+            return lambda values: values["inputs"][..., idx]
+        raise ValueError(f"Unknown limit quantity: {name!r}")
+
+    def evaluate(self, values, category=None):
+        """Severity codes, shape (..., n_rules), for one loading or a batch.
+
+        values holds total_weight, cg, fuel_vol and fuel_weight, plus
+        station_weights and inputs with stations/inputs on the last axis.
+        An optional cg_margin (Envelope.margin() of the batch) is reused by
+        the envelope rule.
+        """
+        shape = np.shape(values["total_weight"])
+        out = np.zeros(shape + (len(self.rules),), dtype=np.int8)
+        for n, (rule, getter) in enumerate(zip(self.rules, self._getters)):
+            if rule.envelope:
+                env = get_envelope(self.ac, category)
+                if env is None:
+                    continue
+                margin = values.get("cg_margin")
+                if margin is None:
+                    margin = env.margin(values["cg"], values["total_weight"])
+                out[..., n] = np.where(margin < 0, BAD, np.where(margin < env.warn_band, WARN, OK))
+            else:
+                out[..., n] = rule.severity(getter(values))
+        return out
+
+    def alert_mask(self, severity):
+        """Bitmask per loading with bit n set when rule n is bad."""
+        return ((severity == BAD) * self._bits).sum(axis=-1, dtype=np.uint32)
+
+    def messages(self, severity=None, mask=None):
+        """Alert messages, in alert order, for one loading's severity row or bitmask."""
+        if mask is None:
+            mask = int(self.alert_mask(np.asarray(severity)))
+        return [self.rules[n].message for n in self.alert_order if int(mask) >> n & 1]
+
+    def statuses(self, severity):
+        """{rule name: "ok"/"warn"/"bad"} for one loading's severity row."""
+        return {name: SEVERITY_NAMES[int(s)] for name, s in zip(self.names, severity)}
+
+    def codes(self, severity, name):
+        """Severity codes of one rule across a batch (OK where the type has no such rule)."""
+        n = self.index.get(name)
+        return severity[..., n] if n is not None else np.zeros(severity.shape[:-1], dtype=np.int8)
+
+    def check(self, name, value, total_weight=None, category=None):
+        """Severity name of a single quantity, e.g. the weight or CG at one point of a trip."""
+        rule = self.rules[self.index[name]] if name in self.index else None
+        if rule is None:
+            return "ok"
+        if rule.envelope:
+            env = get_envelope(self.ac, category)
+            if env is None:
+                return "ok"
+            margin = float(env.margin(value, total_weight))
+            return SEVERITY_NAMES[BAD if margin < 0 else WARN if margin < env.warn_band else OK]
+        return SEVERITY_NAMES[int(rule.severity(value))]
+
+_rules = {}
+_lock = threading.Lock()
+
+def limit_rules(ac):
+    """Compiled LimitRules for a type dict, built once per dict object."""
+    entry = _rules.get(id(ac))
+    if entry is None or entry[0] is not ac:
+        with _lock:
+            entry = (ac, LimitRules(ac))
+            _rules[id(ac)] = entry
+    return entry[1]
@@ -0,0 +1,137 @@
+"""Load test for service.py: keep-alive connections hammering one endpoint.
+
+    python loadtest.py --start-server --workers 4 -c 64 -d 10
+    python loadtest.py --url http://127.0.0.1:8502/mass-balance --batch 100
+
+Each connection sends requests back to back over one keep-alive socket for
+--duration seconds. The body is a P2008-style mission, or --batch missions
+per request, or any JSON file (--body). Prints requests/s, missions/s,
+latency percentiles and the status codes seen. --start-server runs
+service.py on a free local port for the duration of the test.
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from engine import aircraft_data
+from stations import station_table
+
+def sample_mission(aircraft, rng):
+    """A mission with random station inputs and automatic fuel; empty weight from the registry."""
+    table = station_table(aircraft_data[aircraft])
+    return {
+        "aircraft": aircraft,
+        "ew": round(rng.uniform(360, 390), 1),
+        "ew_moment": round(rng.uniform(660, 720), 1),
+        "payload": {key: round(rng.uniform(0, 20 if table.kinds[station] != "seat" else 100), 1)
+                    for key, _, station in table.inputs},
+    }
+
+async def _connection(host, port, path, bodies, deadline, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    requests = [
+        (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+         f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+        for body in bodies
+    ]
+    n = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[n % len(requests)])
+            n += 1
+            head = await reader.readuntil(b"\r\n\r\n")
+            status_line, *lines = head.decode("latin-1").split("\r\n")
+            length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length:"))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            status = int(status_line.split(" ")[1])
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run(url, connections, duration, bodies):
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(parts.hostname, parts.port or 80, parts.path or "/", bodies, deadline, latencies, statuses)
+        for _ in range(connections)))
+    return latencies, statuses, time.perf_counter() - start
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_for(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"service did not start on port {port}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the local calculation service.")
+    parser.add_argument("--url", default=None, help="endpoint (default: /mass-balance on the local service)")
+    parser.add_argument("-c", "--connections", type=int, default=32, help="concurrent keep-alive connections (default: 32)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds (default: 10)")
+    parser.add_argument("--batch", type=int, default=0, help="missions per request (default: single missions)")
+    parser.add_argument("--body", default=None, help="JSON file to send instead of generated missions")
+    parser.add_argument("--start-server", action="store_true", help="start service.py on a free port for the test")
+    parser.add_argument("--workers", type=int, default=1, help="service processes with --start-server (default: 1)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    aircraft = next(iter(aircraft_data))
+    if args.body:
+        bodies = [Path(args.body).read_bytes()]
+    elif args.batch:
+        bodies = [json.dumps({"missions": [sample_mission(aircraft, rng) for _ in range(args.batch)]}).encode() for _ in range(8)]
+    else:
+        bodies = [json.dumps(sample_mission(aircraft, rng)).encode() for _ in range(256)]
+
+    server = None
+    url = args.url
+    if args.start_server:
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, str(Path(__file__).with_name("service.py")),
+                                   "--port", str(port), "--workers", str(args.workers)], stdout=subprocess.DEVNULL)
+        _wait_for(port)
+        url = url or f"http://127.0.0.1:{port}/mass-balance"
+    url = url or "http://127.0.0.1:8502/mass-balance"
+    try:
+        latencies, statuses, elapsed = asyncio.run(run(url, args.connections, args.duration, bodies))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    if not latencies:
+        print("No responses")
+        return 1
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    missions = max(1, args.batch)
+    print(f"{url}: {args.connections} connections, {elapsed:.1f} s")
+    print(f"{len(latencies)} requests, {len(latencies) / elapsed:.0f} req/s"
+          + (f", {len(latencies) * missions / elapsed:.0f} missions/s" if missions > 1 else ""))
+    print(f"latency ms: p50 {pct(0.50):.2f}  p90 {pct(0.90):.2f}  p99 {pct(0.99):.2f}  max {latencies[-1] * 1000:.2f}")
+    print("status: " + ", ".join(f"{code} x{count}" for code, count in sorted(statuses.items())))
+    return 0 if set(statuses) == {200} else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,62 @@
 import streamlit as st
-from fpdf import FPDF
 import datetime
-from pathlib import Path
-import pytz
-import requests
+import os
 import base64
-import json
-import unicodedata
+import csv
+import io
+import tempfile
+import numpy as np
+from aerodromes import default_aerodromes
+from assets import AssetRegistry
+from fleet import default_fleet
+from stations import station_table
+from envelope import envelopes
+from envelope_chart import envelope_chart
+from engine import aircraft_data, get_limits_text, Loading, compute_mass_balance, aerodromes_performance
+from performance import performance_tables
+from report_cache import ReportCache, report_key
+from timing import timed
+from render import render_results_panel, render_aerodromes, render_trajectory, render_trip
+from trajectory import fuel_trajectory
+from trip import TripPlanner
+from sweep import SweepCache, axis_values, base_key, limit_labels
 
 ADMIN_EMAIL = "alexandre.moiteiro@gmail.com"
-WEBSITE_LINK = "https://mass-balance.streamlit.app/"
-SENDGRID_API_KEY = st.secrets["SENDGRID_API_KEY"]
 SENDER_EMAIL = "alexandre.moiteiro@students.sevenair.com"
 
-def ascii_safe(text):
-    if not isinstance(text, str):
-        return str(text)
-    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
-
-def get_color(val, limit):
-    if limit is None: return "ok"
-    if val > limit:
-        return "bad"
-    elif val > (limit * 0.95):
-        return "warn"
-    else:
-        return "ok"
-
-def get_cg_color(cg, limits):
-    if not limits: return "ok"
-    mn, mx = limits
-    margin = (mx - mn) * 0.05
-    if cg < mn or cg > mx:
-        return "bad"
-    elif cg < mn + margin or cg > mx - margin:
-        return "warn"
-    else:
-        return "ok"
-
-def color_rgb(code):
-    if code == "ok":
-        return (30, 150, 30)
-    if code == "warn":
-        return (200, 150, 30)
-    if code == "bad":
-        return (200, 0, 0)
-    return (0, 0, 0)
-
-class CustomPDF(FPDF):
-    def footer(self):
-        self.set_y(-10)
-        self.set_font("Arial", 'I', 6)
-        self.set_text_color(140, 140, 140)
-        footer_text = (
-            "This document is for assistance and cross-checking only. "
-            "It does not replace your responsibility to perform and verify your own calculations before flight.\n  "
-            f"Generated by {WEBSITE_LINK}"
-        )
-        self.multi_cell(0, 2.8, ascii_safe(footer_text), align='C')
-        self.set_text_color(0,0,0)
+# PDF (fpdf), email (requests, sqlite3) and secrets are only loaded when first needed,
+# so users who never generate a report or send a message never pay for them.
+def get_secret(name):
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    value = value or os.environ.get(name)
+    if not value:
+        raise RuntimeError(f"{name} is not configured")
+    return value
+
+# Shared by every session; set MB_DIGEST_INTERVAL (seconds) to bundle report emails
+@st.cache_resource
+def get_outbox():
+    from outbox import Outbox, SendGridTransport
+    transport = SendGridTransport(get_secret("SENDGRID_API_KEY"), SENDER_EMAIL)
+    return Outbox(
+        os.environ.get("MB_OUTBOX_PATH", "outbox.sqlite3"),
+        transport,
+        digest_interval=float(os.environ.get("MB_DIGEST_INTERVAL", 0)) or None,
+        digest_size=int(os.environ.get("MB_DIGEST_SIZE", 10)),
+    )
+
+# Mission log: one writer thread per process, shared by all sessions
+@st.cache_resource
+def get_mission_log():
+    from mission_log import default_log
+    return default_log()
+
+@st.cache_resource
+def get_report_cache():
+    return ReportCache(disk_dir=os.environ.get("MB_REPORT_CACHE_DIR") or None)
 
 def inject_css():
     st.markdown("""
@@ -193,529 +191,517 @@ st.set_page_config(
 )
 inject_css()
 
-# --- AIRCRAFT DATA ---
-aircraft_data = {
-    "Tecnam P2008": {
-        "fuel_arm": 2.209,
-        "pilot_arm": 1.800,
-        "baggage_arm": 2.417,
-        "max_takeoff_weight": 650,
-        "max_fuel_volume": 124.0,
-        "max_passenger_weight": 230,
-        "max_baggage_weight": 20,
-        "cg_limits": (1.841, 1.978),
-        "fuel_density": 0.72,
-        "units": {"weight": "kg", "arm": "m"}
-    }
-}
-icons = {
-    "Tecnam P2008": "tecnam_icon.png"
-}
-afm_files = {
-    "Tecnam P2008": "Tecnam_P2008_AFM.pdf"
-}
-def get_limits_text(ac):
-    units = ac["units"]["weight"]
-    arm_unit = ac["units"]["arm"]
-    return [
-        f"Max Takeoff Weight: {ac['max_takeoff_weight']} {units}",
-        f"Max Fuel Volume: {ac['max_fuel_volume']} L",
-        f"Max Pilot+Passenger: {ac['max_passenger_weight']} {units}",
-        f"Max Baggage: {ac['max_baggage_weight']} {units}",
-        f"CG Limits: {ac['cg_limits'][0]} to {ac['cg_limits'][1]} {arm_unit}",
-    ]
-def utc_now():
-    return datetime.datetime.now(pytz.UTC)
-
-st.markdown(f'<div class="mb-header">Mass & Balance Planner</div>', unsafe_allow_html=True)
-cols = st.columns([0.48, 0.02, 0.5], gap="large")
-
-# --- LEFT: Aircraft info, limits, input form grouped at the top ---
-with cols[0]:
-    aircrafts = list(aircraft_data.keys())
-    options = aircrafts + ["More aircraft coming soon..."]
-    aircraft = st.selectbox(
-        "Aircraft type",
-        options,
-        index=0,
-        format_func=lambda x: x if x in aircraft_data else x + " (disabled)",
-    )
-    if aircraft not in aircraft_data:
-        st.info("More aircraft coming soon!")
-        st.stop()
-    ac = aircraft_data[aircraft]
-    icon_path = icons.get(aircraft)
+# Icons and AFMs are loaded once per process; the default aircraft is preloaded at startup
+@st.cache_resource
+def get_assets():
+    registry = AssetRegistry()
+    default = next(iter(aircraft_data))
+    registry.preload([aircraft_data[default].get("icon"), aircraft_data[default].get("afm")])
+    return registry
+
+# Aerodrome database: parsed and indexed once per process, shared by all sessions
+@st.cache_resource
+def get_aerodrome_db():
+    return default_aerodromes()
+
+DEFAULT_AERODROME = "LPSO"
+
+def lookup_aerodrome(idx):
+    """on_change for an ICAO field: fill elevation (and runways) from the database.
+
+    An exact ICAO code or a search that matches a single aerodrome (e.g. a
+    name) is replaced by its code.
+    """
+    db = get_aerodrome_db()
+    key = f"perf_icao_{idx}"
+    text = st.session_state[key].strip()
+    rec = db.get(text)
+    if rec is None:
+        matches = db.search(text, limit=2)
+        rec = matches[0] if len(matches) == 1 else None
+    if rec is None:
+        st.session_state.aerodromes[idx]["runways"] = []
+        return
+    st.session_state[key] = rec["icao"]
+    st.session_state[f"perf_elev_{idx}"] = rec["elev_ft"]
+    st.session_state.aerodromes[idx].update(icao=rec["icao"], elev_ft=rec["elev_ft"], runways=rec["runways"])
 
-    inner_cols = st.columns([0.01, 0.99])
-    with inner_cols[1]:
-        if icon_path and Path(icon_path).exists():
-            st.markdown(
-                f'<div class="mb-aircraft-icon"><img src="data:image/png;base64,{base64.b64encode(Path(icon_path).read_bytes()).decode()}" alt="Aircraft Icon" /></div>',
-                unsafe_allow_html=True,
-            )
+def utc_now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+# --- PAGE FRAGMENTS ---
+# Each section below reruns on its own when one of its widgets changes.
+# Data flows between them through st.session_state:
+#   aircraft_section   -> aircraft, ac        (full rerun: everything depends on it)
+#   weights_fragment   -> st.session_state.mb (loading, result, fuel_mode, trajectory)
+#   aerodromes_fragment-> st.session_state.perf_outputs, trip
+#   pdf_fragment       <- mb, perf_outputs, trip (read when the button is clicked)
+#   dispatch_fragment  (independent: uploaded crews and aircraft)
+#   contact_fragment   (independent)
+
+MANUAL_REGISTRATION = "Other (enter weights manually)"
+
+def aircraft_section():
+    fleet = default_fleet()
+    fleet.refresh()
+    cols = st.columns([0.48, 0.02, 0.5], gap="large")
+    with cols[0]:
+        aircrafts = list(aircraft_data.keys())
+        options = aircrafts + ["More aircraft coming soon..."]
+        aircraft = st.selectbox(
+            "Aircraft type",
+            options,
+            index=0,
+            format_func=lambda x: x if x in aircraft_data else x + " (disabled)",
+        )
+        if aircraft not in aircraft_data:
+            st.info("More aircraft coming soon!")
+            st.stop()
+        ac = aircraft_data[aircraft]
+
+        # Registrations from the fleet registry prefill the weighed empty weight and moment
+        registrations = fleet.registrations(aircraft)
+        if registrations:
+            registration = st.selectbox("Registration", registrations + [MANUAL_REGISTRATION], key="registration_select")
+            record = fleet.get(registration) if registration != MANUAL_REGISTRATION else None
+            if record and st.session_state.get("prefilled_registration") != registration:
+                st.session_state["ew"] = float(record["empty_weight"])
+                st.session_state["ew_moment"] = float(record["empty_moment"])
+                st.session_state["prefilled_registration"] = registration
+            st.session_state.registration = registration if record else None
+            if record and record.get("weighed"):
+                st.caption(f"Empty weight and moment from weighing of {record['weighed']}")
+        else:
+            st.session_state.registration = None
         st.markdown(
             '<div class="mb-limits"><ul>' +
             "".join([f"<li>{x}</li>" for x in get_limits_text(ac)]) +
             '</ul></div>', unsafe_allow_html=True
         )
-        afm_path = afm_files.get(aircraft)
-        if afm_path and Path(afm_path).exists():
-            with open(afm_path, "rb") as f:
-                st.download_button("Download Aircraft Flight Manual (AFM)", f, file_name=afm_path, mime="application/pdf")
-
-    fuel_mode = st.radio(
-        "Fuel Input Mode",
-        ["Automatic maximum fuel (default)", "Manual fuel volume"],
-        index=0, key="fuel_mode",
-        help="Automatic maximum fuel (default): Fuel will be maximized as per limitations."
+    with cols[2]:
+        icon = get_assets().get(ac["icon"]) if ac.get("icon") else None
+        if icon is not None and icon.exists:
+            st.markdown(
+                f'<div class="mb-aircraft-icon"><img src="data:image/png;base64,{icon.b64}" alt="Aircraft Icon" /></div>',
+                unsafe_allow_html=True,
+            )
+        afm_path = ac.get("afm")
+        afm = get_assets().get(afm_path) if afm_path else None
+        if afm is not None and afm.exists:
+            st.download_button("Download Aircraft Flight Manual (AFM)", afm.data, file_name=afm_path, mime="application/pdf")
+    return aircraft, ac
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def get_trajectory(aircraft, loading, burn_rate, flight_time, reserve_vol, fleet_reloads):
+    # Keyed by the loading and burn inputs (fleet_reloads drops entries after a fleet.json change),
+    # so reruns from unrelated widgets reuse the arrays
+    ac = aircraft_data[aircraft]
+    return fuel_trajectory(ac, loading, compute_mass_balance(ac, loading), burn_rate, flight_time, reserve_vol)
+
+def trajectory_chart(traj, units_arm):
+    import altair as alt
+    series = [("CG", traj.cg)]
+    if traj.fwd_limit is not None:
+        series += [("Forward limit", traj.fwd_limit), ("Aft limit", traj.aft_limit)]
+    values = [
+        {"Time (h)": t, "CG": v, "Series": name}
+        for name, arr in series for t, v in zip(traj.time_h.tolist(), arr.tolist())
+    ]
+    return alt.Chart(alt.Data(values=values)).mark_line().encode(
+        x=alt.X("Time (h):Q"),
+        y=alt.Y("CG:Q", title=f"CG ({units_arm})", scale=alt.Scale(zero=False)),
+        color=alt.Color("Series:N", scale=alt.Scale(
+            domain=["CG", "Forward limit", "Aft limit"], range=["#1f77b4", "#8c8c8c", "#8c8c8c"])),
     )
 
-    with st.form("input_form"):
-        units_wt = ac['units']['weight']
-        units_arm = ac['units']['arm']
-        st.markdown("### Enter Weights")
-        ew = st.number_input(f"Empty Weight ({units_wt})", min_value=0.0, value=0.0, step=1.0, key="ew")
-        ew_moment = st.number_input(f"Empty Weight Moment ({units_wt}·{units_arm})", min_value=0.0, value=0.0, step=1.0, key="ew_moment")
-        ew_arm = ew_moment / ew if ew > 0 else 0.0
-        student = st.number_input(f"Student Weight ({units_wt})", min_value=0.0, value=0.0, step=1.0, key="student")
-        instructor = st.number_input(f"Instructor Weight ({units_wt})", min_value=0.0, value=0.0, step=1.0, key="instructor")
-        pilot = student + instructor
-        bag1 = st.number_input(f"Baggage ({units_wt})", min_value=0.0, value=0.0, step=1.0, key="bag1")
-        bag2 = 0.0
-
-        fuel_density = ac['fuel_density']
-        manual_fuel_warning = None
-        if fuel_mode == "Manual fuel volume":
-            max_vol = ac['max_fuel_volume']
-            max_wt = ac['max_takeoff_weight'] - (ew + pilot + bag1 + bag2)
-            fuel_vol = st.number_input("Fuel Volume (L)", min_value=0.0, value=0.0, step=1.0, key="fuel_vol")
-            fuel_weight = fuel_vol * fuel_density
-            fuel_weight_limit = max(0.0, max_wt)
-            fuel_weight_tank_limit = max_vol * fuel_density
-            if fuel_vol > max_vol:
-                manual_fuel_warning = f"Fuel volume exceeds maximum tank capacity ({max_vol:.1f} L). Using limit."
-                fuel_vol = max_vol
-                fuel_weight = fuel_vol * fuel_density
-            if fuel_weight > fuel_weight_limit:
-                manual_fuel_warning = f"Fuel weight exceeds limit by aircraft weight ({fuel_weight_limit:.1f} kg). Using limit."
-                fuel_weight = fuel_weight_limit
-                fuel_vol = fuel_weight / fuel_density
-            if manual_fuel_warning:
-                st.warning(manual_fuel_warning)
-        st.form_submit_button("Update")
+# What-if sweep cells, shared by all sessions (keys carry the aircraft and every fixed input)
+@st.cache_resource
+def get_sweep_cache():
+    return SweepCache()
 
-# --- PERFORMANCE SECTION: Inputs e outputs em FT, default LPSO 390ft ---
-st.markdown('<div class="mb-section">', unsafe_allow_html=True)
-st.markdown('<div class="section-title">Performance - Aerodrome(s)</div>', unsafe_allow_html=True)
+SWEEP_MAX_CELLS = 20000
 
-if "aerodromes" not in st.session_state or not isinstance(st.session_state.aerodromes, list):
-    st.session_state.aerodromes = [
-        {"icao": "LPSO", "elev_ft": 390.0, "qnh": 1013.0, "temp": 15.0}
+def sweep_chart(xs, ys, x_step, y_step, values, x_title, y_title, title, nominal=False):
+    import altair as alt
+    data = [
+        {"x0": x - x_step / 2, "x1": x + x_step / 2, "y0": y - y_step / 2, "y1": y + y_step / 2,
+         "x": x, "y": y, "value": v}
+        for y, row in zip(ys.tolist(), values.tolist()) for x, v in zip(xs.tolist(), row)
     ]
+    color = alt.Color("value:N", title=title) if nominal else alt.Color("value:Q", title=title, scale=alt.Scale(scheme="viridis"))
+    return alt.Chart(alt.Data(values=data)).mark_rect().encode(
+        x=alt.X("x0:Q", title=x_title, scale=alt.Scale(zero=False, nice=False)), x2="x1:Q",
+        y=alt.Y("y0:Q", title=y_title, scale=alt.Scale(zero=False, nice=False)), y2="y1:Q",
+        color=color,
+        tooltip=[alt.Tooltip("x:Q", title=x_title), alt.Tooltip("y:Q", title=y_title), alt.Tooltip("value:N" if nominal else "value:Q", title=title)],
+    )
 
-for i, a in enumerate(st.session_state.aerodromes):
-    if not isinstance(a, dict):
-        st.session_state.aerodromes[i] = {"icao": "", "elev_ft": 0.0, "qnh": 1013.0, "temp": 15.0}
-        a = st.session_state.aerodromes[i]
-    if "icao" not in a:      a["icao"] = ""
-    if "elev_ft" not in a:   a["elev_ft"] = 0.0
-    if "qnh" not in a:       a["qnh"] = 1013.0
-    if "temp" not in a:      a["temp"] = 15.0
-
-add_btn, _, remove_btn = st.columns([0.20, 0.03, 0.20], gap="small")
-
-if add_btn.button("Add Aerodrome"):
-    st.session_state.aerodromes.append({"icao":"", "elev_ft":0.0, "qnh":1013.0, "temp":15.0})
-if remove_btn.button("Remove Last", disabled=len(st.session_state.aerodromes)==1):
-    if len(st.session_state.aerodromes) > 1:
-        st.session_state.aerodromes.pop(-1)
-
-perf_outputs = []
-for idx, a in enumerate(st.session_state.aerodromes):
-    with st.container():
-        st.markdown(f"##### Aerodrome {idx+1}")
-        icao = st.text_input(f"ICAO code", value=a.get("icao", ""), key=f"perf_icao_{idx}", max_chars=8)
-        elev_ft = st.number_input("Elevation (ft)", min_value=-1200.0, max_value=20000.0, value=float(a.get("elev_ft", 0.0)), step=1.0, key=f"perf_elev_{idx}")
-        qnh = st.number_input("QNH (hPa)", min_value=900.0, max_value=1050.0, value=float(a.get("qnh", 1013.0)), step=0.1, key=f"perf_qnh_{idx}")
-        temp = st.number_input("Temperature (°C)", min_value=-40.0, max_value=60.0, value=float(a.get("temp", 15.0)), step=0.1, key=f"perf_temp_{idx}")
-
-        st.session_state.aerodromes[idx]["icao"] = icao
-        st.session_state.aerodromes[idx]["elev_ft"] = elev_ft
-        st.session_state.aerodromes[idx]["qnh"] = qnh
-        st.session_state.aerodromes[idx]["temp"] = temp
-
-        pa_ft = elev_ft + (1013.25 - qnh) * 27
-        isa_temp = 15 - 2 * (pa_ft / 1000)
-        da_ft = pa_ft + (120 * (temp - isa_temp))
-        perf_outputs.append({
-            "icao": icao,
-            "elev_ft": elev_ft,
-            "qnh": qnh,
-            "temp": temp,
-            "pa_ft": pa_ft,
-            "da_ft": da_ft
-        })
-
-        # Simples: apenas bold PA/DA
-        st.markdown(f"**Pressure Altitude (PA):** {pa_ft:.0f} ft  \n**Density Altitude (DA):** {da_ft:.0f} ft")
-
-st.markdown('</div>', unsafe_allow_html=True)
-
-# --- LOGIC ---
-fuel_density = ac['fuel_density']
-units_wt = ac['units']['weight']
-units_arm = ac['units']['arm']
-
-if fuel_mode == "Automatic maximum fuel (default)":
-    useful_load = ac['max_takeoff_weight'] - (ew + pilot + bag1 + bag2)
-    fuel_weight_possible = max(0.0, useful_load)
-    tank_capacity_weight = ac['max_fuel_volume'] * fuel_density
-    if fuel_weight_possible <= tank_capacity_weight:
-        fuel_weight = fuel_weight_possible
-        fuel_vol = fuel_weight / fuel_density
-        fuel_limit_by = "Maximum Weight"
-    else:
-        fuel_weight = tank_capacity_weight
-        fuel_vol = ac['max_fuel_volume']
-        fuel_limit_by = "Tank Capacity"
-else:
-    if 'fuel_vol' in locals() and 'fuel_weight' in locals():
-        tank_capacity_weight = ac['max_fuel_volume'] * fuel_density
-        useful_load = ac['max_takeoff_weight'] - (ew + pilot + bag1 + bag2)
-        if fuel_vol >= ac['max_fuel_volume'] or (fuel_weight > useful_load and useful_load < tank_capacity_weight):
-            fuel_limit_by = "Tank Capacity" if fuel_vol >= ac['max_fuel_volume'] else "Maximum Weight"
-        else:
-            fuel_limit_by = "Manual Entry"
-    else:
-        fuel_weight = 0
-        fuel_vol = 0
-        fuel_limit_by = "Manual Entry"
-
-m_empty = ew_moment
-m_pilot = pilot * ac['pilot_arm']
-m_bag1 = bag1 * ac['baggage_arm']
-m_bag2 = 0.0
-m_fuel = fuel_weight * ac['fuel_arm']
-
-total_weight = ew + pilot + bag1 + bag2 + fuel_weight
-total_moment = m_empty + m_pilot + m_bag1 + m_bag2 + m_fuel
-cg = (total_moment / total_weight) if total_weight > 0 else 0
-baggage_sum = bag1 + bag2
-alert_list = []
-if total_weight > ac['max_takeoff_weight']:
-    alert_list.append("Total weight exceeds maximum takeoff weight.")
-if bag1 > ac['max_baggage_weight']:
-    alert_list.append("Baggage exceeds allowed limit.")
-if ac.get("max_passenger_weight") and pilot > ac["max_passenger_weight"]:
-    alert_list.append("Pilot + Passenger (student + instructor) exceed allowed limit.")
-if ac['cg_limits']:
-    mn, mx = ac['cg_limits']
-    if cg < mn or cg > mx:
-        alert_list.append("CG outside safe envelope.")
-
-# --- RIGHT: Output Panel ---
-with cols[2]:
-    st.markdown('<div class="mb-section">', unsafe_allow_html=True)
-    st.markdown('<div class="section-title">Calculation Summary</div>', unsafe_allow_html=True)
-    st.markdown('<div class="mb-summary">', unsafe_allow_html=True)
-    if fuel_limit_by == "Tank Capacity":
-        limit_word = "Limited by: Tank Capacity"
-    elif fuel_limit_by == "Maximum Weight":
-        limit_word = "Limited by: Maximum Weight"
-    elif fuel_limit_by == "Manual Entry":
-        limit_word = "Manual Entry"
-    else:
-        limit_word = fuel_limit_by
-    if fuel_mode == "Automatic maximum fuel (default)":
-        st.markdown(
-            f'<div class="mb-summary-row"><div class="mb-summary-label">Fuel possible</div><div class="mb-summary-val ok">{fuel_vol:.1f} L / {fuel_weight:.1f} {units_wt}<span style="color:#8c8c8c;font-size:0.97em;"> &nbsp;({limit_word})</span></div></div>',
-            unsafe_allow_html=True
-        )
-    else:
-        st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">Fuel</div><div class="mb-summary-val ok">{fuel_vol:.1f} L / {fuel_weight:.1f} {units_wt}<span style="color:#8c8c8c;font-size:0.97em;"> &nbsp;({limit_word})</span></div></div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">Total Weight</div><div class="mb-summary-val {get_color(total_weight, ac["max_takeoff_weight"])}">{total_weight:.2f} {units_wt}</div></div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">Total Moment</div><div class="mb-summary-val">{total_moment:.2f} {units_wt}·{units_arm}</div></div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">Pilot + Passenger</div><div class="mb-summary-val {get_color(pilot, ac["max_passenger_weight"])}">{pilot:.2f} {units_wt}</div></div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label"> - Student</div><div class="mb-summary-val">{student:.2f} {units_wt}</div></div>', unsafe_allow_html=True)
-    st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label"> - Instructor</div><div class="mb-summary-val">{instructor:.2f} {units_wt}</div></div>', unsafe_allow_html=True)
-    if ac['cg_limits']:
-        st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">CG</div><div class="mb-summary-val {get_cg_color(cg, ac["cg_limits"])}">{cg:.3f} {units_arm}</div></div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="mb-summary-row"><div class="mb-summary-label">CG Limits</div><div class="mb-summary-val">{ac["cg_limits"][0]:.3f} to {ac["cg_limits"][1]:.3f} {units_arm}</div></div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-    for a in alert_list:
-        st.markdown(f'<div class="mb-alert">{a}</div>', unsafe_allow_html=True)
-    st.markdown('<div style="height:10px;"></div>', unsafe_allow_html=True)
-
-    # --- PERFORMANCE SUMMARY MULTI ---
-    st.markdown('<div class="section-title" style="margin-bottom:8px;">Performance</div>', unsafe_allow_html=True)
-    for idx, po in enumerate(perf_outputs):
-        st.markdown(f"""
-        <div class="mb-summary">
-        <div class="mb-summary-row"><div class="mb-summary-label">Aerodrome {idx+1} (ICAO)</div><div class="mb-summary-val">{po['icao']}</div></div>
-        <div class="mb-summary-row"><div class="mb-summary-label">Elevation</div><div class="mb-summary-val">{po['elev_ft']:.0f} ft</div></div>
-        <div class="mb-summary-row"><div class="mb-summary-label">QNH</div><div class="mb-summary-val">{po['qnh']:.1f} hPa</div></div>
-        <div class="mb-summary-row"><div class="mb-summary-label">Temperature</div><div class="mb-summary-val">{po['temp']:.1f} °C</div></div>
-        <div style="margin-top:7px; margin-bottom:7px;">
-        <b>Pressure Altitude (PA):</b> {po['pa_ft']:.0f} ft<br>
-        <b>Density Altitude (DA):</b> {po['da_ft']:.0f} ft
-        </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    st.markdown('<div class="section-title" style="margin-bottom:9px;">Mass & Balance Table</div>', unsafe_allow_html=True)
-    items = [
-        ("Empty Weight", ew, ew_arm, m_empty),
-        ("Pilot & Passenger", pilot, ac['pilot_arm'], m_pilot),
-        ("Baggage", bag1, ac['baggage_arm'], m_bag1),
-        ("Fuel", fuel_weight, ac['fuel_arm'], m_fuel),
-    ]
-    def mb_table(items, units_wt, units_arm):
-        table = '<table class="mb-table">'
-        table += (
-            "<tr>"
-            "<th>Item</th>"
-            f"<th>Weight ({units_wt})</th>"
-            f"<th>Arm ({units_arm})</th>"
-            f"<th>Moment ({units_wt}·{units_arm})</th>"
-            "</tr>"
-        )
-        for i in items:
-            table += f"<tr><td>{i[0]}</td><td>{i[1]:.2f}</td><td>{i[2]:.3f}</td><td>{i[3]:.2f}</td></tr>"
-        table += "</table>"
-        return table
-    st.markdown(mb_table(items, units_wt, units_arm), unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
-
-    # --- PDF GENERATION (última coisa do site) ---
-    st.markdown('<div class="mb-section mb-pdf-section">', unsafe_allow_html=True)
-    st.markdown('<div class="section-title">PDF Report</div>', unsafe_allow_html=True)
-    with st.expander("Generate PDF report", expanded=False):
-        pilot_name = st.text_input('Pilot name / Prepared by *', value="", help="This field is required.")
-        registration = st.text_input("Aircraft registration", value="CS-XXX")
-        mission_number = st.text_input("Mission number", value="001")
-        utc_today = utc_now()
-        default_datetime = utc_today.strftime("%Y-%m-%d %H:%M UTC")
-        flight_datetime_utc = st.text_input("Scheduled flight date and time (UTC)", value=default_datetime, key="flight_datetime_utc")
-        flight_datetime_no_utc = flight_datetime_utc.replace(" UTC", "").strip()
-        pilot_name_valid = bool(pilot_name.strip())
-        pdf_button = st.button("Generate PDF with current values", disabled=not pilot_name_valid)
-        if pdf_button and pilot_name_valid:
-            try:
-                pdf = CustomPDF()
-                pdf.set_auto_page_break(auto=True, margin=10)
-                pdf.add_page()
-                pdf.set_fill_color(34,34,34)
-                pdf.rect(0, 0, 210, 15, 'F')
-                pdf.set_font("Arial", 'B', 15)
-                pdf.set_text_color(255,255,255)
-                pdf.set_xy(10,7)
-                pdf.cell(0, 7, ascii_safe("MASS & BALANCE REPORT"), ln=True, align='L')
-                pdf.set_text_color(0,0,0)
-                pdf.set_xy(10,20)
-                pdf.ln(3)
-                pdf.set_font("Arial", 'B', 12)
-                pdf.cell(0, 7, ascii_safe(f"{aircraft}  |  {registration}"), ln=True)
-                pdf.set_font("Arial", '', 11)
-                pdf.cell(0, 6, ascii_safe(f"Mission Number: {mission_number}"), ln=True)
-                pdf.cell(0, 6, ascii_safe(f"Flight: {flight_datetime_no_utc} UTC"), ln=True)
-                pdf.cell(0, 6, ascii_safe(f"Prepared by: {pilot_name}"), ln=True)
-                pdf.cell(0, 6, ascii_safe("Operator: Sevenair Academy"), ln=True)
-                pdf.ln(2)
-                # PERFORMANCE SECTION PDF MULTI
-                pdf.set_font("Arial", 'B', 12)
-                pdf.cell(0, 6, ascii_safe("Performance - Aerodrome(s):"), ln=True)
-                for idx, po in enumerate(perf_outputs):
-                    pdf.set_font("Arial", 'B', 10)
-                    pdf.cell(0, 6, ascii_safe(f"Aerodrome {idx+1}: {po['icao']}"), ln=True)
-                    pdf.set_font("Arial", '', 9)
-                    pdf.cell(0, 5, ascii_safe(f"  Elevation: {po['elev_ft']:.0f} ft"), ln=True)
-                    pdf.cell(0, 5, ascii_safe(f"  QNH: {po['qnh']:.1f} hPa"), ln=True)
-                    pdf.cell(0, 5, ascii_safe(f"  Temperature: {po['temp']:.1f} °C"), ln=True)
-                    # Simples: apenas bold PA/DA
-                    pdf.set_font("Arial", 'B', 9)
-                    pdf.set_text_color(50, 50, 50)
-                    pdf.cell(0, 5, ascii_safe(f"  Pressure Altitude (PA): {po['pa_ft']:.0f} ft"), ln=True)
-                    pdf.cell(0, 5, ascii_safe(f"  Density Altitude (DA): {po['da_ft']:.0f} ft"), ln=True)
-                    pdf.set_text_color(0,0,0)
-                pdf.ln(2)
-                pdf.set_font("Arial", 'B', 12)
-                pdf.cell(0, 6, ascii_safe("Operational Limits:"), ln=True)
-                pdf.set_font("Arial", '', 9)
-                for line in get_limits_text(ac):
-                    pdf.cell(0, 5, ascii_safe(line), ln=True)
-                pdf.ln(4)
-                pdf.set_font("Arial", 'B', 12)
-                pdf.cell(0, 6, ascii_safe("Results:"), ln=True)
-                pdf.set_font("Arial", 'B', 10)
-                col_widths = [45, 36, 34, 55]
-                headers = ["Item", f"Weight ({ac['units']['weight']})", f"Arm ({ac['units']['arm']})", f"Moment ({ac['units']['weight']}·{ac['units']['arm']})"]
-                for h, w in zip(headers, col_widths):
-                    pdf.cell(w, 7, ascii_safe(h), border=1, align='C')
-                pdf.ln()
-                pdf.set_font("Arial", '', 9)
-                rows = [
-                    ("Empty Weight", ew, ew_arm, m_empty),
-                    ("Pilot & Passenger", pilot, ac['pilot_arm'], m_pilot),
-                    ("Baggage", bag1, ac['baggage_arm'], m_bag1),
-                    ("Fuel", fuel_weight, ac['fuel_arm'], m_fuel),
-                ]
-                for row in rows:
-                    for idx, (val, w) in enumerate(zip(row, col_widths)):
-                        pdf.set_text_color(0,0,0)
-                        if isinstance(val, str):
-                            pdf.cell(w, 7, ascii_safe(val), border=1)
-                        else:
-                            pdf.cell(w, 7, ascii_safe(f"{val:.2f}" if isinstance(val, float) else str(val)), border=1, align='C')
-                    pdf.ln()
-                pdf.set_text_color(0,0,0)
-                pdf.ln(1)
-                pdf.set_font("Arial", 'B', 10)
-                pdf.set_text_color(50,50,50)
-                if fuel_mode == "Automatic maximum fuel (default)":
-                    limit_expl = "Limited by: " + ("Tank Capacity" if fuel_limit_by == "Tank Capacity" else "Maximum Weight")
-                elif fuel_limit_by == "Manual Entry":
-                    limit_expl = "Manual Entry"
+def sweep_axis(table, axis, default):
+    """Selectbox and range inputs for one sweep axis; returns (key, label, values, step)."""
+    by_label = {label: (key, station) for key, label, station in table.inputs}
+    label = st.selectbox(f"{axis} axis", list(by_label), index=default, key=f"sweep_{axis.lower()}")
+    key, station = by_label[label]
+    # Default range: 0 to the station limit where there is one
+    max_weight = table.max_weights[station]
+    top = max_weight if max_weight is not None else 120.0
+    cols = st.columns(3)
+    start = cols[0].number_input("From", min_value=0.0, value=0.0, step=1.0, key=f"sweep_from_{axis}_{key}")
+    stop = cols[1].number_input("To", min_value=0.0, value=top, step=1.0, key=f"sweep_to_{axis}_{key}")
+    step = cols[2].number_input("Step", min_value=0.1, value=float(max(1, round(top / 20))), step=0.5, key=f"sweep_step_{axis}_{key}")
+    return key, label, axis_values(start, stop, step), step
+
+@st.fragment
+def weights_fragment(aircraft, ac):
+    with timed("weights"):
+        table = station_table(ac)
+        units_wt = ac['units']['weight']
+        units_arm = ac['units']['arm']
+        cols = st.columns([0.48, 0.02, 0.5], gap="large")
+
+        # --- LEFT: input form ---
+        with cols[0]:
+            fuel_mode = st.radio(
+                "Fuel Input Mode",
+                ["Automatic maximum fuel (default)", "Manual fuel volume"],
+                index=0, key="fuel_mode",
+                help="Automatic maximum fuel (default): Fuel will be maximized as per limitations."
+            )
+
+            with st.form("input_form"):
+                st.markdown("### Enter Weights")
+                ew = st.number_input(f"Empty Weight ({units_wt})", min_value=0.0, step=1.0, key="ew")
+                ew_moment = st.number_input(f"Empty Weight Moment ({units_wt}·{units_arm})", min_value=0.0, step=1.0, key="ew_moment")
+                payload = {}
+                for key, label, station in table.inputs:
+                    label = f"{label} Weight ({units_wt})" if table.kinds[station] == "seat" else f"{label} ({units_wt})"
+                    payload[key] = st.number_input(label, min_value=0.0, value=0.0, step=1.0, key=key)
+
+                fuel_vol = None
+                if fuel_mode == "Manual fuel volume":
+                    fuel_vol = st.number_input("Fuel Volume (L)", min_value=0.0, value=0.0, step=1.0, key="fuel_vol")
+                categories = list(envelopes(ac))
+                category = st.selectbox("Category", categories, key="category") if len(categories) > 1 else None
+                loading = Loading(ew=ew, ew_moment=ew_moment, payload=payload, fuel_vol=fuel_vol, category=category)
+                result = compute_mass_balance(ac, loading)
+                if result.manual_fuel_warning:
+                    st.warning(result.manual_fuel_warning)
+                st.form_submit_button("Update")
+
+        # --- RIGHT: Output Panel (one HTML payload) ---
+        with cols[2]:
+            st.markdown(render_results_panel(ac, loading, result), unsafe_allow_html=True)
+            # Filled once the burn line (if any) is known
+            loading_graph = st.empty()
+
+        # --- Fuel burn trajectory (optional, off while the burn rate is 0) ---
+        traj = None
+        with st.expander("Fuel Burn Trajectory", expanded=False):
+            tcols = st.columns(3)
+            burn_rate = tcols[0].number_input("Burn rate (L/h)", min_value=0.0, value=0.0, step=0.5, key="burn_rate")
+            flight_time = tcols[1].number_input("Flight time (h)", min_value=0.0, value=1.0, step=0.1, key="flight_time")
+            reserve_vol = tcols[2].number_input("Reserve fuel (L)", min_value=0.0, value=0.0, step=1.0, key="reserve_vol")
+            if burn_rate > 0 and flight_time > 0:
+                traj = get_trajectory(aircraft, loading, burn_rate, flight_time, reserve_vol, default_fleet().reloads)
+                tcols = st.columns([0.48, 0.02, 0.5], gap="large")
+                with tcols[0]:
+                    st.altair_chart(trajectory_chart(traj, units_arm))
+                with tcols[2]:
+                    st.markdown(render_trajectory(ac, loading, traj), unsafe_allow_html=True)
+            else:
+                st.caption("Enter a burn rate to see weight and CG from takeoff to landing.")
+        # Envelope layer is built once per envelope; only the point and burn line change per update
+        graph = envelope_chart(ac, loading, result, traj, result.status("cg"))
+        if graph is not None:
+            loading_graph.altair_chart(graph.properties(title="Loading Graph"))
+
+        # --- What-if sweep over two inputs, everything else as entered, automatic maximum fuel ---
+        if len(table.inputs) >= 2:
+            with st.expander("What-if Sweep", expanded=False):
+                scols = st.columns([0.48, 0.04, 0.48])
+                with scols[0]:
+                    x_key, x_label, xs, x_step = sweep_axis(table, "X", 0)
+                with scols[2]:
+                    y_key, y_label, ys, y_step = sweep_axis(table, "Y", len(table.inputs) - 1)
+                if x_key == y_key:
+                    st.caption("Choose two different inputs.")
+                elif xs.size * ys.size > SWEEP_MAX_CELLS:
+                    st.warning(f"{xs.size * ys.size} cells; use larger steps (up to {SWEEP_MAX_CELLS}).")
                 else:
-                    limit_expl = fuel_limit_by
-                fuel_str = f"Fuel: {fuel_vol:.1f} L / {fuel_weight:.1f} {ac['units']['weight']} ({limit_expl})"
-                pdf.cell(0, 6, ascii_safe(fuel_str), ln=True)
-                # COLORIDO: TOTAL WEIGHT
-                total_weight_color = color_rgb(get_color(total_weight, ac["max_takeoff_weight"]))
-                pdf.set_text_color(*total_weight_color)
-                pdf.cell(0, 6, ascii_safe(f"Total Weight: {total_weight:.2f} {ac['units']['weight']}"), ln=True)
-                pdf.set_text_color(0,0,0)
-                pdf.cell(0, 6, ascii_safe(f"Total Moment: {total_moment:.2f} {ac['units']['weight']}·{ac['units']['arm']}"), ln=True)
-                # COLORIDO: PILOT+PASSENGER
-                pilot_color = color_rgb(get_color(pilot, ac["max_passenger_weight"]))
-                pdf.set_text_color(*pilot_color)
-                pdf.cell(0, 6, ascii_safe(f"Pilot + Passenger: {pilot:.2f} {ac['units']['weight']}"), ln=True)
-                pdf.set_text_color(0,0,0)
-                pdf.cell(0, 6, ascii_safe(f" - Student: {student:.2f} {ac['units']['weight']}"), ln=True)
-                pdf.cell(0, 6, ascii_safe(f" - Instructor: {instructor:.2f} {ac['units']['weight']}"), ln=True)
-                # COLORIDO: CG
-                if ac['cg_limits']:
-                    cg_color = color_rgb(get_cg_color(cg, ac["cg_limits"]))
-                    pdf.set_text_color(*cg_color)
-                    pdf.cell(0, 6, ascii_safe(f"CG: {cg:.3f} {ac['units']['arm']}"), ln=True)
-                    pdf.set_text_color(0,0,0)
-                    pdf.cell(0, 6, ascii_safe(f"CG Limits: {ac['cg_limits'][0]:.3f} to {ac['cg_limits'][1]:.3f} {ac['units']['arm']}"), ln=True)
-                if alert_list:
-                    pdf.set_font("Arial", 'B', 9)
-                    pdf.set_text_color(200,0,0)
-                    for a in list(dict.fromkeys(alert_list)):
-                        pdf.cell(0, 6, ascii_safe(f"WARNING: {a}"), ln=True)
-                    pdf.set_text_color(0,0,0)
-                pdf_file = f"mass_balance_mission{mission_number}.pdf"
-                pdf.output(pdf_file)
-                with open(pdf_file, "rb") as f:
-                    st.download_button("Download PDF", f, file_name=pdf_file, mime="application/pdf")
-                st.success("PDF generated successfully!")
+                    key = base_key(aircraft, loading, x_key, y_key, default_fleet().reloads)
+                    sweep = get_sweep_cache().evaluate(ac, key, loading, x_key, xs, y_key, ys)
+                    x_title, y_title = f"{x_label} ({units_wt})", f"{y_label} ({units_wt})"
+                    tabs = st.tabs(["Max fuel", "CG margin", "Binding limit"])
+                    with tabs[0]:
+                        st.altair_chart(sweep_chart(xs, ys, x_step, y_step, sweep["fuel_vol"].round(1), x_title, y_title, "Fuel (L)"))
+                    with tabs[1]:
+                        if np.isfinite(sweep["cg_margin"]).all():
+                            st.altair_chart(sweep_chart(xs, ys, x_step, y_step, sweep["cg_margin"].round(4), x_title, y_title, f"CG margin ({units_arm})"))
+                        else:
+                            st.caption("No CG limits for this type.")
+                    with tabs[2]:
+                        st.altair_chart(sweep_chart(xs, ys, x_step, y_step, limit_labels(sweep), x_title, y_title, "Binding limit", nominal=True))
+                    st.caption(f"{xs.size * ys.size} cells, {sweep['computed']} computed, the rest reused. "
+                               "Fuel is the automatic maximum; other inputs as entered above.")
+
+        previous = st.session_state.get("mb")
+        if previous and previous["loading"] != loading:
+            from mission_log import mission_entry
+            get_mission_log().record(mission_entry("calculation", aircraft, loading, result, st.session_state.get("registration")))
+        st.session_state.mb = {"loading": loading, "result": result, "fuel_mode": fuel_mode, "trajectory": traj}
+        # The aerodrome section's POH distances depend on the weight and the trip table (per-stop
+        # CG and status) on the whole loading; refresh the page when what they use changes
+        if previous and (
+            (len(st.session_state.get("aerodromes") or []) > 1 and previous["loading"] != loading)
+            or (performance_tables(ac) and previous["result"].total_weight != result.total_weight)
+        ):
+            st.rerun()
+
+# --- PERFORMANCE SECTION: Inputs e outputs em FT, default LPSO 390ft ---
+@st.fragment
+def aerodromes_fragment(ac):
+    with timed("aerodromes"):
+        st.markdown('<div class="mb-section">', unsafe_allow_html=True)
+        st.markdown('<div class="section-title">Performance - Aerodrome(s)</div>', unsafe_allow_html=True)
+
+        if "aerodromes" not in st.session_state or not isinstance(st.session_state.aerodromes, list):
+            home = get_aerodrome_db().get(DEFAULT_AERODROME)
+            st.session_state.aerodromes = [
+                {"icao": DEFAULT_AERODROME, "elev_ft": home["elev_ft"] if home else 0.0, "qnh": 1013.0, "temp": 15.0,
+                 "runways": home["runways"] if home else []}
+            ]
+
+        for i, a in enumerate(st.session_state.aerodromes):
+            if not isinstance(a, dict):
+                st.session_state.aerodromes[i] = {"icao": "", "elev_ft": 0.0, "qnh": 1013.0, "temp": 15.0}
+                a = st.session_state.aerodromes[i]
+            if "icao" not in a:      a["icao"] = ""
+            if "elev_ft" not in a:   a["elev_ft"] = 0.0
+            if "qnh" not in a:       a["qnh"] = 1013.0
+            if "temp" not in a:      a["temp"] = 15.0
+
+        add_btn, _, remove_btn = st.columns([0.20, 0.03, 0.20], gap="small")
+
+        if add_btn.button("Add Aerodrome"):
+            st.session_state.aerodromes.append({"icao":"", "elev_ft":0.0, "qnh":1013.0, "temp":15.0})
+        if remove_btn.button("Remove Last", disabled=len(st.session_state.aerodromes)==1):
+            if len(st.session_state.aerodromes) > 1:
+                st.session_state.aerodromes.pop(-1)
+                last = len(st.session_state.aerodromes)
+                st.session_state.pop(f"perf_icao_{last}", None)
+                st.session_state.pop(f"perf_elev_{last}", None)
+                st.session_state.pop(f"perf_burn_{last}", None)
+
+        in_col, _, out_col = st.columns([0.48, 0.02, 0.5], gap="large")
+        with in_col:
+            for idx, a in enumerate(st.session_state.aerodromes):
+                st.markdown(f"##### Aerodrome {idx+1}")
+                # ICAO and elevation are filled by lookup_aerodrome() through session state, so they are seeded there
+                st.session_state.setdefault(f"perf_icao_{idx}", a.get("icao", ""))
+                st.session_state.setdefault(f"perf_elev_{idx}", float(a.get("elev_ft", 0.0)))
+                icao = st.text_input(
+                    "ICAO code or name", key=f"perf_icao_{idx}", max_chars=40,
+                    on_change=lookup_aerodrome, args=(idx,),
+                )
+                rec = get_aerodrome_db().get(icao)
+                if rec is not None:
+                    st.caption(f"{rec['name']} · {rec['elev_ft']:.0f} ft from the aerodrome database (check the AIP)")
+                elif icao.strip():
+                    matches = get_aerodrome_db().search(icao)
+                    st.caption("Matches: " + " · ".join(f"{m['icao']} {m['name']}" for m in matches) if matches else "Not in the aerodrome database")
+                elev_ft = st.number_input("Elevation (ft)", min_value=-1200.0, max_value=20000.0, step=1.0, key=f"perf_elev_{idx}")
+                qnh = st.number_input("QNH (hPa)", min_value=900.0, max_value=1050.0, value=float(a.get("qnh", 1013.0)), step=0.1, key=f"perf_qnh_{idx}")
+                temp = st.number_input("Temperature (°C)", min_value=-40.0, max_value=60.0, value=float(a.get("temp", 15.0)), step=0.1, key=f"perf_temp_{idx}")
+                if idx:
+                    st.session_state.aerodromes[idx]["burn_vol"] = st.number_input(
+                        "Fuel burn on the leg to here (L)", min_value=0.0, value=float(a.get("burn_vol", 0.0)), step=1.0, key=f"perf_burn_{idx}")
+
+                st.session_state.aerodromes[idx]["icao"] = icao
+                st.session_state.aerodromes[idx]["elev_ft"] = elev_ft
+                st.session_state.aerodromes[idx]["qnh"] = qnh
+                st.session_state.aerodromes[idx]["temp"] = temp
+
+        # PA/DA and POH distances (at the current total weight) for every aerodrome in one call
+        perf_outputs = aerodromes_performance(st.session_state.aerodromes, ac, st.session_state.mb["result"].total_weight)
+        with out_col:
+            st.markdown(render_aerodromes(perf_outputs), unsafe_allow_html=True)
+
+        # Multi-leg trip: one planner per session, so edits only recompute the legs they affect
+        trip = None
+        if len(st.session_state.aerodromes) > 1:
+            planner = st.session_state.get("trip_planner")
+            if planner is None or planner.ac is not ac:
+                planner = st.session_state.trip_planner = TripPlanner(ac)
+            trip = planner.update(st.session_state.mb["loading"], st.session_state.aerodromes)
+            st.markdown('<div class="section-title" style="margin-bottom:9px;">Trip</div>', unsafe_allow_html=True)
+            st.markdown(render_trip(ac, trip), unsafe_allow_html=True)
+
+        st.session_state.perf_outputs = perf_outputs
+        st.session_state.trip = trip
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# --- PDF GENERATION (última coisa do site) ---
+@st.fragment
+def pdf_fragment(aircraft, ac):
+    with timed("pdf"):
+        st.markdown('<div class="mb-section mb-pdf-section">', unsafe_allow_html=True)
+        st.markdown('<div class="section-title">PDF Report</div>', unsafe_allow_html=True)
+        with st.expander("Generate PDF report", expanded=False):
+            pilot_name = st.text_input('Pilot name / Prepared by *', value="", help="This field is required.")
+            registration = st.text_input("Aircraft registration", value=st.session_state.get("registration") or "CS-XXX")
+            mission_number = st.text_input("Mission number", value="001")
+            utc_today = utc_now()
+            default_datetime = utc_today.strftime("%Y-%m-%d %H:%M UTC")
+            flight_datetime_utc = st.text_input("Scheduled flight date and time (UTC)", value=default_datetime, key="flight_datetime_utc")
+            flight_datetime_no_utc = flight_datetime_utc.replace(" UTC", "").strip()
+            pilot_name_valid = bool(pilot_name.strip())
+            pdf_button = st.button("Generate PDF with current values", disabled=not pilot_name_valid)
+            if pdf_button and pilot_name_valid:
+                loading = st.session_state.mb["loading"]
+                result = st.session_state.mb["result"]
+                traj = st.session_state.mb.get("trajectory")
+                trip = st.session_state.get("trip")
+                perf_outputs = st.session_state.get("perf_outputs", [])
                 try:
-                    with open(pdf_file, "rb") as f:
-                        pdf_bytes = f.read()
-                    html_body = f"""
-                    <html>
-                    <body>
-                        <h2>Mass & Balance Report</h2>
-                        <table style='border-collapse:collapse;'>
-                            <tr><th align='left'>Pilot</th><td>{pilot_name}</td></tr>
-                            <tr><th align='left'>Aircraft</th><td>{aircraft} ({registration})</td></tr>
-                            <tr><th align='left'>Mission</th><td>{mission_number}</td></tr>
-                            <tr><th align='left'>Flight (UTC)</th><td>{flight_datetime_no_utc} UTC</td></tr>
-                            <tr><th align='left'>Submitted from</th><td>{WEBSITE_LINK}</td></tr>
-                        </table>
-                        <p style='margin-top:1.5em;'>See attached PDF for details.</p>
-                    </body>
-                    </html>
-                    """
-                    data = {
-                        "personalizations": [
-                            {
-                                "to": [{"email": ADMIN_EMAIL}],
-                                "subject": f"Mass & Balance - {pilot_name.strip()}"
-                            }
-                        ],
-                        "from": {"email": SENDER_EMAIL},
-                        "content": [
-                            {
-                                "type": "text/html",
-                                "value": html_body
-                            }
-                        ],
-                        "attachments": [{
-                            "content": base64.b64encode(pdf_bytes).decode(),
-                            "type": "application/pdf",
-                            "filename": pdf_file,
-                            "disposition": "attachment"
-                        }]
-                    }
-                    headers = {
-                        "Authorization": f"Bearer {SENDGRID_API_KEY}",
-                        "Content-Type": "application/json"
-                    }
-                    resp = requests.post("https://api.sendgrid.com/v3/mail/send", data=json.dumps(data), headers=headers)
-                    if resp.status_code >= 400:
-                        st.warning(f"PDF generated but failed to send email (check SENDGRID_API_KEY and email settings). Error: {resp.text}")
-                        print(f"SendGrid error: {resp.text}")
+                    from report import WEBSITE_LINK, build_report, report_bytes, report_filename
+                    pdf_file = report_filename(mission_number)
+                    # One in-memory buffer shared by the download button and the email attachment,
+                    # reused as-is when the same inputs were rendered before
+                    key = report_key(ac, aircraft, registration, mission_number, flight_datetime_no_utc, pilot_name, loading, perf_outputs, traj, trip)
+                    pdf_bytes = get_report_cache().get_or_build(key, lambda: report_bytes(
+                        build_report(ac, aircraft, registration, mission_number, flight_datetime_no_utc, pilot_name, loading, result, perf_outputs, traj, trip)
+                    ))
+                    st.download_button("Download PDF", pdf_bytes, file_name=pdf_file, mime="application/pdf")
+                    st.success("PDF generated successfully!")
+                    from mission_log import mission_entry
+                    get_mission_log().record(mission_entry(
+                        "report", aircraft, loading, result, registration, mission_number, flight_datetime_no_utc, pilot_name,
+                        aerodromes=[p.get("icao") for p in perf_outputs], file_name=pdf_file,
+                    ))
+                    try:
+                        html_body = f"""
+                        <html>
+                        <body>
+                            <h2>Mass & Balance Report</h2>
+                            <table style='border-collapse:collapse;'>
+                                <tr><th align='left'>Pilot</th><td>{pilot_name}</td></tr>
+                                <tr><th align='left'>Aircraft</th><td>{aircraft} ({registration})</td></tr>
+                                <tr><th align='left'>Mission</th><td>{mission_number}</td></tr>
+                                <tr><th align='left'>Flight (UTC)</th><td>{flight_datetime_no_utc} UTC</td></tr>
+                                <tr><th align='left'>Submitted from</th><td>{WEBSITE_LINK}</td></tr>
+                            </table>
+                            <p style='margin-top:1.5em;'>See attached PDF for details.</p>
+                        </body>
+                        </html>
+                        """
+                        msg_id = get_outbox().enqueue({
+                            "to": ADMIN_EMAIL,
+                            "subject": f"Mass & Balance - {pilot_name.strip()}",
+                            "html": html_body,
+                            "attachments": [{
+                                "content": base64.b64encode(pdf_bytes).decode(),
+                                "type": "application/pdf",
+                                "filename": pdf_file,
+                            }]
+                        }, digest=True)
+                        st.caption(f"Email report: {get_outbox().status(msg_id)['status']}")
+                    except Exception as e:
+                        st.warning(f"PDF generated but failed to queue email: {e}")
+                        print(f"Outbox Exception: {e}")
                 except Exception as e:
-                    st.warning(f"PDF generated but failed to send email: {e}")
-                    print(f"SendGrid Exception: {e}")
-            except Exception as e:
-                st.error(f"PDF generation or email failed: {e}")
-    st.markdown('</div>', unsafe_allow_html=True)
+                    st.error(f"PDF generation or email failed: {e}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# --- DAILY DISPATCH: crews x aircraft ---
+@st.fragment
+def dispatch_fragment():
+    with timed("dispatch"):
+        with st.expander("Daily Dispatch (assign crews to aircraft)", expanded=False):
+            st.caption("Crews CSV: crew, slot, one column per weight input, required_endurance (h). "
+                       "Aircraft CSV: registration, aircraft, ew, ew_moment, burn_rate (L/h); blanks come from the fleet.")
+            dcols = st.columns(2)
+            crews_file = dcols[0].file_uploader("Crews", type=["csv"], key="dispatch_crews")
+            aircraft_file = dcols[1].file_uploader("Aircraft", type=["csv"], key="dispatch_aircraft")
+            dcols = st.columns(3)
+            objective = dcols[0].radio("Maximise", ["Total usable fuel", "Endurance margin"], key="dispatch_objective")
+            objective = "fuel" if objective == "Total usable fuel" else "endurance"
+            burn_rate = dcols[1].number_input("Default burn rate (L/h)", min_value=0.0, value=0.0, step=0.5, key="dispatch_burn")
+            reserve = dcols[2].number_input("Reserve fuel (L)", min_value=0.0, value=0.0, step=1.0, key="dispatch_reserve")
+            if crews_file is None or aircraft_file is None:
+                return
+            from dispatch import FIELDS, assign, load_aircraft, load_crews
+            try:
+                aircraft = load_aircraft(csv.DictReader(io.StringIO(aircraft_file.getvalue().decode("utf-8-sig"))), burn_rate or None)
+                crews = load_crews(csv.DictReader(io.StringIO(crews_file.getvalue().decode("utf-8-sig"))))
+                results, pairs = assign(aircraft, crews, objective, reserve_vol=reserve)
+            except (ValueError, KeyError) as e:
+                st.error(f"Could not assign crews: {e}")
+                return
+            assigned = sum(r["status"] == "assigned" for r in results)
+            st.markdown(f"**{assigned} of {len(crews)} crews assigned** to {len(aircraft)} aircraft.")
+            st.dataframe(results, hide_index=True)
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+            st.download_button("Download assignments (CSV)", out.getvalue(), file_name="assignments.csv", mime="text/csv")
+            if assigned:
+                pcols = st.columns(2)
+                flight_date = pcols[0].date_input("Flight date", key="dispatch_date").isoformat()
+                prepared_by = pcols[1].text_input("Prepared by", key="dispatch_prepared_by")
+
+                def dispatch_pack():
+                    # Built only when the button is clicked; each page goes to the temp file as soon as it is finished
+                    from dispatch import write_pack
+                    f = tempfile.TemporaryFile()
+                    write_pack(f, aircraft, crews, pairs, flight_date=flight_date, pilot_name=prepared_by)
+                    f.seek(0)
+                    return f
+
+                st.download_button(f"Download dispatch pack (PDF, {assigned} reports)", dispatch_pack,
+                                   file_name=f"dispatch_pack_{flight_date}.pdf", mime="application/pdf")
 
 # --- CONTACT AND FOOTER ---
-st.markdown('<div class="footer">Site developed by Alexandre Moiteiro. All rights reserved.</div>', unsafe_allow_html=True)
-with st.expander("Contact / Suggestion / Bug", expanded=False):
-    sug_name = st.text_input("Your name", value="", key="sug_nome_footer")
-    sug_email = st.text_input("Your email (optional)", value="", key="sug_email_footer")
-    sug_msg = st.text_area("Message", height=70, max_chars=900, key="sug_msg_footer")
-    sug_send = st.button("Send message", key="sug_btn_footer")
-    if sug_send:
-        if not sug_msg.strip():
-            st.warning("Please write your message before sending.")
-        else:
-            try:
-                html_body = f"""
-                <html>
-                <body>
-                    <h2>Suggestion, bug, or message via Mass & Balance</h2>
-                    <table style='border-collapse:collapse;'>
-                        <tr><th align='left'>Name</th><td>{sug_name}</td></tr>
-                        <tr><th align='left'>Email</th><td>{sug_email}</td></tr>
-                    </table>
-                    <p style='margin-top:1.2em;'><b>Message:</b><br>{sug_msg}</p>
-                </body>
-                </html>
-                """
-                data = {
-                    "personalizations": [
-                        {
-                            "to": [{"email": ADMIN_EMAIL}],
-                            "subject": "Suggestion/Bug/Contact from Mass & Balance site"
-                        }
-                    ],
-                    "from": {"email": SENDER_EMAIL},
-                    "content": [
-                        {
-                            "type": "text/html",
-                            "value": html_body
-                        }
-                    ]
-                }
-                headers = {
-                    "Authorization": f"Bearer {SENDGRID_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                resp = requests.post("https://api.sendgrid.com/v3/mail/send", data=json.dumps(data), headers=headers)
-                if resp.status_code >= 400:
-                    st.warning(f"Message not sent (check SENDGRID_API_KEY and email settings). Error: {resp.text}")
-                    print(f"SendGrid error: {resp.text}")
+@st.fragment
+def contact_fragment():
+    with timed("contact"):
+        with st.expander("Contact / Suggestion / Bug", expanded=False):
+            sug_name = st.text_input("Your name", value="", key="sug_nome_footer")
+            sug_email = st.text_input("Your email (optional)", value="", key="sug_email_footer")
+            sug_msg = st.text_area("Message", height=70, max_chars=900, key="sug_msg_footer")
+            sug_send = st.button("Send message", key="sug_btn_footer")
+            if sug_send:
+                if not sug_msg.strip():
+                    st.warning("Please write your message before sending.")
                 else:
-                    st.success("Message sent successfully. Thank you for your feedback.")
-            except Exception as e:
-                st.warning(f"Failed to send message: {e}")
-                print(f"SendGrid Exception: {e}")
-
-
-
+                    try:
+                        html_body = f"""
+                        <html>
+                        <body>
+                            <h2>Suggestion, bug, or message via Mass & Balance</h2>
+                            <table style='border-collapse:collapse;'>
+                                <tr><th align='left'>Name</th><td>{sug_name}</td></tr>
+                                <tr><th align='left'>Email</th><td>{sug_email}</td></tr>
+                            </table>
+                            <p style='margin-top:1.2em;'><b>Message:</b><br>{sug_msg}</p>
+                        </body>
+                        </html>
+                        """
+                        msg_id = get_outbox().enqueue({
+                            "to": ADMIN_EMAIL,
+                            "subject": "Suggestion/Bug/Contact from Mass & Balance site",
+                            "html": html_body,
+                        })
+                        st.success(f"Message {get_outbox().status(msg_id)['status']}. Thank you for your feedback.")
+                    except Exception as e:
+                        st.warning(f"Failed to queue message: {e}")
+                        print(f"Outbox Exception: {e}")
+
+with timed("app"):
+    st.markdown('<div class="mb-header">Mass & Balance Planner</div>', unsafe_allow_html=True)
+    aircraft, ac = aircraft_section()
+    weights_fragment(aircraft, ac)
+    aerodromes_fragment(ac)
+    pdf_fragment(aircraft, ac)
+    dispatch_fragment()
+    st.markdown('<div class="footer">Site developed by Alexandre Moiteiro. All rights reserved.</div>', unsafe_allow_html=True)
+    contact_fragment()
@@ -0,0 +1,280 @@
+"""Generate mass & balance reports for a whole schedule from the command line.
+
+    python mission_batch.py schedule.csv -o reports/ -j 8
+
+The schedule is a CSV or Parquet file (Parquet needs the optional pyarrow)
+with one mission per row and the columns aircraft, registration,
+mission_number, flight_datetime, pilot_name, ew and ew_moment (blank = taken
+from the fleet registry), one column per station input key of the aircraft
+type in fleet.json (student, instructor, bag1 for the P2008), fuel_vol
+(blank = automatic maximum fuel), category (CG envelope, blank = the type's
+first), aerodromes ("ICAO:elev_ft:qnh:temp" entries separated by ";", blank
+elevation = from aerodromes.csv, required for an aerodrome that is not in
+it; a fifth ":burn_L" field on later entries makes a multi-leg trip) and optionally burn_rate (L/h), flight_time (h) and
+reserve_vol (L) to add the fuel burn trajectory.
+A manifest.csv with the status and alerts of every mission, in schedule
+order, is written next to the PDFs (mission numbers repeated in the schedule
+get the row number in their file name); --log missions.sqlite3 also appends every report to the mission
+log (see mission_log.py).
+
+    python mission_batch.py schedule.csv -o reports/ --pack dispatch.pdf
+
+writes one dispatch pack instead of a PDF per mission (see report_pack.py):
+the workers do the calculations and this process adds the pages in schedule
+order, each written to reports/dispatch.pdf as soon as it is finished.
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from aerodromes import default_aerodromes
+from fleet import default_fleet
+from engine import aircraft_data, Loading, compute_mass_balance, aerodromes_performance
+from mission_log import MissionLog, mission_entry
+from stations import station_table
+from trajectory import fuel_trajectory
+from trip import TripPlanner, trip_alerts
+
+MANIFEST_FIELDS = ["row", "mission_number", "registration", "status", "fuel_limit_by", "alerts", "output", "error"]
+
+def iter_schedule(path):
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet schedules need pyarrow (pip install pyarrow); CSV works without it") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=1024):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+def _num(row, key, default=0.0):
+    val = row.get(key)
+    if val is None or (isinstance(val, str) and not val.strip()):
+        return default
+    val = float(val)
+    if not math.isfinite(val):
+        raise ValueError(f"{key} must be a finite number, not {row.get(key)!r}")
+    return val
+
+def _field(value, name, default):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a number, not {value!r}")
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, not {value!r}") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number, not {value!r}")
+    return value
+
+def aerodrome_entry(icao, elev_ft=None, qnh=None, temp=None, burn_vol=None):
+    """One aerodrome dict; blank fields take their defaults, a blank elevation comes from the database."""
+    if icao is not None and not isinstance(icao, str):
+        raise ValueError(f"icao must be a string, not {icao!r}")
+    icao = (icao or "").strip().upper()
+    rec = default_aerodromes().get(icao)
+    elev = _field(elev_ft, "elev_ft", rec["elev_ft"] if rec else None)
+    if elev is None:
+        raise ValueError(f"elevation required for unknown aerodrome {icao or '(no ICAO)'}")
+    return {
+        "icao": icao,
+        "elev_ft": elev,
+        "qnh": _field(qnh, "qnh", 1013.0),
+        "temp": _field(temp, "temp", 15.0),
+        "runways": rec["runways"] if rec else [],
+        "burn_vol": _field(burn_vol, "burn_vol", 0.0),
+    }
+
+def parse_aerodromes(value):
+    """Aerodrome dicts from the schedule's "ICAO:elev_ft:qnh:temp[:burn_L]" entries separated by ";"."""
+    aerodromes = []
+    for entry in (value or "").split(";"):
+        if not entry.strip():
+            continue
+        aerodromes.append(aerodrome_entry(*(entry.split(":") + ["", "", "", "", ""])[:5]))
+    return aerodromes
+
+def mission_loading(row):
+    """(aircraft, ac, loading) for one schedule row."""
+    aircraft = str(row.get("aircraft") or "").strip() or next(iter(aircraft_data))
+    if aircraft not in aircraft_data:
+        raise ValueError(f"Unknown aircraft type: {aircraft}")
+    ac = aircraft_data[aircraft]
+    # Blank empty weight/moment fall back to the fleet registry record
+    registration = str(row.get("registration") or "").strip()
+    record = default_fleet().get(registration) if registration else None
+    loading = Loading(
+        ew=_num(row, "ew", record["empty_weight"] if record else 0.0),
+        ew_moment=_num(row, "ew_moment", record["empty_moment"] if record else 0.0),
+        payload={key: _num(row, key) for key in station_table(ac).input_keys},
+        fuel_vol=_num(row, "fuel_vol", None),
+        category=str(row.get("category") or "").strip() or None,
+    )
+    return aircraft, ac, loading
+
+def prepare_mission(row):
+    """Every calculation one schedule row's report needs, as a dict.
+
+    Keys: aircraft, ac, loading, result, aerodromes, perf_outputs, trip,
+    traj, alerts (the mission's alerts, de-duplicated), flight_datetime and
+    pilot_name.
+    """
+    aircraft, ac, loading = mission_loading(row)
+    result = compute_mass_balance(ac, loading)
+    aerodromes = row.get("aerodromes")
+    # A schedule has the aerodromes as a string; the service passes them already parsed
+    if not isinstance(aerodromes, list):
+        aerodromes = parse_aerodromes(str(aerodromes or ""))
+    perf_outputs = aerodromes_performance(aerodromes, ac, result.total_weight)
+    alerts = list(result.alert_list)
+    trip = TripPlanner(ac).update(loading, aerodromes) if len(aerodromes) > 1 else None
+    if trip:
+        alerts += trip_alerts(trip)
+    traj = None
+    burn_rate, flight_time = _num(row, "burn_rate"), _num(row, "flight_time")
+    if burn_rate > 0 and flight_time > 0:
+        traj = fuel_trajectory(ac, loading, result, burn_rate, flight_time, _num(row, "reserve_vol"))
+        if traj.outside_from is not None:
+            alerts.append(f"CG outside the envelope from {traj.outside_from:.2f} h.")
+    return {
+        "aircraft": aircraft, "ac": ac, "loading": loading, "result": result,
+        "aerodromes": aerodromes, "perf_outputs": perf_outputs, "trip": trip, "traj": traj,
+        "alerts": list(dict.fromkeys(alerts)),
+        "flight_datetime": str(row.get("flight_datetime") or "").replace(" UTC", "").strip(),
+        "pilot_name": str(row.get("pilot_name") or "").strip(),
+    }
+
+def process_mission(index, row, out_dir, pack=None, file_name=None):
+    entry = {
+        "row": index,
+        "mission_number": str(row.get("mission_number") or "").strip(),
+        "registration": str(row.get("registration") or "").strip(),
+        "status": "ok",
+        "fuel_limit_by": "",
+        "alerts": "",
+        "output": "",
+        "error": "",
+    }
+    try:
+        from report import build_report, report_bytes, report_filename
+        m = prepare_mission(row)
+        result = m["result"]
+        entry["fuel_limit_by"] = result.fuel_limit_by
+        entry["alerts"] = " | ".join(m["alerts"])
+        if m["alerts"]:
+            entry["status"] = "alert"
+        report = (
+            m["aircraft"], entry["registration"], entry["mission_number"],
+            m["flight_datetime"], m["pilot_name"],
+            m["loading"], result, m["perf_outputs"], m["traj"], m["trip"],
+        )
+        if pack:
+            # Drawn into the pack by the parent, in schedule order
+            out_file = Path(out_dir) / pack
+            entry["report"] = report
+        else:
+            out_file = Path(out_dir) / (file_name or report_filename(entry['mission_number'] or index))
+            report_bytes(build_report(m["ac"], *report), path=out_file)
+            entry["output"] = str(out_file)
+        entry["log"] = mission_entry(
+            "report", m["aircraft"], m["loading"], result, entry["registration"], entry["mission_number"],
+            str(row.get("flight_datetime") or ""), m["pilot_name"],
+            aerodromes=[a["icao"] for a in m["aerodromes"]], file_name=out_file.name,
+        )
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    return entry
+
+def _unique_file_name(row, index, used):
+    """Report file name for a row; a mission number seen before gets the row number too."""
+    from report import report_filename
+    mission_number = str(row.get("mission_number") or "").strip()
+    name = report_filename(mission_number or index)
+    suffix = 0
+    while name in used:
+        suffix += 1
+        name = report_filename(f"{mission_number}_row{index}" + (f"_{suffix}" if suffix > 1 else ""))
+    used.add(name)
+    return name
+
+def run(schedule, out_dir, workers=None, max_pending=None, log=None, pack=None):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    counts = {"ok": 0, "alert": 0, "failed": 0}
+    report_pack = None
+    if pack:
+        from report_pack import ReportPack
+        report_pack = ReportPack(out_dir / pack, title=f"Dispatch pack {Path(schedule).stem}")
+    with open(out_dir / "manifest.csv", "w", newline="", encoding="utf-8") as mf, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(mf, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        pending = set()
+        ready = {}
+        next_row = 1
+        file_names = set()
+
+        def finish(entry):
+            report = entry.pop("report", None)
+            if report is not None:
+                entry["output"] = f"{out_dir / pack}#page={report_pack.pages + 1}"
+                report_pack.add(aircraft_data[report[0]], *report)
+            # Reports are logged from this process: workers never open the log
+            log_entry = entry.pop("log", None)
+            if log is not None and log_entry is not None:
+                log.record(log_entry)
+            counts[entry["status"]] += 1
+            writer.writerow(entry)
+
+        def record(done):
+            nonlocal next_row
+            for fut in done:
+                entry = fut.result()
+                ready[entry["row"]] = entry
+            # Manifest rows (and pack pages) go in schedule order, whatever order the workers finish in
+            while next_row in ready:
+                finish(ready.pop(next_row))
+                next_row += 1
+
+        # Keep a bounded window of missions in flight so memory stays flat,
+        # including finished missions waiting for an earlier row
+        for index, row in enumerate(iter_schedule(schedule), start=1):
+            file_name = None if pack else _unique_file_name(row, index, file_names)
+            pending.add(pool.submit(process_mission, index, row, str(out_dir), pack, file_name))
+            while len(pending) + len(ready) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                record(done)
+        record(wait(pending).done)
+    if report_pack is not None:
+        report_pack.close()
+    if log is not None:
+        log.flush()
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate mass & balance PDFs for a mission schedule.")
+    parser.add_argument("schedule", help="CSV or Parquet schedule file")
+    parser.add_argument("-o", "--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--log", default=None, help="also append every report to this mission log database")
+    parser.add_argument("--pack", default=None, help="write one dispatch pack PDF with this name instead of a PDF per mission")
+    args = parser.parse_args(argv)
+    counts = run(args.schedule, args.out, workers=args.jobs, log=MissionLog(args.log) if args.log else None, pack=args.pack)
+    print(f"{sum(counts.values())} missions: {counts['ok']} ok, {counts['alert']} with alerts, {counts['failed']} failed")
+    print(f"Manifest: {Path(args.out) / 'manifest.csv'}")
+    return 1 if counts["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
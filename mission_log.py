@@ -0,0 +1,329 @@
+"""Append-only log of every calculation and generated report.
+
+Entries go into a local SQLite database in WAL mode. record() only puts the
+entry on an in-memory queue. A writer thread drains that queue in batches,
+one transaction per batch, so a Streamlit rerun never waits on the disk.
+A batch that cannot be written because another connection holds the
+database (locked or busy) is retried with a doubling delay, up to
+MAX_RETRIES times. A batch still locked after that, and rows SQLite refuses
+for any other reason, are appended to <path>.rejected.jsonl, so no entry is
+ever lost without a trace.
+Rows are never updated or deleted (triggers refuse it). The columns that get
+queried have indexes: registration, pilot, mission number and flight date.
+
+    python mission_log.py export -o 2026.csv --from 2026-01-01 --to 2026-12-31
+    python mission_log.py export --format jsonl --registration CS-XXX
+
+Exports stream from a cursor in chunks, so a year of missions never has to
+fit in memory.
+"""
+import argparse
+import csv
+import datetime
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+KINDS = ("calculation", "report")
+COLUMNS = ["id", "kind", "created_at", "aircraft", "registration", "pilot", "mission_number",
+           "flight_date", "flight_datetime", "total_weight", "cg", "fuel_vol", "fuel_limit_by",
+           "alerts", "data"]
+# Filters accepted by rows()/export(): column and comparison
+FILTERS = {
+    "kind": "kind = ?",
+    "registration": "registration = ?",
+    "pilot": "pilot = ?",
+    "mission_number": "mission_number = ?",
+    "date_from": "flight_date >= ?",
+    "date_to": "flight_date <= ?",
+}
+DEFAULT_PATH = "missions.sqlite3"
+MAX_RETRY_DELAY = 30.0
+MAX_RETRIES = 6
+
+log = logging.getLogger(__name__)
+
+def _locked(error):
+    """Whether an OperationalError only means another connection holds the database."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (5, 6)  # SQLITE_BUSY, SQLITE_LOCKED
+    return "locked" in str(error) or "busy" in str(error)
+
+def mission_entry(kind, aircraft, loading, result, registration=None, mission_number=None,
+                  flight_datetime=None, pilot=None, **extra):
+    """Log entry for one loading and its MBResult; extra goes into the JSON data column."""
+    flight_datetime = (flight_datetime or "").replace(" UTC", "").strip()
+    try:
+        flight_date = datetime.date.fromisoformat(flight_datetime[:10]).isoformat()
+    except ValueError:
+        flight_date = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    return {
+        "kind": kind,
+        "created_at": time.time(),
+        "aircraft": aircraft,
+        "registration": (registration or "").strip().upper() or None,
+        "pilot": (pilot or "").strip() or None,
+        "mission_number": (mission_number or "").strip() or None,
+        "flight_date": flight_date,
+        "flight_datetime": flight_datetime or None,
+        "total_weight": result.total_weight,
+        "cg": result.cg,
+        "fuel_vol": result.fuel_vol,
+        "fuel_limit_by": result.fuel_limit_by,
+        "alerts": " | ".join(result.alert_list),
+        "data": json.dumps(dict(
+            {"ew": loading.ew, "ew_moment": loading.ew_moment, "payload": loading.payload,
+             "fuel_vol": loading.fuel_vol, "category": loading.category}, **extra), default=str),
+    }
+
+class MissionLog:
+    def __init__(self, path=DEFAULT_PATH, batch_size=500, flush_interval=0.5):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.written = 0
+        self.rejected = 0
+        self.rejected_path = self.path + ".rejected.jsonl"
+        db = self._connect()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS missions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                aircraft TEXT,
+                registration TEXT,
+                pilot TEXT,
+                mission_number TEXT,
+                flight_date TEXT NOT NULL,
+                flight_datetime TEXT,
+                total_weight REAL,
+                cg REAL,
+                fuel_vol REAL,
+                fuel_limit_by TEXT,
+                alerts TEXT,
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS missions_registration ON missions (registration, flight_date);
+            CREATE INDEX IF NOT EXISTS missions_pilot ON missions (pilot, flight_date);
+            CREATE INDEX IF NOT EXISTS missions_mission_number ON missions (mission_number);
+            CREATE INDEX IF NOT EXISTS missions_flight_date ON missions (flight_date);
+            CREATE TRIGGER IF NOT EXISTS missions_no_update BEFORE UPDATE ON missions
+                BEGIN SELECT RAISE(ABORT, 'mission log is append-only'); END;
+            CREATE TRIGGER IF NOT EXISTS missions_no_delete BEFORE DELETE ON missions
+                BEGIN SELECT RAISE(ABORT, 'mission log is append-only'); END;
+        """)
+        db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+
+    # --- writing ---
+
+    def record(self, entry):
+        """Queue one entry (see mission_entry()); returns immediately."""
+        if entry.get("kind") not in KINDS:
+            raise ValueError(f"Unknown mission log kind: {entry.get('kind')!r}")
+        with self._idle:
+            self._pending += 1
+        self._queue.put(entry)
+        self.start()
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mb-mission-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        db = self._connect()
+        db.execute("PRAGMA synchronous=NORMAL")
+        columns = COLUMNS[1:]
+        sql = f"INSERT INTO missions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        while True:
+            batch = [self._queue.get()]
+            # Gather whatever else arrives shortly after, up to batch_size rows per transaction
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [tuple(e.get(c) for c in columns) for e in batch]
+            delay = self.flush_interval
+            for attempt in range(MAX_RETRIES + 1):
+                try:
+                    self._insert(db, sql, rows)
+                    self.written += len(rows)
+                    break
+                except sqlite3.OperationalError as e:
+                    if not _locked(e):
+                        log.exception("Mission log batch refused, writing its %d rows one by one", len(rows))
+                        self._insert_each(db, sql, batch, rows)
+                        break
+                    if attempt == MAX_RETRIES:
+                        log.error("Mission log still locked after %d retries, %d rows kept in %s: %s",
+                                  MAX_RETRIES, len(rows), self.rejected_path, e)
+                        self._reject(batch, e)
+                        break
+                    # Another connection holds the database: keep the batch and try again
+                    log.warning("Mission log locked, retrying in %.1f s: %s", delay, e)
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                except Exception:
+                    log.exception("Mission log batch refused, writing its %d rows one by one", len(rows))
+                    self._insert_each(db, sql, batch, rows)
+                    break
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    @staticmethod
+    def _insert(db, sql, rows):
+        # The connection is in autocommit mode: one explicit transaction per batch
+        db.execute("BEGIN")
+        try:
+            db.executemany(sql, rows)
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+
+    def _insert_each(self, db, sql, batch, rows):
+        for entry, row in zip(batch, rows):
+            try:
+                self._insert(db, sql, [row])
+                self.written += 1
+            except Exception as e:
+                log.error("Mission log entry rejected, kept in %s: %s", self.rejected_path, e)
+                self._reject([entry], e)
+
+    def _reject(self, entries, error):
+        with open(self.rejected_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(dict(entry, error=str(error)), default=str) + "\n")
+        self.rejected += len(entries)
+
+    def flush(self, timeout=None):
+        """Wait until every queued entry is written; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    # --- reading ---
+
+    def _where(self, filters):
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}")
+        active = [(FILTERS[k], v) for k, v in filters.items() if v not in (None, "")]
+        if not active:
+            return "", ()
+        return " WHERE " + " AND ".join(sql for sql, _ in active), tuple(v for _, v in active)
+
+    def _chunks(self, chunk_size, filters):
+        where, params = self._where(filters)
+        db = self._connect()
+        try:
+            cur = db.execute(f"SELECT {', '.join(COLUMNS)} FROM missions{where} ORDER BY flight_date, id", params)
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            db.close()
+
+    def rows(self, chunk_size=1000, **filters):
+        """Matching rows as dicts, by flight date, fetched chunk_size at a time."""
+        for chunk in self._chunks(chunk_size, filters):
+            for row in chunk:
+                yield dict(zip(COLUMNS, row))
+
+    def query(self, limit=100, **filters):
+        """Most recent matching rows (newest first), at most limit."""
+        where, params = self._where(filters)
+        db = self._connect()
+        try:
+            cur = db.execute(f"SELECT {', '.join(COLUMNS)} FROM missions{where} ORDER BY id DESC LIMIT ?", params + (limit,))
+            return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+        finally:
+            db.close()
+
+    def export(self, out, fmt="csv", **filters):
+        """Write matching rows to the text file object out as CSV or JSONL; returns the row count."""
+        count = 0
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(COLUMNS)
+            for chunk in self._chunks(1000, filters):
+                writer.writerows(chunk)
+                count += len(chunk)
+        elif fmt == "jsonl":
+            for row in self.rows(**filters):
+                row["data"] = json.loads(row["data"]) if row["data"] else None
+                out.write(json.dumps(row) + "\n")
+                count += 1
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+        return count
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_log():
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = MissionLog(os.environ.get("MB_MISSION_LOG_PATH") or DEFAULT_PATH)
+    return _default
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or export the mission log.")
+    parser.add_argument("command", choices=("export", "query"))
+    parser.add_argument("--db", default=os.environ.get("MB_MISSION_LOG_PATH") or DEFAULT_PATH, help="log database")
+    parser.add_argument("-o", "--out", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--kind", choices=KINDS)
+    parser.add_argument("--registration")
+    parser.add_argument("--pilot")
+    parser.add_argument("--mission-number")
+    parser.add_argument("--from", dest="date_from", help="first flight date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last flight date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=20, help="rows for query (default: 20)")
+    args = parser.parse_args(argv)
+    log = MissionLog(args.db)
+    filters = {k: getattr(args, k) for k in ("kind", "registration", "pilot", "mission_number", "date_from", "date_to")}
+    if filters["registration"]:
+        filters["registration"] = filters["registration"].upper()
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="", encoding="utf-8")
+    try:
+        if args.command == "query":
+            for row in log.query(limit=args.limit, **filters):
+                row.pop("data")
+                out.write(json.dumps(row) + "\n")
+        else:
+            count = log.export(out, args.format, **filters)
+            if out is not sys.stdout:
+                print(f"{count} missions exported to {args.out}")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Persistent background email outbox.
+
+Messages are stored in a local SQLite queue and sent by a worker thread, so
+the Streamlit rerun only pays for an INSERT. A message is a dict:
+
+    {"to": "...", "subject": "...", "html": "...",
+     "attachments": [{"filename": "...", "content": "<base64>", "type": "application/pdf"}]}
+
+Any object with a send(message) method can be the transport; SendGridTransport
+is the production one and takes a base_url so it can point at a local
+stand-in server.
+
+Attachment contents are stored once per SHA-256, so the same report queued
+several times (or twice in one digest) is only kept and sent once. Held
+messages are digested per recipient: a digest only ever bundles messages
+that were addressed to its own "to".
+"""
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+
+class TransientError(Exception):
+    """Delivery failed but may succeed later (network, 429, 5xx)."""
+
+class PermanentError(Exception):
+    """Delivery failed and retrying will not help (other 4xx)."""
+
+class SendGridTransport:
+    def __init__(self, api_key, sender, base_url="https://api.sendgrid.com", timeout=10.0, pool_size=4):
+        self.api_key = api_key
+        self.sender = sender
+        self.url = base_url.rstrip("/") + "/v3/mail/send"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            })
+            self._session = session
+        return self._session
+
+    def payload(self, message):
+        data = {
+            "personalizations": [
+                {
+                    "to": [{"email": message["to"]}],
+                    "subject": message["subject"]
+                }
+            ],
+            "from": {"email": self.sender},
+            "content": [
+                {
+                    "type": "text/html",
+                    "value": message["html"]
+                }
+            ]
+        }
+        if message.get("attachments"):
+            data["attachments"] = [{
+                "content": a["content"],
+                "type": a.get("type", "application/pdf"),
+                "filename": a["filename"],
+                "disposition": "attachment"
+            } for a in message["attachments"]]
+        return data
+
+    def send(self, message):
+        import requests
+        try:
+            resp = self.session.post(self.url, data=json.dumps(self.payload(message)), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise TransientError(str(e)) from e
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise TransientError(f"HTTP {resp.status_code}: {resp.text}")
+        if resp.status_code >= 400:
+            raise PermanentError(f"HTTP {resp.status_code}: {resp.text}")
+
+class Outbox:
+    """SQLite-backed queue with a single sender thread.
+
+    Status values: held (waiting for a digest), queued, sent, failed, digested
+    (bundled into another message, see digest_id).
+    """
+
+    def __init__(self, path, transport, max_attempts=5, backoff=2.0, max_backoff=300.0,
+                 digest_interval=None, digest_size=10, poll_interval=1.0):
+        self.transport = transport
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.digest_interval = digest_interval
+        self.digest_size = digest_size
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                digest_id INTEGER,
+                last_error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS attachments (
+                sha256 TEXT PRIMARY KEY,
+                content TEXT NOT NULL
+            )
+        """)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _store_attachments(self, message):
+        refs = []
+        for a in message.get("attachments", []):
+            ref = {k: v for k, v in a.items() if k != "content"}
+            if "content" in a:
+                ref["sha256"] = hashlib.sha256(a["content"].encode("ascii")).hexdigest()
+                self._db.execute("INSERT OR IGNORE INTO attachments (sha256, content) VALUES (?, ?)",
+                                 (ref["sha256"], a["content"]))
+            refs.append(ref)
+        return dict(message, attachments=refs) if refs else message
+
+    def _load_attachments(self, message):
+        if not message.get("attachments"):
+            return message
+        resolved = []
+        for ref in message["attachments"]:
+            rows = self._execute("SELECT content FROM attachments WHERE sha256 = ?", (ref["sha256"],))
+            resolved.append(dict({k: v for k, v in ref.items() if k != "sha256"}, content=rows[0][0]))
+        return dict(message, attachments=resolved)
+
+    def enqueue(self, message, digest=False):
+        """Store a message and wake the worker. Returns the message id."""
+        now = time.time()
+        status = "held" if digest and self.digest_interval else "queued"
+        with self._lock:
+            message = self._store_attachments(message)
+            cur = self._db.execute(
+                "INSERT INTO outbox (message, status, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (json.dumps(message), status, now, now),
+            )
+            msg_id = cur.lastrowid
+        self.start()
+        self._wake.set()
+        return msg_id
+
+    def status(self, msg_id):
+        rows = self._execute("SELECT status, digest_id, last_error FROM outbox WHERE id = ?", (msg_id,))
+        if not rows:
+            return None
+        status, digest_id, last_error = rows[0]
+        if status == "digested" and digest_id is not None:
+            return self.status(digest_id)
+        return {"status": status, "error": last_error}
+
+    def counts(self):
+        return dict(self._execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="mb-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.flush_digest()
+                self.process_due()
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def flush_digest(self, force=False):
+        """Bundle held messages into one digest per recipient when it is due; returns the digest ids."""
+        if not self.digest_interval:
+            return []
+        held = self._execute("SELECT id, message, created_at FROM outbox WHERE status = 'held' ORDER BY id")
+        by_recipient = {}
+        for msg_id, message, created_at in held:
+            message = json.loads(message)
+            by_recipient.setdefault(message["to"], []).append((msg_id, message, created_at))
+        now = time.time()
+        digest_ids = []
+        for to, group in by_recipient.items():
+            due = force or len(group) >= self.digest_size or now - group[0][2] >= self.digest_interval
+            if not due:
+                continue
+            messages = [m for _, m, _ in group]
+            attachments = {}
+            for m in messages:
+                for a in m.get("attachments", []):
+                    attachments.setdefault(a["sha256"], a)
+            digest = {
+                "to": to,
+                "subject": f"Mass & Balance - {len(messages)} reports",
+                "html": "<hr>".join(m["html"] for m in messages),
+                "attachments": list(attachments.values()),
+            }
+            with self._lock:
+                self._db.execute("BEGIN")
+                cur = self._db.execute(
+                    "INSERT INTO outbox (message, status, next_attempt_at, created_at) VALUES (?, 'queued', ?, ?)",
+                    (json.dumps(digest), now, now),
+                )
+                digest_id = cur.lastrowid
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'digested', digest_id = ? WHERE id = ?",
+                    [(digest_id, msg_id) for msg_id, _, _ in group],
+                )
+                self._db.execute("COMMIT")
+            digest_ids.append(digest_id)
+        return digest_ids
+
+    def process_due(self, limit=20):
+        rows = self._execute(
+            "SELECT id, message, attempts FROM outbox WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit),
+        )
+        for msg_id, message, attempts in rows:
+            if self._stop.is_set():
+                break
+            try:
+                self.transport.send(self._load_attachments(json.loads(message)))
+            except TransientError as e:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    self._execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                                  (attempts, str(e), msg_id))
+                else:
+                    delay = min(self.max_backoff, self.backoff ** attempts) * random.uniform(0.8, 1.2)
+                    self._execute("UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                                  (attempts, time.time() + delay, str(e), msg_id))
+            except Exception as e:
+                self._execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                              (attempts + 1, str(e), msg_id))
+            else:
+                self._execute("UPDATE outbox SET status = 'sent', attempts = ?, last_error = NULL WHERE id = ?",
+                              (attempts + 1, msg_id))
+        return len(rows)
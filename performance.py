@@ -0,0 +1,95 @@
+"""POH takeoff and landing performance tables.
+
+A type in fleet.json may carry tables transcribed from its POH, indexed by
+pressure altitude (ft), outside air temperature (°C) and mass:
+
+    "performance": {
+      "takeoff": {
+        "label": "Takeoff distance (50 ft obstacle)", "unit": "m",
+        "pressure_altitude": [0, 2000, 4000],
+        "temperature": [-10, 0, 15, 30],
+        "mass": [550, 650],
+        "values": [[[...per mass...] ...per temperature...] ...per pressure altitude...]
+      },
+      "landing": {...}
+    }
+
+A table is compiled once per type into a value grid plus per-axis cell
+widths, and evaluated by trilinear interpolation for whole arrays of
+conditions in one call. Points outside the table come back as NaN: POH data
+is never extrapolated. The exceptions are a mass below the lightest column
+and a pressure altitude below the lowest row (normal at sea level with a
+high QNH), which read that column or row: heavier and higher are the
+conservative sides. Types without tables simply have no distances.
+"""
+import threading
+
+import numpy as np
+
+AXES = ("pressure_altitude", "temperature", "mass")
+
+class PerformanceTable:
+    def __init__(self, name, spec):
+        self.name = name
+        self.label = spec.get("label", name)
+        self.unit = spec.get("unit", "m")
+        self.axes = [np.asarray(spec[axis], dtype=float) for axis in AXES]
+        self.values = np.ascontiguousarray(spec["values"], dtype=float)
+        shape = tuple(len(a) for a in self.axes)
+        if self.values.shape != shape:
+            raise ValueError(f"Performance table {name!r}: values shape {self.values.shape} does not match axes {shape}")
+        for axis, a in zip(AXES, self.axes):
+            if len(a) > 1 and np.any(np.diff(a) <= 0):
+                raise ValueError(f"Performance table {name!r}: {axis} must be increasing")
+        # Cell widths per axis (1.0 for single-point axes so they never divide by zero)
+        self._widths = [np.diff(a) if len(a) > 1 else np.ones(1) for a in self.axes]
+
+    def _locate(self, axis, x):
+        a = self.axes[axis]
+        # Lighter or lower than the table reads its first column or row
+        if AXES[axis] in ("mass", "pressure_altitude"):
+            x = np.maximum(x, a[0])
+        if len(a) == 1:
+            return np.zeros(x.shape, dtype=np.intp), np.zeros(x.shape), x == a[0]
+        i = np.clip(np.searchsorted(a, x, side="right") - 1, 0, len(a) - 2)
+        frac = (x - a[i]) / self._widths[axis][i]
+        return i, frac, (x >= a[0]) & (x <= a[-1])
+
+    def __call__(self, pa_ft, temp, mass):
+        pa_ft, temp, mass = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (pa_ft, temp, mass)))
+        located = [self._locate(n, x) for n, x in enumerate((pa_ft, temp, mass))]
+        valid = located[0][2] & located[1][2] & located[2][2]
+        out = np.zeros(pa_ft.shape)
+        # Sum of the 2**3 cell corners weighted by their trilinear weights
+        for corner in range(8):
+            idx, weight = [], np.ones(pa_ft.shape)
+            for n, (i, frac, _) in enumerate(located):
+                upper = (corner >> n) & 1
+                if len(self.axes[n]) == 1:
+                    if upper:
+                        weight = weight * 0.0
+                    idx.append(i)
+                    continue
+                idx.append(i + upper)
+                weight = weight * (frac if upper else 1.0 - frac)
+            out += weight * self.values[tuple(idx)]
+        return np.where(valid, out, np.nan)
+
+def _build(ac):
+    return {name: PerformanceTable(name, spec) for name, spec in (ac.get("performance") or {}).items()}
+
+_tables = {}
+_lock = threading.Lock()
+
+def performance_tables(ac):
+    """{name: PerformanceTable} for a type dict, built once per dict object."""
+    entry = _tables.get(id(ac))
+    if entry is None or entry[0] is not ac:
+        with _lock:
+            entry = (ac, _build(ac))
+            _tables[id(ac)] = entry
+    return entry[1]
+
+def distances(ac, pa_ft, temp, mass):
+    """{table name: distances} for arrays of conditions, one vectorized call per table."""
+    return {name: table(pa_ft, temp, mass) for name, table in performance_tables(ac).items()}
@@ -0,0 +1,165 @@
+"""HTML for the results panels, built as one payload per panel.
+
+Templates are compiled once at import. Anything that can come from a user
+(ICAO codes, names, free text) goes through html.escape before it is
+substituted.
+"""
+from html import escape
+from string import Template
+
+from envelope import get_envelope
+from limits import limit_rules
+from stations import station_table
+from trip import trip_alerts
+
+SUMMARY_ROW = Template(
+    '<div class="mb-summary-row"><div class="mb-summary-label">$label</div>'
+    '<div class="mb-summary-val $css">$value</div></div>'
+)
+FUEL_VALUE = Template(
+    '$vol L / $weight $unit<span style="color:#8c8c8c;font-size:0.97em;"> &nbsp;($limit)</span>'
+)
+ALERT = Template('<div class="mb-alert">$text</div>')
+TABLE_HEADER = Template(
+    '<tr><th>Item</th><th>Weight ($wt)</th><th>Arm ($arm)</th><th>Moment ($wt·$arm)</th></tr>'
+)
+TABLE_ROW = Template('<tr><td>$item</td><td>$weight</td><td>$arm</td><td>$moment</td></tr>')
+RESULTS_PANEL = Template(
+    '<div class="mb-section">'
+    '<div class="section-title">Calculation Summary</div>'
+    '<div class="mb-summary">$summary</div>'
+    '$alerts'
+    '<div style="height:10px;"></div>'
+    '<div class="section-title" style="margin-bottom:9px;">Mass & Balance Table</div>'
+    '$table'
+    '</div>'
+)
+TRIP_HEADER = Template(
+    '<tr><th>Stop</th><th>Leg burn (L)</th><th>Fuel (L)</th><th>Weight ($wt)</th><th>CG ($arm)</th><th>Distances</th></tr>'
+)
+TRIP_ROW = Template(
+    '<tr><td>$stop</td><td>$burn</td><td>$fuel</td><td><span class="$wt_css">$weight</span></td>'
+    '<td><span class="$cg_css">$cg</span></td><td>$dist</td></tr>'
+)
+TRAJECTORY = Template('<div class="mb-summary">$rows</div>$alerts')
+AERODROME = Template(
+    '<div class="mb-summary">$rows'
+    '<div style="margin-top:7px; margin-bottom:7px;">'
+    '<b>Pressure Altitude (PA):</b> $pa ft<br>'
+    '<b>Density Altitude (DA):</b> $da ft'
+    '</div>$distances</div>'
+)
+
+def summary_row(label, value, css=""):
+    return SUMMARY_ROW.substitute(label=escape(label), value=value, css=css)
+
+def fuel_limit_word(fuel_limit_by):
+    if fuel_limit_by in ("Tank Capacity", "Maximum Weight", "CG Envelope"):
+        return f"Limited by: {fuel_limit_by}"
+    elif fuel_limit_by == "Manual Entry":
+        return "Manual Entry"
+    return fuel_limit_by
+
+def mb_table(items, units_wt, units_arm):
+    rows = "".join(
+        TABLE_ROW.substitute(item=escape(str(i[0])), weight=f"{i[1]:.2f}", arm=f"{i[2]:.3f}", moment=f"{i[3]:.2f}")
+        for i in items
+    )
+    return '<table class="mb-table">' + TABLE_HEADER.substitute(wt=escape(units_wt), arm=escape(units_arm)) + rows + "</table>"
+
+def seat_summary_rows(ac, loading, result):
+    table = station_table(ac)
+    units_wt = ac['units']['weight']
+    rows = []
+    for idx, inputs in table.seat_rows():
+        weight = result.station_weights[idx]
+        rows.append(summary_row(table.summary_labels[idx], f"{weight:.2f} {units_wt}", result.status(f"station:{table.names[idx]}")))
+        if len(inputs) > 1:
+            rows += [summary_row(f" - {label}", f"{float(loading.payload.get(key, 0.0)):.2f} {units_wt}") for key, label in inputs]
+    return rows
+
+def render_results_panel(ac, loading, result):
+    units_wt = ac['units']['weight']
+    units_arm = ac['units']['arm']
+    fuel = FUEL_VALUE.substitute(
+        vol=f"{result.fuel_vol:.1f}", weight=f"{result.fuel_weight:.1f}", unit=units_wt,
+        limit=escape(fuel_limit_word(result.fuel_limit_by)),
+    )
+    rows = [
+        summary_row("Fuel possible" if loading.fuel_vol is None else "Fuel", fuel, "ok"),
+        summary_row("Total Weight", f"{result.total_weight:.2f} {units_wt}", result.status("total_weight")),
+        summary_row("Total Moment", f"{result.total_moment:.2f} {units_wt}·{units_arm}"),
+    ]
+    rows += seat_summary_rows(ac, loading, result)
+    env = get_envelope(ac, loading.category)
+    if env is not None:
+        fwd, aft = env.cg_limits_at(result.total_weight)
+        rows.append(summary_row("CG", f"{result.cg:.3f} {units_arm}", result.status("cg")))
+        rows.append(summary_row("CG Limits", f"{fwd:.3f} to {aft:.3f} {units_arm}"))
+    return RESULTS_PANEL.substitute(
+        summary="".join(rows),
+        alerts="".join(ALERT.substitute(text=escape(a)) for a in result.alert_list),
+        table=mb_table(result.items(loading, ac), units_wt, units_arm),
+    )
+
+def render_trajectory(ac, loading, traj):
+    units_wt = ac['units']['weight']
+    units_arm = ac['units']['arm']
+    landing_css = limit_rules(ac).check("cg", traj.cg[-1], traj.total_weight[-1], loading.category)
+    rows = [
+        summary_row("Flight time", f"{traj.end_time:.2f} h" + (" (fuel at reserve)" if traj.reached_reserve else ""),
+                    "warn" if traj.reached_reserve else ""),
+        summary_row("Landing fuel", f"{traj.fuel_vol[-1]:.1f} L"),
+        summary_row("Landing weight", f"{traj.total_weight[-1]:.2f} {units_wt}"),
+        summary_row("Landing CG", f"{traj.cg[-1]:.3f} {units_arm}", landing_css),
+    ]
+    alerts = ""
+    if traj.outside_from is not None:
+        alerts = ALERT.substitute(text=escape(f"CG outside the envelope from {traj.outside_from:.2f} h."))
+    return TRAJECTORY.substitute(rows="".join(rows), alerts=alerts)
+
+def runway_text(runway):
+    parts = [f"{name} {runway[key]:.0f} m" for name, key in (("TORA", "tora_m"), ("LDA", "lda_m")) if runway.get(key) is not None]
+    return " / ".join(parts) or "-"
+
+def render_trip(ac, stops):
+    """Table of every takeoff and landing of a multi-leg trip (from trip.TripPlanner)."""
+    units_wt = ac['units']['weight']
+    rows = []
+    for n, s in enumerate(stops):
+        for phase, state in (("Landing", s["arrival"]), ("Takeoff", s["departure"])):
+            if state is None:
+                continue
+            dist = s["distances"].get(phase.lower())
+            dist_text = "" if dist is None else (
+                f"{escape(dist['label'])}: " + (f"{dist['value']:.0f} {escape(dist['unit'])}" if dist["value"] is not None else "outside POH table"))
+            rows.append(TRIP_ROW.substitute(
+                stop=f"{escape(s['icao'] or f'Stop {n + 1}')} {phase.lower()}",
+                burn=f"{s['burn_vol']:.1f}" if phase == "Landing" else "",
+                fuel=f"{state.fuel_vol:.1f}",
+                weight=f"{state.total_weight:.2f}", wt_css=limit_rules(ac).check("total_weight", state.total_weight),
+                cg=f"{state.cg:.3f}", cg_css=state.cg_status,
+                dist=dist_text,
+            ))
+    table = ('<table class="mb-table">' + TRIP_HEADER.substitute(wt=escape(units_wt), arm=escape(ac['units']['arm']))
+             + "".join(rows) + "</table>")
+    return table + "".join(ALERT.substitute(text=escape(a)) for a in trip_alerts(stops))
+
+def render_aerodromes(perf_outputs):
+    blocks = []
+    for idx, po in enumerate(perf_outputs):
+        rows = "".join([
+            summary_row(f"Aerodrome {idx+1} (ICAO)", escape(po['icao'])),
+            summary_row("Elevation", f"{po['elev_ft']:.0f} ft"),
+            summary_row("QNH", f"{po['qnh']:.1f} hPa"),
+            summary_row("Temperature", f"{po['temp']:.1f} °C"),
+        ] + [
+            summary_row(f"Runway {r['designator']}", runway_text(r)) for r in po.get("runways", [])
+        ])
+        distances = "".join(
+            summary_row(d["label"], f"{d['value']:.0f} {escape(d['unit'])}") if d["value"] is not None
+            else summary_row(d["label"], "outside POH table", "warn")
+            for d in po.get("distances", [])
+        )
+        blocks.append(AERODROME.substitute(rows=rows, pa=f"{po['pa_ft']:.0f}", da=f"{po['da_ft']:.0f}", distances=distances))
+    return "".join(blocks)
@@ -0,0 +1,416 @@
+import re
+import unicodedata
+import zlib
+import numpy as np
+from fpdf import FPDF
+from engine import get_limits_text
+from envelope import get_envelope
+from envelope_chart import background
+from limits import limit_rules
+from stations import station_table
+from trip import trip_alerts
+
+WEBSITE_LINK = "https://mass-balance.streamlit.app/"
+
+def ascii_safe(text):
+    if not isinstance(text, str):
+        return str(text)
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+def color_rgb(code):
+    if code == "ok":
+        return (30, 150, 30)
+    if code == "warn":
+        return (200, 150, 30)
+    if code == "bad":
+        return (200, 0, 0)
+    return (0, 0, 0)
+
+class CustomPDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.forms = {}
+
+    def _graphics(self):
+        return (self.font_family, self.font_style, self.underline, self.font_size_pt,
+                self.draw_color, self.fill_color, self.text_color, self.color_flag, self.line_width)
+
+    def block(self, key, draw):
+        """Draw a block that is the same wherever it appears (header, limits, footer).
+
+        key names the block's content. The first time it is drawn from a
+        given graphics state the drawing becomes a form XObject, written once
+        with the document; after that it is placed with a single "Do",
+        shifted down to the current position. draw() must draw relative to
+        the current position (or always be called at the same one, like the
+        header at the top of a page).
+        """
+        if self.state != 2:
+            return draw()
+        before, y = self._graphics(), self.y
+        where = (key, self.x, before)
+        form = self.forms.get(where)
+        if form is None:
+            page, start = self.page, len(self.pages[self.page])
+            draw()
+            if self.page != page:
+                # Broke onto a new page: left drawn in place
+                return
+            form = {"i": len(self.forms) + 1, "ops": self.pages[page][start:], "y": y,
+                    "height": self.y - y, "x": self.x, "after": self._graphics()}
+            self.forms[where] = form
+            self.pages[page] = self.pages[page][:start]
+        elif self.auto_page_break and not self.in_footer and y + form["height"] > self.page_break_trigger:
+            return draw()
+        self._out(f"q 1 0 0 1 0 {(form['y'] - y) * self.k:.2f} cm /B{form['i']} Do Q")
+        self.x, self.y = form["x"], y + form["height"]
+        # Q put the page back in the state from before the block: select what the block left selected
+        family, style, underline, size, draw_color, fill_color, text_color, color_flag, line_width = form["after"]
+        if (family, style, size) != (before[0], before[1], before[3]):
+            self.font_family = ""
+            self.set_font(family, style, size)
+        self.underline = underline
+        self.draw_color, self.fill_color, self.text_color, self.color_flag = draw_color, fill_color, text_color, color_flag
+        for new, old in ((draw_color, before[4]), (fill_color, before[5])):
+            if new != old:
+                self._out(new)
+        self.line_width = line_width
+        if line_width != before[8]:
+            self._out(f"{line_width * self.k:.2f} w")
+
+    def _putimages(self):
+        super()._putimages()
+        side = max(self.fw_pt, self.fh_pt)
+        for form in self.forms.values():
+            ops = form.pop("ops").encode("latin-1")
+            if self.compress:
+                ops = zlib.compress(ops)
+            self._newobj()
+            form["n"] = self.n
+            self._out(f"<</Type /XObject /Subtype /Form /BBox [0 0 {side:.2f} {side:.2f}] /Resources 2 0 R")
+            self._out(("/Filter /FlateDecode " if self.compress else "") + f"/Length {len(ops)}>>")
+            self._putstream(ops)
+            self._out("endobj")
+
+    def _putxobjectdict(self):
+        super()._putxobjectdict()
+        for form in self.forms.values():
+            self._out(f"/B{form['i']} {form['n']} 0 R")
+
+    def footer(self):
+        self.set_y(-10)
+        self.block("footer", self._footer_text)
+
+    def _footer_text(self):
+        self.set_font("Arial", 'I', 6)
+        self.set_text_color(140, 140, 140)
+        footer_text = (
+            "This document is for assistance and cross-checking only. "
+            "It does not replace your responsibility to perform and verify your own calculations before flight.\n  "
+            f"Generated by {WEBSITE_LINK}"
+        )
+        self.multi_cell(0, 2.8, ascii_safe(footer_text), align='C')
+        self.set_text_color(0,0,0)
+
+def draw_trajectory(pdf, ac, traj, height=38):
+    """Fuel burn section: CG and envelope limits against time, then a short table."""
+    units_wt = ac['units']['weight']
+    units_arm = ac['units']['arm']
+    # Keep the heading, plot and table together
+    if pdf.get_y() + height + 70 > pdf.h - 10:
+        pdf.add_page()
+    pdf.ln(2)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Fuel Burn Trajectory:"), ln=True)
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(0, 5, ascii_safe(
+        f"Burn rate {traj.burn_rate:.1f} L/h, planned flight time {traj.flight_time:.2f} h, reserve {traj.reserve_vol:.1f} L"
+        + (f" (fuel at reserve after {traj.end_time:.2f} h)" if traj.reached_reserve else "")), ln=True)
+    pdf.cell(0, 5, ascii_safe("Blue: CG. Grey: envelope limits at the current weight."), ln=True)
+
+    # Plot box; limits in grey, CG in blue
+    x0, y0, w = 20.0, pdf.get_y() + 2, 170.0
+    series = [traj.cg] + ([traj.fwd_limit, traj.aft_limit] if traj.fwd_limit is not None else [])
+    lo = min(float(a.min()) for a in series)
+    hi = max(float(a.max()) for a in series)
+    pad = (hi - lo) * 0.1 or 0.01
+    lo, hi = lo - pad, hi + pad
+    t_end = traj.end_time or 1.0
+
+    def xy(t, v):
+        return x0 + w * t / t_end, y0 + height - height * (v - lo) / (hi - lo)
+
+    pdf.set_draw_color(160, 160, 160)
+    pdf.rect(x0, y0, w, height)
+    pdf.set_font("Arial", '', 7)
+    for v, align_y in ((hi, y0), (lo, y0 + height - 3)):
+        pdf.set_xy(x0 - 12, align_y)
+        pdf.cell(11, 3, f"{v:.3f}", align='R')
+    pdf.set_xy(x0, y0 + height + 0.5)
+    pdf.cell(w / 2, 3, "0.00 h")
+    pdf.cell(w / 2, 3, f"{t_end:.2f} h", align='R')
+    for arr, rgb, width in ((traj.fwd_limit, (140, 140, 140), 0.3), (traj.aft_limit, (140, 140, 140), 0.3), (traj.cg, (31, 119, 180), 0.6)):
+        if arr is None:
+            continue
+        pdf.set_draw_color(*rgb)
+        pdf.set_line_width(width)
+        pts = [xy(t, v) for t, v in zip(traj.time_h.tolist(), arr.tolist())]
+        for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+            pdf.line(xa, ya, xb, yb)
+    pdf.set_line_width(0.2)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_xy(10, y0 + height + 5)
+
+    pdf.set_font("Arial", 'B', 9)
+    col_widths = [30, 30, 40, 40]
+    for h, cw in zip(["Time (h)", "Fuel (L)", f"Weight ({units_wt})", f"CG ({units_arm})"], col_widths):
+        pdf.cell(cw, 6, ascii_safe(h), border=1, align='C')
+    pdf.ln()
+    pdf.set_font("Arial", '', 9)
+    for row in traj.rows():
+        for val, cw, fmt in zip(row, col_widths, ("{:.2f}", "{:.1f}", "{:.2f}", "{:.3f}")):
+            pdf.cell(cw, 5, fmt.format(val), border=1, align='C')
+        pdf.ln()
+    if traj.outside_from is not None:
+        pdf.set_font("Arial", 'B', 9)
+        pdf.set_text_color(200, 0, 0)
+        pdf.cell(0, 6, ascii_safe(f"WARNING: CG outside the envelope from {traj.outside_from:.2f} h."), ln=True)
+        pdf.set_text_color(0, 0, 0)
+
+def draw_envelope_chart(pdf, ac, loading, result, traj=None, width=110.0, height=66.0):
+    """Loading graph: the cached envelope image with the takeoff point (and burn line) drawn over it."""
+    bg = background(ac, loading.category)
+    if bg is None:
+        return
+    frame, path = bg
+    if pdf.get_y() + height + 22 > pdf.h - 10:
+        pdf.add_page()
+    pdf.ln(2)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Loading Graph:"), ln=True)
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(0, 5, ascii_safe("Green: CG envelope. Red dashes: MTOW. Dot: takeoff"
+                              + (", blue line: fuel burn to landing." if traj is not None else ".")), ln=True)
+
+    x0, y0 = 30.0, pdf.get_y() + 5
+    pdf.image(path, x0, y0, width, height)
+    pdf.set_draw_color(160, 160, 160)
+    pdf.rect(x0, y0, width, height)
+
+    def xy(cg, weight):
+        fx = np.clip(frame.x(cg), 0.0, 1.0)
+        fy = np.clip(frame.y(weight), 0.0, 1.0)
+        return x0 + width * fx, y0 + height * (1 - fy)
+
+    pdf.set_font("Arial", '', 7)
+    for tick in frame.cg_ticks:
+        x, _ = xy(tick, frame.w_lo)
+        pdf.set_xy(x - 8, y0 + height + 0.5)
+        pdf.cell(16, 3, f"{tick:g}", align='C')
+    for tick in frame.w_ticks:
+        _, y = xy(frame.cg_lo, tick)
+        pdf.set_xy(x0 - 13, y - 1.5)
+        pdf.cell(12, 3, f"{tick:g}", align='R')
+    pdf.set_xy(x0, y0 + height + 3.5)
+    pdf.cell(width, 3, ascii_safe(f"CG ({ac['units']['arm']})"), align='C')
+    pdf.set_xy(x0 - 13, y0 - 4)
+    pdf.cell(30, 3, ascii_safe(f"Weight ({ac['units']['weight']})"))
+
+    if traj is not None:
+        pdf.set_draw_color(31, 119, 180)
+        pdf.set_line_width(0.5)
+        pts = list(zip(*(a.tolist() for a in xy(traj.cg, traj.total_weight))))
+        for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+            pdf.line(xa, ya, xb, yb)
+        xl, yl = pts[-1]
+        pdf.set_fill_color(255, 255, 255)
+        pdf.ellipse(xl - 1.2, yl - 1.2, 2.4, 2.4, 'FD')
+    px, py = (float(v) for v in xy(result.cg, result.total_weight))
+    pdf.set_fill_color(*color_rgb(result.status("cg")))
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.3)
+    pdf.ellipse(px - 1.6, py - 1.6, 3.2, 3.2, 'FD')
+    pdf.set_line_width(0.2)
+    pdf.set_xy(10, y0 + height + 8)
+
+def draw_trip(pdf, ac, trip):
+    """Trip section: weight, CG and POH distances at every takeoff and landing."""
+    if pdf.get_y() + 20 + 6 * len(trip) * 2 > pdf.h - 10:
+        pdf.add_page()
+    pdf.ln(2)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Trip:"), ln=True)
+    pdf.set_font("Arial", 'B', 9)
+    col_widths = [38, 20, 20, 26, 22, 64]
+    headers = ["Stop", "Burn (L)", "Fuel (L)", f"Weight ({ac['units']['weight']})", f"CG ({ac['units']['arm']})", "Distance"]
+    for h, cw in zip(headers, col_widths):
+        pdf.cell(cw, 6, ascii_safe(h), border=1, align='C')
+    pdf.ln()
+    pdf.set_font("Arial", '', 9)
+    for n, s in enumerate(trip):
+        for phase, state in (("landing", s["arrival"]), ("takeoff", s["departure"])):
+            if state is None:
+                continue
+            dist = s["distances"].get(phase)
+            dist_text = "" if dist is None else (
+                f"{dist['label']}: " + (f"{dist['value']:.0f} {dist['unit']}" if dist["value"] is not None else "outside POH table"))
+            pdf.cell(col_widths[0], 5, ascii_safe(f"{s['icao'] or f'Stop {n + 1}'} {phase}"), border=1)
+            pdf.cell(col_widths[1], 5, f"{s['burn_vol']:.1f}" if phase == "landing" else "", border=1, align='C')
+            pdf.cell(col_widths[2], 5, f"{state.fuel_vol:.1f}", border=1, align='C')
+            pdf.set_text_color(*color_rgb(limit_rules(ac).check("total_weight", state.total_weight)))
+            pdf.cell(col_widths[3], 5, f"{state.total_weight:.2f}", border=1, align='C')
+            pdf.set_text_color(*color_rgb(state.cg_status))
+            pdf.cell(col_widths[4], 5, f"{state.cg:.3f}", border=1, align='C')
+            pdf.set_text_color(0, 0, 0)
+            pdf.cell(col_widths[5], 5, ascii_safe(dist_text), border=1)
+            pdf.ln()
+    alerts = trip_alerts(trip)
+    if alerts:
+        pdf.set_font("Arial", 'B', 9)
+        pdf.set_text_color(200, 0, 0)
+        for a in alerts:
+            pdf.cell(0, 6, ascii_safe(f"WARNING: {a}"), ln=True)
+        pdf.set_text_color(0, 0, 0)
+
+def draw_header_bar(pdf):
+    pdf.set_fill_color(34,34,34)
+    pdf.rect(0, 0, 210, 15, 'F')
+    pdf.set_font("Arial", 'B', 15)
+    pdf.set_text_color(255,255,255)
+    pdf.set_xy(10,7)
+    pdf.cell(0, 7, ascii_safe("MASS & BALANCE REPORT"), ln=True, align='L')
+    pdf.set_text_color(0,0,0)
+
+def draw_limits(pdf, lines):
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Operational Limits:"), ln=True)
+    pdf.set_font("Arial", '', 9)
+    for line in lines:
+        pdf.cell(0, 5, ascii_safe(line), ln=True)
+
+def build_report(ac, aircraft, registration, mission_number, flight_datetime, pilot_name, loading, result, perf_outputs, trajectory=None, trip=None):
+    pdf = CustomPDF()
+    pdf.set_auto_page_break(auto=True, margin=10)
+    draw_report(pdf, ac, aircraft, registration, mission_number, flight_datetime, pilot_name, loading, result, perf_outputs, trajectory, trip)
+    return pdf
+
+def draw_report(pdf, ac, aircraft, registration, mission_number, flight_datetime, pilot_name, loading, result, perf_outputs, trajectory=None, trip=None):
+    """One mission's report, starting on a new page of pdf."""
+    pdf.add_page()
+    pdf.block("header", lambda: draw_header_bar(pdf))
+    pdf.set_xy(10,20)
+    pdf.ln(3)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 7, ascii_safe(f"{aircraft}  |  {registration}"), ln=True)
+    pdf.set_font("Arial", '', 11)
+    pdf.cell(0, 6, ascii_safe(f"Mission Number: {mission_number}"), ln=True)
+    pdf.cell(0, 6, ascii_safe(f"Flight: {flight_datetime} UTC"), ln=True)
+    pdf.cell(0, 6, ascii_safe(f"Prepared by: {pilot_name}"), ln=True)
+    pdf.cell(0, 6, ascii_safe("Operator: Sevenair Academy"), ln=True)
+    pdf.ln(2)
+    # PERFORMANCE SECTION PDF MULTI
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Performance - Aerodrome(s):"), ln=True)
+    for idx, po in enumerate(perf_outputs):
+        pdf.set_font("Arial", 'B', 10)
+        pdf.cell(0, 6, ascii_safe(f"Aerodrome {idx+1}: {po['icao']}"), ln=True)
+        pdf.set_font("Arial", '', 9)
+        pdf.cell(0, 5, ascii_safe(f"  Elevation: {po['elev_ft']:.0f} ft"), ln=True)
+        pdf.cell(0, 5, ascii_safe(f"  QNH: {po['qnh']:.1f} hPa"), ln=True)
+        pdf.cell(0, 5, ascii_safe(f"  Temperature: {po['temp']:.1f} °C"), ln=True)
+        for r in po.get("runways", []):
+            lengths = " / ".join(f"{name} {r[key]:.0f} m" for name, key in (("TORA", "tora_m"), ("LDA", "lda_m")) if r.get(key) is not None)
+            pdf.cell(0, 5, ascii_safe(f"  Runway {r['designator']}: {lengths or '-'}"), ln=True)
+        # Simples: apenas bold PA/DA
+        pdf.set_font("Arial", 'B', 9)
+        pdf.set_text_color(50, 50, 50)
+        pdf.cell(0, 5, ascii_safe(f"  Pressure Altitude (PA): {po['pa_ft']:.0f} ft"), ln=True)
+        pdf.cell(0, 5, ascii_safe(f"  Density Altitude (DA): {po['da_ft']:.0f} ft"), ln=True)
+        for d in po.get("distances", []):
+            value = f"{d['value']:.0f} {d['unit']}" if d["value"] is not None else "outside POH table"
+            pdf.cell(0, 5, ascii_safe(f"  {d['label']}: {value}"), ln=True)
+        pdf.set_text_color(0,0,0)
+    pdf.ln(2)
+    lines = get_limits_text(ac)
+    pdf.block(("limits",) + tuple(lines), lambda: draw_limits(pdf, lines))
+    pdf.ln(4)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 6, ascii_safe("Results:"), ln=True)
+    pdf.set_font("Arial", 'B', 10)
+    col_widths = [45, 36, 34, 55]
+    headers = ["Item", f"Weight ({ac['units']['weight']})", f"Arm ({ac['units']['arm']})", f"Moment ({ac['units']['weight']}·{ac['units']['arm']})"]
+    for h, w in zip(headers, col_widths):
+        pdf.cell(w, 7, ascii_safe(h), border=1, align='C')
+    pdf.ln()
+    pdf.set_font("Arial", '', 9)
+    rows = result.items(loading, ac)
+    for row in rows:
+        for idx, (val, w) in enumerate(zip(row, col_widths)):
+            pdf.set_text_color(0,0,0)
+            if isinstance(val, str):
+                pdf.cell(w, 7, ascii_safe(val), border=1)
+            else:
+                pdf.cell(w, 7, ascii_safe(f"{val:.2f}" if isinstance(val, float) else str(val)), border=1, align='C')
+        pdf.ln()
+    pdf.set_text_color(0,0,0)
+    pdf.ln(1)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_text_color(50,50,50)
+    if loading.fuel_vol is None:
+        limit_expl = "Limited by: " + (result.fuel_limit_by if result.fuel_limit_by in ("Tank Capacity", "CG Envelope") else "Maximum Weight")
+    elif result.fuel_limit_by == "Manual Entry":
+        limit_expl = "Manual Entry"
+    else:
+        limit_expl = result.fuel_limit_by
+    fuel_str = f"Fuel: {result.fuel_vol:.1f} L / {result.fuel_weight:.1f} {ac['units']['weight']} ({limit_expl})"
+    pdf.cell(0, 6, ascii_safe(fuel_str), ln=True)
+    # COLORIDO: TOTAL WEIGHT
+    total_weight_color = color_rgb(result.status("total_weight"))
+    pdf.set_text_color(*total_weight_color)
+    pdf.cell(0, 6, ascii_safe(f"Total Weight: {result.total_weight:.2f} {ac['units']['weight']}"), ln=True)
+    pdf.set_text_color(0,0,0)
+    pdf.cell(0, 6, ascii_safe(f"Total Moment: {result.total_moment:.2f} {ac['units']['weight']}·{ac['units']['arm']}"), ln=True)
+    # COLORIDO: SEATS (pilot + passenger and their occupants)
+    table = station_table(ac)
+    for idx, inputs in table.seat_rows():
+        weight = result.station_weights[idx]
+        pdf.set_text_color(*color_rgb(result.status(f"station:{table.names[idx]}")))
+        pdf.cell(0, 6, ascii_safe(f"{table.summary_labels[idx]}: {weight:.2f} {ac['units']['weight']}"), ln=True)
+        pdf.set_text_color(0,0,0)
+        if len(inputs) > 1:
+            for key, label in inputs:
+                pdf.cell(0, 6, ascii_safe(f" - {label}: {float(loading.payload.get(key, 0.0)):.2f} {ac['units']['weight']}"), ln=True)
+    # COLORIDO: CG
+    env = get_envelope(ac, loading.category)
+    if env is not None:
+        fwd, aft = env.cg_limits_at(result.total_weight)
+        cg_color = color_rgb(result.status("cg"))
+        pdf.set_text_color(*cg_color)
+        pdf.cell(0, 6, ascii_safe(f"CG: {result.cg:.3f} {ac['units']['arm']}"), ln=True)
+        pdf.set_text_color(0,0,0)
+        pdf.cell(0, 6, ascii_safe(f"CG Limits: {fwd:.3f} to {aft:.3f} {ac['units']['arm']}"), ln=True)
+    if result.alert_list:
+        pdf.set_font("Arial", 'B', 9)
+        pdf.set_text_color(200,0,0)
+        for a in list(dict.fromkeys(result.alert_list)):
+            pdf.cell(0, 6, ascii_safe(f"WARNING: {a}"), ln=True)
+        pdf.set_text_color(0,0,0)
+    draw_envelope_chart(pdf, ac, loading, result, trajectory)
+    if trajectory is not None:
+        draw_trajectory(pdf, ac, trajectory)
+    if trip:
+        draw_trip(pdf, ac, trip)
+
+def report_filename(mission_number):
+    """File name for a mission's report; anything but letters, digits, "." and "-" becomes "_"."""
+    safe = re.sub(r"[^\w.-]", "_", str(mission_number))
+    return f"mass_balance_mission{safe}.pdf"
+
+def report_bytes(pdf, path=None):
+    """Serialise a report once in memory; pass path to also write it to disk."""
+    out = pdf.output(dest='S')
+    data = out.encode('latin-1') if isinstance(out, str) else bytes(out)
+    if path is not None:
+        with open(path, "wb") as f:
+            f.write(data)
+    return data
@@ -0,0 +1,155 @@
+"""Content-addressed cache for finished PDF reports.
+
+Reports are keyed by a SHA-256 of every input that reaches the PDF, so the
+same values always map to the same bytes. Entries live in a bounded LRU in
+memory, optionally backed by a directory of <key>.pdf files, itself capped at
+max_disk_bytes: every put() removes the least recently written or read files
+first until the directory fits.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+
+# Bump when the report layout changes so old disk entries are not reused
+REPORT_LAYOUT_VERSION = 3
+
+def _canonical(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+def report_key(ac, aircraft, registration, mission_number, flight_datetime, pilot_name, loading, perf_outputs, trajectory=None, trip=None):
+    doc = {
+        "layout": REPORT_LAYOUT_VERSION,
+        "aircraft": aircraft,
+        "limits": ac,
+        "registration": registration,
+        "mission_number": mission_number,
+        "flight_datetime": flight_datetime,
+        "pilot_name": pilot_name,
+        "loading": asdict(loading),
+        "perf_outputs": perf_outputs,
+        # The trajectory follows from the loading and these three inputs
+        "trajectory": None if trajectory is None else [trajectory.burn_rate, trajectory.flight_time, trajectory.reserve_vol],
+        # Likewise the trip follows from the loading, the aerodromes and the leg burns
+        "trip": None if trip is None else [s["burn_vol"] for s in trip],
+    }
+    blob = json.dumps(_canonical(doc), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ReportCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._files = OrderedDict()  # key -> bytes on disk, least recently used first
+        self._disk_size = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            found = []
+            for path in self.disk_dir.glob("*.pdf"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((st.st_mtime_ns, path.stem, st.st_size))
+            for _, key, size in sorted(found):
+                self._files[key] = size
+                self._disk_size += size
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, data):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._size -= len(old)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.disk_dir:
+            path = self.disk_dir / f"{key}.pdf"
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, data)
+                    self._disk_size -= self._files.pop(key, 0)
+                    self._files[key] = len(data)
+                    self._disk_size += len(data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        data = bytes(data)
+        with self._lock:
+            self._remember(key, data)
+        if self.disk_dir and len(data) <= self.max_disk_bytes:
+            tmp = self.disk_dir / f"{key}.pdf.{os.getpid()}.{threading.get_ident()}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, self.disk_dir / f"{key}.pdf")
+            with self._lock:
+                self._disk_size -= self._files.pop(key, 0)
+                self._files[key] = len(data)
+                self._disk_size += len(data)
+                stale = []
+                while self._disk_size > self.max_disk_bytes:
+                    old, size = self._files.popitem(last=False)
+                    self._disk_size -= size
+                    stale.append(old)
+            for old in stale:
+                try:
+                    (self.disk_dir / f"{old}.pdf").unlink()
+                except FileNotFoundError:
+                    pass
+        return data
+
+    def get_or_build(self, key, build):
+        data = self.get(key)
+        if data is None:
+            data = self.put(key, build())
+        return data
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_bytes": self._disk_size,
+        }
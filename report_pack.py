@@ -0,0 +1,144 @@
+"""Dispatch pack: the day's reports in one PDF, a page (or more) per mission.
+
+    with ReportPack("dispatch.pdf") as pack:
+        for mission in missions:
+            pack.add(ac, aircraft, registration, ..., loading, result, perf_outputs)
+
+The pack is a single compressed FPDF document written as it is drawn: each
+page goes to the output file as soon as it is finished, so memory stays flat
+however many missions the pack has. Fonts, the loading-graph background
+image of each type and the repeated blocks (header, limits, footer, see
+CustomPDF.block()) are written once at the end and referenced from every
+page that uses them. A path gets "<name>.part" while the pack is written,
+renamed when it is closed. A pack closed without any mission gets a single
+"No missions" page rather than a blank one.
+"""
+import os
+import zlib
+from pathlib import Path
+
+from report import CustomPDF, ascii_safe, draw_header_bar, draw_report
+
+class _Sink:
+    """Stands in for FPDF's output buffer: appends go straight to a binary file."""
+
+    def __init__(self, f):
+        self.f = f
+        self.size = 0
+
+    def __iadd__(self, text):
+        data = text.encode("latin-1")
+        self.f.write(data)
+        self.size += len(data)
+        return self
+
+    def __len__(self):
+        return self.size
+
+class PackPDF(CustomPDF):
+    """A CustomPDF written to f page by page instead of serialised at the end."""
+
+    def __init__(self, f):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=10)
+        self.buffer = _Sink(f)
+        # The header goes out first, before any image could raise the version
+        self.pdf_version = "1.4"
+        self._putheader()
+
+    def _putheader(self):
+        if not len(self.buffer):
+            super()._putheader()
+
+    def _endpage(self):
+        super()._endpage()
+        self._putpage(self.page)
+
+    def _page_size(self):
+        return (self.fw_pt, self.fh_pt) if self.def_orientation == 'P' else (self.fh_pt, self.fw_pt)
+
+    def _putpage(self, n):
+        # What FPDF._putpages() writes for each page (reports have no links nor page-number alias)
+        w_pt, h_pt = self._page_size()
+        self._newobj()
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if n in self.orientation_changes:
+            self._out(f'/MediaBox [0 0 {h_pt:.2f} {w_pt:.2f}]')
+        self._out('/Resources 2 0 R')
+        self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out(f'/Contents {self.n + 1} 0 R>>')
+        self._out('endobj')
+        content = self.pages[n].encode("latin-1")
+        if self.compress:
+            content = zlib.compress(content)
+        self._newobj()
+        self._out(('<</Filter /FlateDecode ' if self.compress else '<<') + f'/Length {len(content)}>>')
+        self._putstream(content)
+        self._out('endobj')
+        self.pages[n] = ''
+
+    def _putpages(self):
+        # The pages are already written (objects 3, 5, ...): only the page tree is left
+        w_pt, h_pt = self._page_size()
+        self.offsets[1] = len(self.buffer)
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(f'{3 + 2 * i} 0 R ' for i in range(self.page)) + ']')
+        self._out(f'/Count {self.page}')
+        self._out(f'/MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}]')
+        self._out('>>')
+        self._out('endobj')
+
+class ReportPack:
+    """One PDF for many missions, streamed to a path or a binary file object."""
+
+    def __init__(self, out, title=None):
+        self.path = None
+        if isinstance(out, (str, os.PathLike)):
+            self.path = Path(out)
+            out = open(self.path.with_name(self.path.name + ".part"), "wb")
+        self.file = out
+        self.pdf = PackPDF(out)
+        if title:
+            self.pdf.set_title(ascii_safe(title))
+        self.missions = 0
+        self.written = None
+
+    def add(self, *args, **kwargs):
+        """Append one mission; arguments as for report.build_report()."""
+        draw_report(self.pdf, *args, **kwargs)
+        self.missions += 1
+
+    @property
+    def pages(self):
+        return self.pdf.page_no()
+
+    def _no_missions(self):
+        pdf = self.pdf
+        pdf.add_page()
+        pdf.block("header", lambda: draw_header_bar(pdf))
+        pdf.set_xy(10, 25)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 7, ascii_safe("No missions in this dispatch pack."), ln=True)
+
+    def close(self):
+        """Finish the document; returns its size in bytes."""
+        if self.written is not None:
+            return self.written
+        if not self.missions:
+            self._no_missions()
+        self.pdf.close()
+        if self.path is not None:
+            self.file.close()
+            os.replace(self.file.name, self.path)
+        else:
+            self.file.flush()
+        self.written = len(self.pdf.buffer)
+        return self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
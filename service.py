@@ -0,0 +1,399 @@
+"""Local JSON/HTTP calculation service for dispatch and scheduling systems.
+
+    python service.py --port 8502 --workers 4
+
+Runs beside (or instead of) the Streamlit app with the same fleet.json and
+aerodromes.csv. It speaks HTTP/1.1 on asyncio with keep-alive (pipelined
+requests are answered in order). --workers N starts N processes sharing the
+port (SO_REUSEPORT).
+
+    GET  /health        {"status": "ok", "aircraft": [...]}
+    POST /mass-balance  a mission -> result; {"missions": [...]} -> {"results": [...]}
+    POST /fuel          as /mass-balance, fuel_vol ignored (automatic maximum fuel)
+    POST /aerodromes    {"aerodromes": [...], "aircraft": ..., "total_weight": ...} -> PA/DA
+    POST /report        a mission -> application/pdf; {"missions": [...]} -> one dispatch pack
+
+A mission is one row of a mission_batch.py schedule as a JSON object:
+aircraft, registration, ew, ew_moment, the station inputs (either as top-level
+keys or under "payload"), fuel_vol, category, mission_number,
+flight_datetime, pilot_name, aerodromes (the schedule string or a list of
+{"icao", "elev_ft", "qnh", "temp", "burn_vol"}), burn_rate, flight_time and
+reserve_vol. Blank empty weight/moment come from the fleet registry.
+
+A single mission gets the full result: items, CG limits, aerodromes and fuel
+trajectory. A batch is evaluated with evaluate_batch(), one call per type
+and category. Its results carry the summary fields only, in request order,
+with {"error": ...} for a mission that cannot be read. Errors in the request
+itself, including numbers that are not finite (NaN, Infinity, 1e400), are
+400 with {"error": ...}.
+
+Reports and large batches run in a thread pool, so slow requests do not hold
+up the rest of the connections.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import signal
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from batch import FUEL_LIMIT_LABELS, evaluate_batch
+from engine import aircraft_data, aerodromes_performance
+from envelope import get_envelope
+from fleet import default_fleet
+from limits import limit_rules
+from mission_batch import aerodrome_entry, mission_loading, parse_aerodromes, prepare_mission
+from stations import station_table
+
+DEFAULT_PORT = 8502
+MAX_HEADER = 64 * 1024
+MAX_BODY = 32 * 1024 * 1024
+IDLE_TIMEOUT = 30.0
+# Batches above this many missions, and every report, go to the thread pool
+INLINE_BATCH = 256
+JSON_TYPE = "application/json"
+AERODROME_FIELDS = ("icao", "elev_ft", "qnh", "temp", "burn_vol")
+
+class RequestError(ValueError):
+    """A request the service cannot answer; status is the HTTP status to send."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+def _aerodromes(value):
+    """Aerodrome dicts from a JSON list of objects (or the schedule string), validated field by field."""
+    if value is None or isinstance(value, str):
+        try:
+            return parse_aerodromes(value)
+        except ValueError as e:
+            raise RequestError(str(e))
+    if not isinstance(value, list):
+        raise RequestError('"aerodromes" must be a list of JSON objects')
+    out = []
+    for n, a in enumerate(value, start=1):
+        if not isinstance(a, dict):
+            raise RequestError('Every "aerodromes" entry must be a JSON object')
+        try:
+            out.append(aerodrome_entry(*(a.get(k) for k in AERODROME_FIELDS)))
+        except ValueError as e:
+            raise RequestError(f"Aerodrome {n}: {e}")
+    return out
+
+def _row(mission):
+    """A JSON mission as a schedule row: payload flattened, aerodromes parsed into dicts."""
+    if not isinstance(mission, dict):
+        raise RequestError("A mission must be a JSON object")
+    row = dict(mission)
+    payload = row.pop("payload", None) or {}
+    if not isinstance(payload, dict):
+        raise RequestError('"payload" must be a JSON object')
+    row.update(payload)
+    row["aerodromes"] = _aerodromes(row.get("aerodromes"))
+    return row
+
+def _missions(data):
+    """(rows, batch): the request's missions and whether it was a batch."""
+    if isinstance(data, dict) and "missions" in data:
+        if not isinstance(data["missions"], list):
+            raise RequestError('"missions" must be a list')
+        return [m if isinstance(m, dict) else None for m in data["missions"]], True
+    return [_row(data)], False
+
+def _finite(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def _summary(aircraft, row, fuel_vol, fuel_weight, fuel_limit_by, total_weight, total_moment, cg, alerts, status):
+    return {
+        "aircraft": aircraft,
+        "registration": str(row.get("registration") or "").strip(),
+        "mission_number": str(row.get("mission_number") or "").strip(),
+        "fuel_vol": _finite(fuel_vol),
+        "fuel_weight": _finite(fuel_weight),
+        "fuel_limit_by": fuel_limit_by,
+        "total_weight": _finite(total_weight),
+        "total_moment": _finite(total_moment),
+        "cg": _finite(cg),
+        "alerts": alerts,
+        "status": status,
+    }
+
+def mission_result(row):
+    """Full result for one mission (see prepare_mission())."""
+    m = prepare_mission(row)
+    ac, loading, result = m["ac"], m["loading"], m["result"]
+    out = _summary(m["aircraft"], row, result.fuel_vol, result.fuel_weight, result.fuel_limit_by,
+                   result.total_weight, result.total_moment, result.cg, m["alerts"], result.limit_status)
+    env = get_envelope(ac, loading.category)
+    out["cg_limits"] = list(env.cg_limits_at(result.total_weight)) if env is not None else None
+    out["manual_fuel_warning"] = result.manual_fuel_warning
+    out["items"] = [{"item": i[0], "weight": _finite(i[1]), "arm": _finite(i[2]), "moment": _finite(i[3])}
+                    for i in result.items(loading, ac)]
+    out["aerodromes"] = m["perf_outputs"]
+    traj = m["traj"]
+    out["trajectory"] = None if traj is None else {
+        "flight_time_h": traj.end_time,
+        "reached_reserve": bool(traj.reached_reserve),
+        "landing_fuel_vol": _finite(traj.fuel_vol[-1]),
+        "landing_weight": _finite(traj.total_weight[-1]),
+        "landing_cg": _finite(traj.cg[-1]),
+        "cg_outside_from_h": traj.outside_from,
+    }
+    return out
+
+def batch_results(rows):
+    """Summary results for many missions, one evaluate_batch() call per type and category."""
+    results = [None] * len(rows)
+    groups = {}
+    for n, row in enumerate(rows):
+        try:
+            if row is None:
+                raise ValueError("A mission must be a JSON object")
+            row = _row(row)
+            aircraft, ac, loading = mission_loading(row)
+            groups.setdefault((aircraft, loading.category), []).append((n, row, loading))
+        except (ValueError, TypeError, KeyError) as e:
+            results[n] = {"error": str(e)}
+    for (aircraft, category), members in groups.items():
+        ac = aircraft_data[aircraft]
+        rules = limit_rules(ac)
+        loadings = [l for _, _, l in members]
+        try:
+            res = evaluate_batch(
+                ac, [l.ew for l in loadings], [l.ew_moment for l in loadings],
+                {key: [l.payload.get(key, 0.0) for l in loadings] for key in station_table(ac).input_keys},
+                [np.nan if l.fuel_vol is None else l.fuel_vol for l in loadings], category)
+        except (ValueError, KeyError) as e:
+            for n, _, _ in members:
+                results[n] = {"error": str(e)}
+            continue
+        columns = {k: res[k].tolist() for k in ("fuel_vol", "fuel_weight", "fuel_limit_by", "total_weight", "total_moment", "cg", "alerts")}
+        for j, (n, row, _) in enumerate(members):
+            results[n] = _summary(
+                aircraft, row, columns["fuel_vol"][j], columns["fuel_weight"][j], FUEL_LIMIT_LABELS[columns["fuel_limit_by"][j]],
+                columns["total_weight"][j], columns["total_moment"][j], columns["cg"][j],
+                rules.messages(mask=columns["alerts"][j]), rules.statuses(res["severity"][j]))
+    return results
+
+def mass_balance(data):
+    rows, batch = _missions(data)
+    if batch:
+        return {"results": batch_results(rows)}
+    return mission_result(rows[0])
+
+FUEL_FIELDS = ("aircraft", "registration", "mission_number", "fuel_vol", "fuel_weight", "fuel_limit_by", "total_weight", "cg", "alerts")
+
+def fuel(data):
+    rows, batch = _missions(data)
+    rows = [None if row is None else dict(row, fuel_vol=None) for row in rows]
+    results = batch_results(rows)
+    results = [r if "error" in r else {k: r[k] for k in FUEL_FIELDS} for r in results]
+    if batch:
+        return {"results": results}
+    if "error" in results[0]:
+        raise RequestError(results[0]["error"])
+    return results[0]
+
+def aerodromes(data):
+    if not isinstance(data, dict):
+        raise RequestError("Expected a JSON object")
+    parsed = _aerodromes(data.get("aerodromes") or [])
+    ac, weight = None, None
+    if data.get("aircraft") is not None or data.get("total_weight") is not None:
+        if data.get("aircraft") not in aircraft_data:
+            raise RequestError(f"Unknown aircraft type: {data.get('aircraft')}")
+        if data.get("total_weight") is None:
+            raise RequestError("total_weight is required with aircraft")
+        try:
+            weight = float(data["total_weight"])
+        except (TypeError, ValueError):
+            weight = math.nan
+        if not math.isfinite(weight):
+            raise RequestError(f"total_weight must be a number, not {data['total_weight']!r}")
+        ac = aircraft_data[data["aircraft"]]
+    return {"aerodromes": aerodromes_performance(parsed, ac, weight)}
+
+def report(data):
+    """(content type, PDF bytes): one report, or a dispatch pack for a batch."""
+    from report import build_report, report_bytes
+    from report_pack import ReportPack
+    rows, batch = _missions(data)
+    prepared = []
+    for n, row in enumerate(rows):
+        if row is None:
+            raise RequestError(f"Mission {n + 1}: a mission must be a JSON object")
+        row = _row(row) if batch else row
+        try:
+            m = prepare_mission(row)
+        except (ValueError, TypeError, KeyError) as e:
+            raise RequestError(f"Mission {n + 1}: {e}" if batch else str(e))
+        prepared.append((row, m))
+
+    def args(row, m):
+        return (m["aircraft"], str(row.get("registration") or "").strip(), str(row.get("mission_number") or "").strip(),
+                m["flight_datetime"], m["pilot_name"], m["loading"], m["result"], m["perf_outputs"], m["traj"], m["trip"])
+
+    if not batch:
+        row, m = prepared[0]
+        return "application/pdf", report_bytes(build_report(m["ac"], *args(row, m)))
+    out = io.BytesIO()
+    with ReportPack(out, title="Dispatch pack") as pack:
+        for row, m in prepared:
+            pack.add(m["ac"], *args(row, m))
+    return "application/pdf", out.getvalue()
+
+ROUTES = {
+    "/mass-balance": mass_balance,
+    "/fuel": fuel,
+    "/aerodromes": aerodromes,
+    "/report": report,
+}
+
+class CalculationService:
+    def __init__(self, threads=None):
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="mb-service")
+        self.requests = 0
+
+    async def handle(self, method, path, body):
+        """(status, content type, body bytes) for one request."""
+        if path == "/health":
+            if method != "GET":
+                return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET")
+            return HTTPStatus.OK, JSON_TYPE, json.dumps({"status": "ok", "aircraft": list(aircraft_data)}).encode()
+        handler = ROUTES.get(path)
+        if handler is None:
+            return self._error(HTTPStatus.NOT_FOUND, f"No such endpoint: {path}")
+        if method != "POST":
+            return self._error(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST with a JSON body")
+        default_fleet().refresh()
+        try:
+            data = json.loads(body or b"{}")
+            missions = data.get("missions") if isinstance(data, dict) else None
+            if handler is report or (isinstance(missions, list) and len(missions) > INLINE_BATCH):
+                out = await asyncio.get_running_loop().run_in_executor(self.executor, handler, data)
+            else:
+                out = handler(data)
+            if not isinstance(out, tuple):
+                # Strict JSON: a value that is still not finite is the request's doing
+                out = json.dumps(out, allow_nan=False).encode()
+        except RequestError as e:
+            return self._error(e.status, str(e))
+        except (ValueError, TypeError, KeyError) as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e) or type(e).__name__)
+        except Exception as e:
+            return self._error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+        if isinstance(out, tuple):
+            return (HTTPStatus.OK,) + out
+        return HTTPStatus.OK, JSON_TYPE, out
+
+    @staticmethod
+    def _error(status, message):
+        return status, JSON_TYPE, json.dumps({"error": message}).encode()
+
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, *self._error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large"), False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                request_line, *lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split(" ")
+                if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+                    await self._send(writer, *self._error(HTTPStatus.BAD_REQUEST, "Malformed request line"), False)
+                    break
+                method, target, version = parts
+                headers = {}
+                for line in lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._send(writer, *self._error(HTTPStatus.LENGTH_REQUIRED, "Send a Content-Length"), False)
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY:
+                    await self._send(writer, *self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Bad or too large Content-Length"), False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                self.requests += 1
+                status, content_type, payload = await self.handle(method, target.split("?", 1)[0], body)
+                await self._send(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, status, content_type, payload, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+            + payload)
+        await writer.drain()
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, reuse_port=False, threads=None):
+    service = CalculationService(threads)
+    server = await asyncio.start_server(service.connection, host, port, limit=MAX_HEADER,
+                                        reuse_port=reuse_port or None, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+def _run(host, port, reuse_port, threads):
+    try:
+        asyncio.run(serve(host, port, reuse_port, threads))
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve mass & balance calculations as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=1, help="server processes sharing the port (default: 1)")
+    parser.add_argument("--threads", type=int, default=None, help="threads per process for reports and large batches")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("--workers needs SO_REUSEPORT, which this platform does not have")
+    print(f"Serving on http://{args.host}:{args.port} ({args.workers} process(es), {len(aircraft_data)} aircraft types)")
+    if args.workers == 1:
+        _run(args.host, args.port, False, args.threads)
+        return 0
+    procs = [multiprocessing.Process(target=_run, args=(args.host, args.port, True, args.threads), daemon=True)
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    # Stopping the parent (Ctrl-C or SIGTERM) stops the workers too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
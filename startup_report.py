@@ -0,0 +1,69 @@
+"""Import-time breakdown for the modules mb.py loads at startup.
+
+    python startup_report.py                 # top 15 packages, default budget
+    python startup_report.py --budget-ms 800 --top 25
+
+Reads the top-level imports of mb.py, imports them in a fresh interpreter
+with -X importtime and sums the cumulative time per top-level package.
+Exits with status 1 when the total exceeds the budget.
+"""
+import argparse
+import ast
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_BUDGET_MS = 500
+
+def startup_imports(script=HERE / "mb.py"):
+    modules = []
+    for node in ast.parse(Path(script).read_text(encoding="utf-8")).body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def measure(modules):
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    per_package = defaultdict(float)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented; only top-level entries are summed so nothing is counted twice
+        if raw_name[1:] != raw_name[1:].lstrip():
+            continue
+        name = raw_name.strip()
+        per_package[name.split(".")[0]] += int(cumulative)
+        total_us += int(cumulative)
+    return total_us / 1000, {k: v / 1000 for k, v in per_package.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report mb.py import-time cost against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+    modules = startup_imports()
+    total_ms, per_package = measure(modules)
+    print(f"Startup imports: {', '.join(modules)}")
+    print(f"{'package':<24}{'ms':>10}{'share':>8}")
+    for name, ms in sorted(per_package.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<24}{ms:>10.1f}{ms / total_ms:>8.0%}")
+    status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+    print(f"{'total':<24}{total_ms:>10.1f}   budget {args.budget_ms:.0f} ms: {status}")
+    return 0 if total_ms <= args.budget_ms else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Loading stations declared per aircraft type.
+
+A type in fleet.json lists its payload stations and fuel tanks:
+
+    "stations": [
+      {"name": "Pilot & Passenger", "kind": "seat", "arm": 1.8, "max_weight": 230,
+       "limit_label": "Pilot+Passenger", "alert": "...",
+       "inputs": [{"key": "student", "label": "Student"}, {"key": "instructor", "label": "Instructor"}]},
+      {"name": "Baggage", "kind": "baggage", "arm": 2.417, "max_weight": 20,
+       "inputs": [{"key": "bag1", "label": "Baggage"}]}
+    ],
+    "tanks": [{"name": "Fuel", "arm": 2.209, "max_volume": 124.0}]
+
+Every input adds its weight to its station. Fuel is shared between tanks in
+proportion to their capacity. StationTable compiles this once per type into
+NumPy arrays, so a moment sum is a single dot product for one loading or a
+batch of them.
+"""
+import threading
+
+import numpy as np
+
+class StationTable:
+    def __init__(self, ac):
+        stations = ac["stations"]
+        tanks = ac["tanks"]
+        self.names = [s["name"] for s in stations]
+        self.kinds = [s.get("kind", "payload") for s in stations]
+        self.arms = np.array([s["arm"] for s in stations], dtype=float)
+        # None = no limit, as in fleet.json
+        self.max_weights = [None if s.get("max_weight") is None else float(s["max_weight"]) for s in stations]
+        self.limit_labels = [s.get("limit_label", s["name"]) for s in stations]
+        self.summary_labels = [s.get("summary_label", s["name"]) for s in stations]
+        self.alerts = [s.get("alert", f"{s['name']} exceeds allowed limit.") for s in stations]
+        self.inputs = [(i["key"], i.get("label", i["key"]), n) for n, s in enumerate(stations) for i in s["inputs"]]
+        self.input_keys = [key for key, _, _ in self.inputs]
+        # (n_inputs, n_stations) 0/1 matrix: input weights -> station weights
+        self.input_map = np.zeros((len(self.inputs), len(stations)))
+        for row, (_, _, station) in enumerate(self.inputs):
+            self.input_map[row, station] = 1.0
+
+        self.tank_names = [t["name"] for t in tanks]
+        self.tank_arms = np.array([t["arm"] for t in tanks], dtype=float)
+        self.tank_volumes = np.array([t["max_volume"] for t in tanks], dtype=float)
+        self.max_fuel_volume = float(self.tank_volumes.sum())
+        self.tank_shares = self.tank_volumes / self.max_fuel_volume
+        # Fuel spread by capacity acts at one effective arm
+        self.fuel_arm = float(self.tank_shares @ self.tank_arms)
+
+    def input_vector(self, payload):
+        return np.array([float(payload.get(key, 0.0) or 0.0) for key in self.input_keys])
+
+    def input_matrix(self, payload, n):
+        """Stack per-input arrays from a {key: array} payload into shape (n, n_inputs)."""
+        cols = [np.broadcast_to(np.asarray(payload.get(key, 0.0), dtype=float), (n,)) for key in self.input_keys]
+        return np.stack(cols, axis=-1) if cols else np.zeros((n, 0))
+
+    def station_weights(self, inputs):
+        return inputs @ self.input_map
+
+    def seat_rows(self):
+        """(station index, [(input key, label), ...]) for the seat stations, for summaries."""
+        rows = []
+        for n, kind in enumerate(self.kinds):
+            if kind == "seat":
+                rows.append((n, [(key, label) for key, label, st in self.inputs if st == n]))
+        return rows
+
+_tables = {}
+_lock = threading.Lock()
+
+def station_table(ac):
+    """Compiled StationTable for a type dict, built once per dict object."""
+    entry = _tables.get(id(ac))
+    if entry is None or entry[0] is not ac:
+        with _lock:
+            entry = (ac, StationTable(ac))
+            _tables[id(ac)] = entry
+    return entry[1]
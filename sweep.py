@@ -0,0 +1,108 @@
+"""What-if sweeps over two loading inputs.
+
+A sweep holds every other input at its current value and evaluates a grid
+over two station inputs (e.g. student x baggage) with evaluate_batch() in
+one pass, always with automatic maximum fuel. Results are cached per cell,
+keyed by the aircraft, the fixed inputs and the two swept values, so
+panning or refining a grid only evaluates the cells it has not seen.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from batch import FUEL_LIMIT_LABELS, evaluate_batch
+
+FIELDS = ("fuel_vol", "fuel_weight", "fuel_limit_by", "cg", "cg_margin", "alerts")
+# Swept values are matched at gram resolution
+QUANTUM = 1000
+
+def axis_values(start, stop, step):
+    """start..stop inclusive in steps of step."""
+    if step <= 0 or stop < start:
+        return np.array([float(start)])
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+def base_key(aircraft, loading, x_key, y_key, fleet_version=None):
+    """Everything a cell depends on except the two swept values."""
+    fixed = tuple(sorted((k, float(v or 0.0)) for k, v in loading.payload.items() if k not in (x_key, y_key)))
+    return (aircraft, fleet_version, float(loading.ew), float(loading.ew_moment), fixed, loading.category, x_key, y_key)
+
+class SweepCache:
+    def __init__(self, max_cells=500_000):
+        self.max_cells = max_cells
+        self._bases = OrderedDict()  # base key -> OrderedDict {(qx, qy): row of FIELDS}, least recently used first
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, ac, key, loading, x_key, xs, y_key, ys):
+        """Grids of FIELDS with shape (len(ys), len(xs)) for loading with x_key/y_key swept."""
+        xx, yy = np.meshgrid(np.asarray(xs, dtype=float), np.asarray(ys, dtype=float))
+        qx = np.rint(xx.ravel() * QUANTUM).astype(np.int64).tolist()
+        qy = np.rint(yy.ravel() * QUANTUM).astype(np.int64).tolist()
+        cell_keys = list(zip(qx, qy))
+        with self._lock:
+            cells = self._bases.setdefault(key, OrderedDict())
+            self._bases.move_to_end(key)
+            rows = [cells.get(ck) for ck in cell_keys]
+            for ck, row in zip(cell_keys, rows):
+                if row is not None:
+                    cells.move_to_end(ck)
+        missing = [n for n, row in enumerate(rows) if row is None]
+        if missing:
+            idx = np.array(missing)
+            payload = {k: float(v or 0.0) for k, v in loading.payload.items()}
+            payload[x_key] = xx.ravel()[idx]
+            payload[y_key] = yy.ravel()[idx]
+            res = evaluate_batch(ac, loading.ew, loading.ew_moment, payload, category=loading.category)
+            computed = np.stack([np.asarray(res[f], dtype=float) for f in FIELDS], axis=-1).tolist()
+            with self._lock:
+                # Another thread may have evicted this base meanwhile: then the
+                # cells only serve this call and are not kept
+                live = self._bases.get(key) is cells
+                for n, row in zip(missing, computed):
+                    rows[n] = row
+                    if live and cell_keys[n] not in cells:
+                        cells[cell_keys[n]] = row
+                        self._size += 1
+                if live:
+                    self._evict()
+        with self._lock:
+            self.hits += len(cell_keys) - len(missing)
+            self.misses += len(missing)
+        table = np.array(rows, dtype=float).reshape(xx.shape + (len(FIELDS),))
+        out = {f: table[..., n] for n, f in enumerate(FIELDS)}
+        out["fuel_limit_by"] = out["fuel_limit_by"].astype(np.int8)
+        out["alerts"] = out["alerts"].astype(np.uint32)
+        out["computed"] = len(missing)
+        return out
+
+    def _evict(self):
+        # Least recently used cells first: the oldest base's, then the next
+        # base's, down to the current base's own cells
+        while self._size > self.max_cells:
+            excess = self._size - self.max_cells
+            cells = next(iter(self._bases.values()))
+            if len(cells) <= excess:
+                self._bases.popitem(last=False)
+                self._size -= len(cells)
+            else:
+                for _ in range(excess):
+                    cells.popitem(last=False)
+                self._size -= excess
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        with self._lock:
+            return {"bases": len(self._bases), "cells": self._size, "hits": self.hits, "misses": self.misses}
+
+def limit_labels(result):
+    """Binding limit per cell: the fuel limit, or "Out of limits" where an alert is raised."""
+    labels = np.array(FUEL_LIMIT_LABELS + ("Out of limits",))
+    codes = np.where(result["alerts"] > 0, len(FUEL_LIMIT_LABELS), result["fuel_limit_by"])
+    return labels[codes]
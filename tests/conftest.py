@@ -0,0 +1,30 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live flat at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from engine import Loading, aircraft_data
+
+P2008 = "Tecnam P2008"
+
+@pytest.fixture
+def p2008():
+    return aircraft_data[P2008]
+
+def random_loadings(n, seed=0, manual_share=0.5):
+    """P2008 loadings from light to overweight, half with manual fuel (some above the tank)."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        ew = rng.uniform(330, 420)
+        out.append(Loading(
+            ew=ew,
+            ew_moment=ew * rng.uniform(1.75, 1.95),
+            payload={"student": rng.uniform(0, 130), "instructor": rng.uniform(0, 130), "bag1": rng.uniform(0, 30)},
+            fuel_vol=rng.uniform(0, 140) if rng.random() < manual_share else None,
+        ))
+    return out
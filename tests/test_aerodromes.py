@@ -0,0 +1,36 @@
+import pytest
+
+from aerodromes import AerodromeDB
+from mission_batch import parse_aerodromes
+
+def test_prefix_search_and_lookup(tmp_path):
+    path = tmp_path / "aerodromes.csv"
+    path.write_text(
+        "icao,name,elev_ft,runways\n"
+        "LPEV,Évora,807,01:1300:1300;19:1300:1200\n"
+        "LPSO,Ponte de Sor,390,\n"
+        "LPPT,Lisboa Humberto Delgado,374,\n"
+        "XXXX,No elevation,,\n", encoding="utf-8")
+    db = AerodromeDB(path)
+    assert len(db) == 3
+    assert db.get(" lpev ")["runways"] == [
+        {"designator": "01", "tora_m": 1300.0, "lda_m": 1300.0},
+        {"designator": "19", "tora_m": 1300.0, "lda_m": 1200.0}]
+    assert [r["icao"] for r in db.search("LP")] == ["LPEV", "LPPT", "LPSO"]
+    # Accent-free name words match too, ICAO matches first
+    assert [r["icao"] for r in db.search("evo")] == ["LPEV"]
+    assert [r["icao"] for r in db.search("sor")] == ["LPSO"]
+    assert [r["icao"] for r in db.search("lp", limit=1)] == ["LPEV"]
+    assert db.search("") == [] and db.search("zz") == []
+
+def test_blank_elevation_is_filled_from_the_database():
+    (parsed,) = parse_aerodromes("LPSO::1020:20")
+    assert parsed["icao"] == "LPSO" and parsed["elev_ft"] == 390.0
+    assert (parsed["qnh"], parsed["temp"], parsed["burn_vol"]) == (1020.0, 20.0, 0.0)
+    assert parse_aerodromes("ZZZZ:1200:1013:15")[0]["elev_ft"] == 1200.0
+
+def test_unknown_aerodrome_needs_an_elevation():
+    with pytest.raises(ValueError, match="elevation required for unknown aerodrome ZZZZ"):
+        parse_aerodromes("LPSO::1020:20;ZZZZ::1013:15")
+    with pytest.raises(ValueError, match="qnh"):
+        parse_aerodromes("LPSO::high:20")
@@ -0,0 +1,39 @@
+import os
+
+from assets import AssetRegistry
+
+def test_mtime_change_reloads_and_counters(tmp_path):
+    path = tmp_path / "icon.png"
+    path.write_bytes(b"one")
+    registry = AssetRegistry(check_interval=0.0)
+    first = registry.get(path)
+    assert (first.data, first.exists) == (b"one", True)
+    assert registry.get(path) is first
+    assert registry.stats() == {"entries": 1, "bytes": 3, "hits": 1, "misses": 1, "reloads": 0}
+
+    path.write_bytes(b"second")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = registry.get(path)
+    assert second.data == b"second" and second.sha256 != first.sha256
+    assert registry.stats() == {"entries": 1, "bytes": 6, "hits": 1, "misses": 2, "reloads": 1}
+
+def test_check_interval_skips_the_stat(tmp_path):
+    path = tmp_path / "afm.pdf"
+    path.write_bytes(b"v1")
+    registry = AssetRegistry(check_interval=3600.0)
+    registry.get(path)
+    path.write_bytes(b"v2-longer")
+    os.utime(path, ns=(0, 10**18))
+    # Still within the interval: the cached copy is served without touching the disk
+    assert registry.get(path).data == b"v1"
+
+def test_missing_files_and_byte_bound(tmp_path):
+    registry = AssetRegistry(max_bytes=5, check_interval=0.0)
+    assert not registry.get(tmp_path / "missing.png").exists
+    for name in "ab":
+        (tmp_path / name).write_bytes(b"xxx")
+        registry.get(tmp_path / name)
+    # Least recently used entries go first once the bound is exceeded
+    assert registry.stats()["entries"] == 1 and registry.stats()["bytes"] == 3
+    assert registry.get(tmp_path / "b").b64 == "eHh4"
@@ -0,0 +1,126 @@
+"""The P2008 as declared in fleet.json gives the same numbers, alerts and
+colours as the hard-coded calculation in the original mb.py (copied below)."""
+import pytest
+
+from conftest import random_loadings
+from engine import compute_mass_balance
+
+BASELINE_P2008 = {
+    "fuel_arm": 2.209,
+    "pilot_arm": 1.800,
+    "baggage_arm": 2.417,
+    "max_takeoff_weight": 650,
+    "max_fuel_volume": 124.0,
+    "max_passenger_weight": 230,
+    "max_baggage_weight": 20,
+    "cg_limits": (1.841, 1.978),
+    "fuel_density": 0.72,
+}
+
+def get_color(val, limit):
+    if limit is None: return "ok"
+    if val > limit:
+        return "bad"
+    elif val > (limit * 0.95):
+        return "warn"
+    else:
+        return "ok"
+
+def get_cg_color(cg, limits):
+    if not limits: return "ok"
+    mn, mx = limits
+    margin = (mx - mn) * 0.05
+    if cg < mn or cg > mx:
+        return "bad"
+    elif cg < mn + margin or cg > mx - margin:
+        return "warn"
+    else:
+        return "ok"
+
+def baseline(loading):
+    ac = BASELINE_P2008
+    ew, ew_moment = loading.ew, loading.ew_moment
+    pilot = loading.payload["student"] + loading.payload["instructor"]
+    bag1 = loading.payload["bag1"]
+    fuel_density = ac["fuel_density"]
+    useful_load = ac["max_takeoff_weight"] - (ew + pilot + bag1)
+    tank_capacity_weight = ac["max_fuel_volume"] * fuel_density
+    if loading.fuel_vol is None:
+        fuel_weight_possible = max(0.0, useful_load)
+        if fuel_weight_possible <= tank_capacity_weight:
+            fuel_weight = fuel_weight_possible
+            fuel_vol = fuel_weight / fuel_density
+            fuel_limit_by = "Maximum Weight"
+        else:
+            fuel_weight = tank_capacity_weight
+            fuel_vol = ac["max_fuel_volume"]
+            fuel_limit_by = "Tank Capacity"
+    else:
+        fuel_vol = loading.fuel_vol
+        fuel_weight = fuel_vol * fuel_density
+        fuel_weight_limit = max(0.0, useful_load)
+        if fuel_vol > ac["max_fuel_volume"]:
+            fuel_vol = ac["max_fuel_volume"]
+            fuel_weight = fuel_vol * fuel_density
+        if fuel_weight > fuel_weight_limit:
+            fuel_weight = fuel_weight_limit
+            fuel_vol = fuel_weight / fuel_density
+        if fuel_vol >= ac["max_fuel_volume"] or (fuel_weight > useful_load and useful_load < tank_capacity_weight):
+            fuel_limit_by = "Tank Capacity" if fuel_vol >= ac["max_fuel_volume"] else "Maximum Weight"
+        else:
+            fuel_limit_by = "Manual Entry"
+    total_weight = ew + pilot + bag1 + fuel_weight
+    total_moment = ew_moment + pilot * ac["pilot_arm"] + bag1 * ac["baggage_arm"] + fuel_weight * ac["fuel_arm"]
+    cg = (total_moment / total_weight) if total_weight > 0 else 0
+    alert_list = []
+    if total_weight > ac["max_takeoff_weight"]:
+        alert_list.append("Total weight exceeds maximum takeoff weight.")
+    if bag1 > ac["max_baggage_weight"]:
+        alert_list.append("Baggage exceeds allowed limit.")
+    if ac.get("max_passenger_weight") and pilot > ac["max_passenger_weight"]:
+        alert_list.append("Pilot + Passenger (student + instructor) exceed allowed limit.")
+    mn, mx = ac["cg_limits"]
+    if cg < mn or cg > mx:
+        alert_list.append("CG outside safe envelope.")
+    return {
+        "fuel_vol": fuel_vol, "fuel_limit_by": fuel_limit_by, "total_weight": total_weight,
+        "total_moment": total_moment, "cg": cg, "alerts": alert_list,
+        "colors": {
+            "total_weight": get_color(total_weight, ac["max_takeoff_weight"]),
+            "station:Pilot & Passenger": get_color(pilot, ac["max_passenger_weight"]),
+            "cg": get_cg_color(cg, ac["cg_limits"]),
+        },
+    }
+
+def _cases(p2008):
+    for loading in random_loadings(1000, seed=12):
+        result = compute_mass_balance(p2008, loading)
+        # Keeping automatic fuel inside the envelope is new; the baseline had no such limit
+        if result.fuel_limit_by != "CG Envelope":
+            yield loading, result, baseline(loading)
+
+def test_numbers_match_baseline(p2008):
+    checked = 0
+    for loading, result, old in _cases(p2008):
+        assert result.fuel_vol == pytest.approx(old["fuel_vol"], abs=1e-9)
+        assert result.fuel_limit_by == old["fuel_limit_by"]
+        assert result.total_weight == pytest.approx(old["total_weight"], abs=1e-9)
+        assert result.total_moment == pytest.approx(old["total_moment"], abs=1e-9)
+        assert result.cg == pytest.approx(old["cg"], abs=1e-12)
+        checked += 1
+    assert checked > 500
+
+def test_alerts_match_baseline_in_order(p2008):
+    seen = set()
+    for loading, result, old in _cases(p2008):
+        assert result.alert_list == old["alerts"]
+        seen.update(old["alerts"])
+    assert len(seen) == 4
+
+def test_colors_match_baseline(p2008):
+    seen = set()
+    for loading, result, old in _cases(p2008):
+        for name, color in old["colors"].items():
+            assert result.status(name) == color, name
+            seen.add((name, color))
+    assert len(seen) == 9
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from batch import FUEL_LIMIT_LABELS, alert_messages, evaluate_batch
+from conftest import random_loadings
+from engine import Loading, compute_mass_balance
+
+def _batch(ac, loadings):
+    return evaluate_batch(
+        ac,
+        np.array([l.ew for l in loadings]),
+        np.array([l.ew_moment for l in loadings]),
+        {key: np.array([l.payload[key] for l in loadings]) for key in loadings[0].payload},
+        fuel_vol=np.array([np.nan if l.fuel_vol is None else l.fuel_vol for l in loadings]),
+    )
+
+def test_batch_matches_engine(p2008):
+    loadings = random_loadings(400)
+    res = _batch(p2008, loadings)
+    for n, loading in enumerate(loadings):
+        one = compute_mass_balance(p2008, loading)
+        assert res["fuel_vol"][n] == pytest.approx(one.fuel_vol, abs=1e-9)
+        assert res["fuel_weight"][n] == pytest.approx(one.fuel_weight, abs=1e-9)
+        assert FUEL_LIMIT_LABELS[res["fuel_limit_by"][n]] == one.fuel_limit_by
+        assert res["total_weight"][n] == pytest.approx(one.total_weight, abs=1e-9)
+        assert res["total_moment"][n] == pytest.approx(one.total_moment, abs=1e-9)
+        assert res["cg"][n] == pytest.approx(one.cg, abs=1e-12)
+        assert res["station_moments"][n].tolist() == pytest.approx(one.station_moments, abs=1e-9)
+        assert alert_messages(res["alerts"][n], p2008) == one.alert_list
+
+def test_batch_broadcasts_inputs(p2008):
+    students = np.linspace(0, 120, 7)
+    res = evaluate_batch(p2008, 370.0, 680.0, {"student": students[:, None], "instructor": np.array([0.0, 80.0])})
+    assert res["total_weight"].shape == (14,)
+    one = compute_mass_balance(p2008, Loading(ew=370.0, ew_moment=680.0, payload={"student": students[3], "instructor": 80.0}))
+    assert res["cg"].reshape(7, 2)[3, 1] == pytest.approx(one.cg, abs=1e-12)
+    # A per-row fuel volume with scalar everything else
+    fuel = np.array([20.0, np.nan, 90.0])
+    res = evaluate_batch(p2008, 370.0, 680.0, {"student": 80.0, "instructor": 70.0}, fuel_vol=fuel)
+    assert res["total_weight"].shape == (3,)
+    for n, vol in enumerate(fuel):
+        one = compute_mass_balance(p2008, Loading(ew=370.0, ew_moment=680.0, payload={"student": 80.0, "instructor": 70.0},
+                                                  fuel_vol=None if np.isnan(vol) else vol))
+        assert res["fuel_vol"][n] == pytest.approx(one.fuel_vol)
+
+def test_undeclared_payload_keys_carry_no_weight(p2008):
+    payload = {"student": 70.0, "instructor": 80.0, "bag1": 10.0}
+    plain = compute_mass_balance(p2008, Loading(ew=360.0, ew_moment=670.0, payload=payload))
+    extra = compute_mass_balance(p2008, Loading(ew=360.0, ew_moment=670.0, payload=dict(payload, bag2=40.0)))
+    assert (extra.fuel_weight, extra.total_weight, extra.fuel_limit_by) == (plain.fuel_weight, plain.total_weight, plain.fuel_limit_by)
+    res = evaluate_batch(p2008, 360.0, 670.0, dict(payload, bag2=40.0))
+    assert res["fuel_weight"][0] == pytest.approx(plain.fuel_weight)
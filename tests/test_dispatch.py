@@ -0,0 +1,66 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from dispatch import assign, linear_assignment, load_crews
+
+def brute_force(cost):
+    """Cheapest assignment of every row to a distinct column, by trying them all."""
+    n, m = cost.shape
+    return min(sum(cost[r, c] for r, c in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (3, 5), (5, 5), (4, 6)])
+def test_linear_assignment_is_optimal(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        cost = rng.integers(-50, 50, shape).astype(float)
+        cols = linear_assignment(cost)
+        assert len(set(cols.tolist())) == shape[0] and (cols >= 0).all()
+        assert cost[np.arange(shape[0]), cols].sum() == pytest.approx(brute_force(cost))
+
+def crews_and_aircraft(rng, n_crews, n_aircraft):
+    aircraft = [{"registration": f"CS-A{n}", "aircraft": "Tecnam P2008", "ew": float(rng.uniform(340, 400)),
+                 "ew_moment": 0.0, "burn_rate": 20.0} for n in range(n_aircraft)]
+    for a in aircraft:
+        a["ew_moment"] = a["ew"] * float(rng.uniform(1.80, 1.90))
+    rows = [{"crew": f"C{n}", "student": str(rng.uniform(50, 120)), "instructor": str(rng.uniform(60, 120)),
+             "bag1": str(rng.uniform(0, 25))} for n in range(n_crews)]
+    return aircraft, load_crews(rows)
+
+def best_by_brute_force(feasible, score):
+    """(crews flown, total score) of the best one-aircraft-per-crew assignment."""
+    n_aircraft, n_crews = feasible.shape
+    best = (0, 0.0)
+    for assigned in itertools.product(range(-1, n_aircraft), repeat=n_crews):
+        used = [a for a in assigned if a >= 0]
+        if len(used) != len(set(used)) or any(a >= 0 and not feasible[a, k] for k, a in enumerate(assigned)):
+            continue
+        total = sum(score[a, k] for k, a in enumerate(assigned) if a >= 0)
+        best = max(best, (len(used), total), key=lambda t: (t[0], round(t[1], 6)))
+    return best
+
+@pytest.mark.parametrize("seed", range(6))
+def test_assign_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    aircraft, crews = crews_and_aircraft(rng, n_crews=4, n_aircraft=3 + seed % 2)
+    results, pairs = assign(aircraft, crews)
+    flown = [(a, k) for k, a in enumerate(pairs["assigned"]) if a >= 0]
+    assert all(pairs["feasible"][a, k] for a, k in flown)
+    assert len({a for a, _ in flown}) == len(flown)
+    count, total = best_by_brute_force(pairs["feasible"], pairs["fuel_vol"])
+    assert len(flown) == count
+    assert sum(pairs["fuel_vol"][a, k] for a, k in flown) == pytest.approx(total)
+    assert [r["status"] == "assigned" for r in results] == [a >= 0 for a in pairs["assigned"]]
+
+def test_slots_reuse_aircraft_and_unfit_crews_get_a_reason():
+    aircraft = [{"registration": "CS-AAA", "aircraft": "Tecnam P2008", "ew": 360.0, "ew_moment": 669.6, "burn_rate": 20.0}]
+    crews = load_crews([
+        {"crew": "morning", "slot": "am", "student": "70", "instructor": "80"},
+        {"crew": "afternoon", "slot": "pm", "student": "70", "instructor": "80"},
+        {"crew": "heavy", "slot": "pm", "student": "130", "instructor": "130"},
+    ])
+    results, _ = assign(aircraft, crews)
+    assert [(r["crew"], r["status"], r["registration"]) for r in results] == [
+        ("morning", "assigned", "CS-AAA"), ("afternoon", "assigned", "CS-AAA"), ("heavy", "no feasible aircraft", "")]
+    assert "Pilot + Passenger" in results[2]["reason"]
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from envelope import Envelope, get_envelope
+
+POLYGON = [[1.841, 450], [1.978, 450], [1.978, 650], [1.870, 650], [1.841, 550]]
+
+def point_in_polygon(x, y, pts):
+    inside = False
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:] + pts[:1]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+def test_cg_limits_rectangle_matches_min_max_check(p2008):
+    env = get_envelope(p2008)
+    mn, mx = p2008["cg_limits"]
+    rng = np.random.default_rng(13)
+    cg = rng.uniform(1.75, 2.05, 5000)
+    weight = rng.uniform(300, 700, 5000)
+    assert np.array_equal(env.contains(cg, weight), (cg >= mn) & (cg <= mx))
+    inside = (cg > mn) & (cg < mx)
+    assert env.margin(cg, weight)[inside] == pytest.approx(np.minimum(cg - mn, mx - cg)[inside])
+
+def test_polygon_margin_sign_matches_point_in_polygon():
+    env = Envelope("Normal", POLYGON)
+    rng = np.random.default_rng(130)
+    cg = rng.uniform(1.80, 2.02, 5000)
+    weight = rng.uniform(451, 649, 5000)
+    expected = np.array([point_in_polygon(c, w, POLYGON) for c, w in zip(cg, weight)])
+    assert np.array_equal(env.margin(cg, weight) > 0, expected)
+
+def test_polygon_rejects_weights_above_and_below_it():
+    env = Envelope("Normal", [[1.85, 400], [1.95, 400], [1.97, 650], [1.84, 650]])
+    cg = np.array([1.9, 1.9, 1.9, 1.9, 1.9])
+    weight = np.array([100.0, 399.9, 400.0, 650.0, 900.0])
+    assert env.contains(cg, weight).tolist() == [False, False, True, True, False]
+    assert env.margin(1.9, 900) < 0
+    assert env.margin(1.9, 100) < 0
+    # The slanted polygon from the docstring starts at 450 kg
+    assert not Envelope("Normal", POLYGON).contains(1.9, 420)
+
+def test_cg_limits_rectangle_only_checks_the_cg(p2008):
+    # Overweight is the weight rule's alert, not the envelope's
+    env = get_envelope(p2008)
+    assert env.contains(1.9, p2008["max_takeoff_weight"] + 100)
+    assert not env.contains(2.0, p2008["max_takeoff_weight"] + 100)
+
+def test_polygon_cg_limits_follow_the_slanted_edge():
+    env = Envelope("Normal", POLYGON)
+    assert env.cg_limits_at(500) == pytest.approx((1.841, 1.978))
+    assert env.cg_limits_at(600) == pytest.approx((1.8555, 1.978))
+
+def test_categories(p2008):
+    ac = dict(p2008, envelopes={"Normal": POLYGON, "Utility": [[1.85, 450], [1.95, 450], [1.95, 600], [1.85, 600]]})
+    assert get_envelope(ac).name == "Normal"
+    assert get_envelope(ac, "Utility").cg_range == (1.85, 1.95)
+    with pytest.raises(ValueError):
+        get_envelope(ac, "Aerobatic")
+    with pytest.raises(ValueError):
+        Envelope("Bad", [[1.8, 400], [1.9, 400]])
+
+@pytest.mark.parametrize("envelope", [None, POLYGON])
+def test_max_fuel_stays_inside_the_envelope(p2008, envelope):
+    from conftest import random_loadings
+    from engine import compute_mass_balance
+    ac = dict(p2008, envelopes={"Normal": envelope}) if envelope else p2008
+    env = get_envelope(ac)
+    fuel_arm = 2.209
+    limited = 0
+    for loading in random_loadings(2000, seed=14, manual_share=0.0):
+        result = compute_mass_balance(ac, loading)
+        if result.fuel_limit_by != "CG Envelope":
+            continue
+        limited += 1
+        assert env.contains(result.cg, result.total_weight)
+        # ...and it is the most fuel that does: a little more leaves the envelope
+        cg = (result.total_moment + 0.05 * fuel_arm) / (result.total_weight + 0.05)
+        assert not env.contains(cg, result.total_weight + 0.05)
+        # The envelope only ever lowers the weight and tank limits
+        useful_load = p2008["max_takeoff_weight"] - (result.total_weight - result.fuel_weight)
+        assert result.fuel_weight < min(useful_load, 124.0 * p2008["fuel_density"])
+    assert limited >= 40
+
+def test_max_fuel_keeps_cap_when_already_inside_or_never_inside():
+    env = Envelope("Normal", POLYGON)
+    # Inside at the cap: unchanged
+    fuel, limited = env.max_fuel(450.0, 450.0 * 1.90, 2.209, 50.0)
+    assert (float(fuel), bool(limited)) == (50.0, False)
+    # Outside at every fuel load: the cap is kept and the CG alert reports it
+    fuel, limited = env.max_fuel(500.0, 500.0 * 1.70, 2.209, 20.0)
+    assert (float(fuel), bool(limited)) == (20.0, False)
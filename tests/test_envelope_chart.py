@@ -0,0 +1,40 @@
+import struct
+
+import pytest
+
+import envelope_chart
+from envelope_chart import PIXELS, background
+
+@pytest.fixture
+def renders(monkeypatch, tmp_path):
+    monkeypatch.setenv("MB_CHART_CACHE", str(tmp_path))
+    calls = []
+    draw = envelope_chart.render_background
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return draw(*args, **kwargs)
+
+    monkeypatch.setattr(envelope_chart, "render_background", counting)
+    return calls
+
+def test_one_png_per_envelope_reused(renders, tmp_path, p2008):
+    ac = dict(p2008)
+    frame, path = background(ac)
+    assert background(ac) == (frame, path)
+    # Another type dict with the same envelope finds the PNG already on disk
+    assert background(dict(p2008))[1] == path
+    assert len(renders) == 1
+    assert [p.name for p in tmp_path.iterdir()] == [path.rsplit("/", 1)[-1]]
+
+    data = open(path, "rb").read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    assert struct.unpack(">II", data[16:24]) == PIXELS
+    assert frame.cg_lo < p2008["cg_limits"][0] and frame.cg_hi > p2008["cg_limits"][1]
+    assert frame.w_hi > p2008["max_takeoff_weight"]
+
+def test_each_aircraft_gets_its_own_png(renders, p2008):
+    utility = dict(p2008, envelopes={"Utility": [[1.85, 450], [1.95, 450], [1.95, 600], [1.85, 600]]})
+    paths = {background(dict(p2008))[1], background(utility)[1], background(utility)[1]}
+    assert len(paths) == 2 and len(renders) == 2
+    assert background(dict(p2008, cg_limits=None)) is None
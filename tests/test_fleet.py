@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from fleet import FleetRegistry
+
+def write(path, doc):
+    path.write_text(json.dumps(doc), encoding="utf-8")
+    # Make every write visible to the mtime check, however coarse the filesystem clock
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000 * (write.calls + 1)))
+    write.calls += 1
+
+write.calls = 0
+
+def fleet_doc(p2008, mtow=650, aircraft=None):
+    other = dict(p2008, max_takeoff_weight=mtow)
+    return {"version": 1, "types": {"Tecnam P2008": p2008, "Other": other},
+            "aircraft": aircraft if aircraft is not None else [
+                {"registration": "cs-abc", "type": "Tecnam P2008", "empty_weight": 360.0, "empty_moment": 669.6},
+                {"registration": "CS-DEF", "type": "Other", "empty_weight": 370.0, "empty_moment": 690.0},
+            ]}
+
+def test_refresh_replaces_only_changed_entries(tmp_path, p2008):
+    path = tmp_path / "fleet.json"
+    write(path, fleet_doc(p2008))
+    fleet = FleetRegistry(path, check_interval=0.0)
+    types, p2008_entry, other_entry = fleet.types, fleet.types["Tecnam P2008"], fleet.types["Other"]
+    assert fleet.get(" cs-abc ")["empty_weight"] == 360.0
+    assert fleet.registrations("Other") == ["CS-DEF"]
+    assert fleet.refresh() is False
+
+    write(path, fleet_doc(p2008, mtow=700, aircraft=[
+        {"registration": "CS-ABC", "type": "Tecnam P2008", "empty_weight": 361.0, "empty_moment": 671.0}]))
+    assert fleet.refresh() is True
+    # Same dicts, updated in place; untouched entries keep their identity
+    assert fleet.types is types
+    assert fleet.types["Tecnam P2008"] is p2008_entry
+    assert fleet.types["Other"] is not other_entry and fleet.types["Other"]["max_takeoff_weight"] == 700
+    assert fleet.get("CS-ABC")["empty_weight"] == 361.0
+    assert fleet.get("CS-DEF") is None and fleet.registrations("Other") == []
+    assert fleet.reloads == 2
+
+def test_refresh_waits_for_the_check_interval(tmp_path, p2008):
+    path = tmp_path / "fleet.json"
+    write(path, fleet_doc(p2008))
+    fleet = FleetRegistry(path, check_interval=3600.0)
+    write(path, fleet_doc(p2008, mtow=700))
+    assert fleet.refresh() is False
+    assert fleet.types["Other"]["max_takeoff_weight"] == 650
+
+def test_refresh_keeps_the_last_good_registry(tmp_path, p2008, caplog):
+    path = tmp_path / "fleet.json"
+    write(path, fleet_doc(p2008))
+    fleet = FleetRegistry(path, check_interval=0.0)
+    path.write_text(json.dumps(fleet_doc(p2008))[:40], encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**12))
+    assert fleet.refresh() is False
+    assert "not reloaded" in caplog.text
+    assert fleet.get("CS-ABC")["empty_weight"] == 360.0 and fleet.reloads == 1
+    write(path, dict(fleet_doc(p2008), version=2))
+    assert fleet.refresh() is False
+    assert fleet.types["Other"]["max_takeoff_weight"] == 650
+    # Once the file is whole again it is picked up
+    write(path, fleet_doc(p2008, mtow=700))
+    assert fleet.refresh() is True
+    assert fleet.types["Other"]["max_takeoff_weight"] == 700
+
+def test_bad_files_are_rejected(tmp_path, p2008):
+    path = tmp_path / "fleet.json"
+    write(path, dict(fleet_doc(p2008), version=2))
+    with pytest.raises(ValueError, match="version"):
+        FleetRegistry(path)
+    write(path, fleet_doc(p2008, aircraft=[{"registration": "CS-XYZ", "type": "Cessna"}]))
+    with pytest.raises(ValueError, match="CS-XYZ"):
+        FleetRegistry(path)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from batch import alert_messages, evaluate_batch
+from conftest import random_loadings
+from engine import Loading, compute_mass_balance
+from limits import BAD, OK, WARN, Rule, limit_rules
+
+def test_rule_severity_bands():
+    assert Rule("x", max=100).severity([90, 96, 101]).tolist() == [OK, WARN, BAD]
+    assert Rule("x", min=30).severity([40, 31, 29]).tolist() == [OK, WARN, BAD]
+    both = Rule("x", min=0, max=100, warn_fraction=0.9)
+    assert both.severity([-1, 5, 50, 95, 101]).tolist() == [BAD, WARN, OK, WARN, BAD]
+    assert Rule("x").severity([1e9]).tolist() == [OK]
+
+def test_declared_limits_override_and_add(p2008):
+    ac = dict(p2008, limits=[
+        {"name": "station:Baggage", "max": 10, "message": "Baggage above 10 kg needs the cargo net."},
+        {"name": "fuel_vol", "min": 30, "label": "Fuel", "message": "Less than 30 L of fuel."},
+    ], alert_order=["fuel_vol", "station:Baggage"])
+    rules = limit_rules(ac)
+    # The override keeps the default rule's place; the new rule goes last
+    assert rules.names == ["total_weight", "station:Pilot & Passenger", "station:Baggage", "cg", "fuel_vol"]
+    loading = Loading(ew=370.0, ew_moment=680.0, payload={"student": 70.0, "bag1": 15.0}, fuel_vol=20.0)
+    result = compute_mass_balance(ac, loading)
+    assert result.alert_list[:2] == ["Less than 30 L of fuel.", "Baggage above 10 kg needs the cargo net."]
+    assert result.status("fuel_vol") == "bad"
+
+def test_bad_declarations_fail_when_the_type_loads(p2008):
+    with pytest.raises(ValueError, match="Unknown limit quantity"):
+        limit_rules(dict(p2008, limits=[{"name": "input:bag9", "max": 1}]))
+    with pytest.raises(ValueError, match="alert_order"):
+        limit_rules(dict(p2008, alert_order=["station:Cargo"]))
+
+def test_batch_masks_match_single_evaluation(p2008):
+    ac = dict(p2008, limits=[{"name": "input:bag1", "max": 10, "message": "Cargo net."},
+                             {"name": "fuel_weight", "min": 20, "max": 80}])
+    loadings = random_loadings(300, seed=22)
+    res = evaluate_batch(
+        ac, np.array([l.ew for l in loadings]), np.array([l.ew_moment for l in loadings]),
+        {key: np.array([l.payload[key] for l in loadings]) for key in loadings[0].payload},
+        fuel_vol=np.array([np.nan if l.fuel_vol is None else l.fuel_vol for l in loadings]),
+    )
+    rules = limit_rules(ac)
+    for n, loading in enumerate(loadings):
+        one = compute_mass_balance(ac, loading)
+        assert alert_messages(res["alerts"][n], ac) == one.alert_list
+        assert rules.statuses(res["severity"][n]) == one.limit_status
+    assert rules.codes(res["severity"], "input:student").tolist() == [OK] * len(loadings)
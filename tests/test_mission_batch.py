@@ -0,0 +1,63 @@
+import csv
+
+from mission_batch import MANIFEST_FIELDS, run
+
+ROWS = [
+    {"aircraft": "Tecnam P2008", "mission_number": "1", "ew": "360", "ew_moment": "669.6",
+     "student": "70", "instructor": "80", "bag1": "10", "fuel_vol": "60"},
+    # Too much baggage (the fuel is clamped to MTOW)
+    {"aircraft": "Tecnam P2008", "mission_number": "2", "ew": "400", "ew_moment": "744",
+     "student": "110", "instructor": "110", "bag1": "25", "fuel_vol": "120"},
+    {"aircraft": "Concorde", "mission_number": "3", "ew": "360", "ew_moment": "669.6"},
+    # Same mission number as row 1, and one that tries to leave the output directory
+    {"aircraft": "Tecnam P2008", "mission_number": "1", "ew": "360", "ew_moment": "669.6", "student": "60"},
+    {"aircraft": "Tecnam P2008", "mission_number": "../../x", "ew": "360", "ew_moment": "669.6", "student": "60"},
+    {"aircraft": "Tecnam P2008", "mission_number": "a/b", "ew": "360", "ew_moment": "669.6", "student": "60"},
+]
+
+def write_schedule(path, rows):
+    fields = sorted({k for r in rows for k in r})
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def read_manifest(out):
+    with open(out / "manifest.csv", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == MANIFEST_FIELDS
+        return list(reader)
+
+def test_run_writes_every_row_in_schedule_order(tmp_path):
+    schedule = write_schedule(tmp_path / "schedule.csv", ROWS)
+    out = tmp_path / "out" / "reports"
+    counts = run(schedule, out, workers=2, max_pending=3)
+    manifest = read_manifest(out)
+
+    assert [m["row"] for m in manifest] == [str(n) for n in range(1, len(ROWS) + 1)]
+    assert [m["status"] for m in manifest] == ["ok", "alert", "failed", "ok", "ok", "ok"]
+    assert counts == {"ok": 4, "alert": 1, "failed": 1}
+    assert manifest[1]["alerts"].split(" | ") == ["Baggage exceeds allowed limit."]
+    assert "Unknown aircraft type: Concorde" in manifest[2]["error"]
+    assert manifest[2]["output"] == ""
+
+    outputs = [m["output"] for m in manifest if m["output"]]
+    # One PDF per row, all of them directly inside the output directory
+    assert len(set(outputs)) == 5
+    assert sorted(p.name for p in out.glob("*.pdf")) == sorted(p.rsplit("/", 1)[-1] for p in outputs)
+    assert list(tmp_path.glob("*.pdf")) == [] and list((tmp_path / "out").glob("*.pdf")) == []
+    assert manifest[3]["output"].endswith("mass_balance_mission1_row4.pdf")
+
+def test_pack_mode_writes_one_pdf_with_pages_in_order(tmp_path):
+    schedule = write_schedule(tmp_path / "schedule.csv", ROWS[:3])
+    out = tmp_path / "reports"
+    counts = run(schedule, out, workers=2, pack="dispatch.pdf")
+    manifest = read_manifest(out)
+
+    assert counts == {"ok": 1, "alert": 1, "failed": 1}
+    assert [p.name for p in out.glob("*.pdf")] == ["dispatch.pdf"]
+    assert (out / "dispatch.pdf").read_bytes().startswith(b"%PDF-")
+    pages = [int(m["output"].rsplit("#page=", 1)[1]) for m in manifest[:2]]
+    assert pages[0] == 1 and pages[1] > pages[0]
+    assert manifest[2]["status"] == "failed" and manifest[2]["output"] == ""
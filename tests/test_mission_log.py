@@ -0,0 +1,120 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from engine import Loading, compute_mass_balance
+from mission_log import MAX_RETRIES, MissionLog, mission_entry
+
+def _entry(p2008, n, registration="cs-aaa", flight_datetime="2026-03-01 09:00 UTC"):
+    loading = Loading(ew=370.0, ew_moment=680.0, payload={"student": 70.0 + n, "instructor": 80.0})
+    return mission_entry("report", "Tecnam P2008", loading, compute_mass_balance(p2008, loading),
+                         registration, str(n), flight_datetime, "Pilot")
+
+@pytest.fixture
+def traced(tmp_path, monkeypatch):
+    """A MissionLog whose connections record every SQL statement they run."""
+    statements = []
+    connect = MissionLog._connect
+
+    def _connect(self):
+        db = connect(self)
+        db.set_trace_callback(statements.append)
+        return db
+
+    monkeypatch.setattr(MissionLog, "_connect", _connect)
+    return MissionLog(tmp_path / "log.sqlite3", flush_interval=0.2), statements
+
+def test_one_transaction_per_batch(traced, p2008):
+    log, statements = traced
+    for n in range(200):
+        log.record(_entry(p2008, n))
+    assert log.flush(10)
+    assert log.written == 200
+    writes = [s.split()[0] for s in statements if s.split()[0] in ("BEGIN", "INSERT", "COMMIT", "ROLLBACK")]
+    # Every INSERT sits inside an explicit transaction, and there are far fewer transactions than rows
+    assert writes.count("BEGIN") == writes.count("COMMIT") < 20
+    depth = 0
+    for s in writes:
+        depth += {"BEGIN": 1, "COMMIT": -1}.get(s, 0)
+        if s == "INSERT":
+            assert depth == 1
+
+def test_rows_sqlite_refuses_are_kept_not_lost(traced, p2008):
+    log, _ = traced
+    log.record(_entry(p2008, 1))
+    log.record(dict(_entry(p2008, 2), aircraft={"not": "bindable"}))
+    log.record(_entry(p2008, 3))
+    assert log.flush(10)
+    assert (log.written, log.rejected) == (2, 1)
+    rejected = [json.loads(line) for line in open(log.rejected_path, encoding="utf-8")]
+    assert rejected[0]["mission_number"] == "2" and "error" in rejected[0]
+
+def failing_insert(monkeypatch, *errors):
+    """Make MissionLog._insert raise errors in turn before inserting; returns the list of calls."""
+    calls, insert, errors = [], MissionLog._insert, list(errors)
+
+    def _insert(db, sql, rows):
+        calls.append(len(rows))
+        if errors:
+            raise errors.pop(0)
+        insert(db, sql, rows)
+
+    monkeypatch.setattr(MissionLog, "_insert", staticmethod(_insert))
+    return calls
+
+def test_only_locked_writes_are_retried(tmp_path, monkeypatch, p2008):
+    monkeypatch.setattr("mission_log.time.sleep", lambda s: None)
+    locked = sqlite3.OperationalError("database is locked")
+    calls = failing_insert(monkeypatch, locked, locked)
+    log = MissionLog(tmp_path / "log.sqlite3", flush_interval=0.05)
+    log.record(_entry(p2008, 1))
+    assert log.flush(10)
+    assert (log.written, log.rejected, calls) == (1, 0, [1, 1, 1])
+
+    calls = failing_insert(monkeypatch, *[sqlite3.OperationalError("disk I/O error")] * 3)
+    log.record(_entry(p2008, 2))
+    log.record(_entry(p2008, 3))
+    assert log.flush(10)
+    # Not retried: the batch, then each row, once
+    assert (log.written, log.rejected, calls) == (1, 2, [2, 1, 1])
+
+def test_a_batch_locked_for_too_long_is_rejected(tmp_path, monkeypatch, p2008):
+    sleeps = []
+    monkeypatch.setattr("mission_log.time.sleep", sleeps.append)
+    calls = failing_insert(monkeypatch, *[sqlite3.OperationalError("database is locked")] * 100)
+    log = MissionLog(tmp_path / "log.sqlite3", flush_interval=0.25)
+    log.record(_entry(p2008, 1))
+    assert log.flush(10)
+    assert (log.written, log.rejected) == (0, 1) and len(calls) == MAX_RETRIES + 1
+    assert sleeps == [0.25, 0.5, 1.0, 2.0, 4.0, 8.0]
+    (rejected,) = [json.loads(line) for line in open(log.rejected_path, encoding="utf-8")]
+    assert rejected["mission_number"] == "1" and rejected["error"] == "database is locked"
+
+def test_log_is_append_only(tmp_path, p2008):
+    log = MissionLog(tmp_path / "log.sqlite3", flush_interval=0.05)
+    log.record(_entry(p2008, 1))
+    assert log.flush(10)
+    db = sqlite3.connect(log.path)
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        db.execute("UPDATE missions SET pilot = 'Someone else'")
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        db.execute("DELETE FROM missions")
+    db.close()
+    assert len(log.query()) == 1
+
+def test_queries_and_export_filter(tmp_path, p2008):
+    log = MissionLog(tmp_path / "log.sqlite3", flush_interval=0.05)
+    for n in range(30):
+        log.record(_entry(p2008, n, "cs-aaa" if n % 3 else "cs-bbb", f"2026-03-{n % 28 + 1:02d} 09:00 UTC"))
+    assert log.flush(10)
+    assert all(r["registration"] == "CS-BBB" for r in log.query(registration="CS-BBB"))
+    assert len(log.query(registration="CS-BBB")) == 10
+    dates = [r["flight_date"] for r in log.rows(chunk_size=7, date_from="2026-03-05", date_to="2026-03-10")]
+    assert dates == sorted(dates) and len(dates) == 6
+    out = io.StringIO()
+    assert log.export(out, "jsonl", registration="CS-AAA") == 20
+    assert json.loads(out.getvalue().splitlines()[0])["data"]["payload"]["instructor"] == 80.0
+    with pytest.raises(ValueError):
+        log.query(aircraft="Tecnam P2008")
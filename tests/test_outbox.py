@@ -0,0 +1,109 @@
+import base64
+
+import pytest
+
+import outbox
+from outbox import Outbox, PermanentError, TransientError
+
+class StubTransport:
+    """Records what it sends; raises the queued errors first, one per send."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    def send(self, message):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(message)
+
+class ManualOutbox(Outbox):
+    """No worker thread: the test drives flush_digest() and process_due()."""
+
+    def start(self):
+        pass
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox.time, "time", clock)
+    monkeypatch.setattr(outbox.random, "uniform", lambda lo, hi: 1.0)
+    return clock
+
+def message(to="ops@example.com", html="<p>report</p>", pdf=b"%PDF-1"):
+    return {"to": to, "subject": "M&B", "html": html,
+            "attachments": [{"filename": "report.pdf", "content": base64.b64encode(pdf).decode("ascii")}]}
+
+def test_transient_errors_back_off_then_send(tmp_path, clock):
+    transport = StubTransport(TransientError("503"), TransientError("timeout"))
+    box = ManualOutbox(tmp_path / "outbox.db", transport, backoff=2.0)
+    msg_id = box.enqueue(message())
+
+    assert box.process_due() == 1
+    assert box.status(msg_id) == {"status": "queued", "error": "503"}
+    # Not due again until the backoff (2 ** 1 s) has passed
+    assert box.process_due() == 0
+    clock.now += 2.0
+    assert box.process_due() == 1
+    assert box.status(msg_id)["error"] == "timeout"
+    clock.now += 3.9
+    assert box.process_due() == 0
+    clock.now += 0.1
+    box.process_due()
+    assert box.status(msg_id) == {"status": "sent", "error": None}
+    # Attachments go out with their content restored
+    assert base64.b64decode(transport.sent[0]["attachments"][0]["content"]) == b"%PDF-1"
+
+def test_permanent_error_and_too_many_attempts_fail(tmp_path, clock):
+    transport = StubTransport(PermanentError("400 bad address"), TransientError("a"), TransientError("b"))
+    box = ManualOutbox(tmp_path / "outbox.db", transport, max_attempts=2, backoff=1.0)
+    bad, flaky = box.enqueue(message(to="nobody")), box.enqueue(message())
+
+    box.process_due()
+    assert box.status(bad) == {"status": "failed", "error": "400 bad address"}
+    assert box.status(flaky)["status"] == "queued"
+    clock.now += 10
+    box.process_due()
+    assert box.status(flaky) == {"status": "failed", "error": "b"}
+    assert transport.sent == []
+    assert box.counts() == {"failed": 2}
+
+def test_digest_per_recipient_with_deduplicated_attachments(tmp_path, clock):
+    transport = StubTransport()
+    box = ManualOutbox(tmp_path / "outbox.db", transport, digest_interval=60, digest_size=10)
+    a1 = box.enqueue(message(to="a@example.com", html="one"), digest=True)
+    a2 = box.enqueue(message(to="a@example.com", html="two"), digest=True)
+    b1 = box.enqueue(message(to="b@example.com", html="three", pdf=b"%PDF-2"), digest=True)
+    assert box.counts() == {"held": 3}
+    assert box.flush_digest() == []
+
+    clock.now += 60
+    digests = box.flush_digest()
+    assert len(digests) == 2
+    box.process_due()
+    by_to = {m["to"]: m for m in transport.sent}
+    assert set(by_to) == {"a@example.com", "b@example.com"}
+    assert by_to["a@example.com"]["html"] == "one<hr>two"
+    assert by_to["b@example.com"]["html"] == "three"
+    # The same PDF held twice goes out once
+    assert len(by_to["a@example.com"]["attachments"]) == 1
+    assert box.status(a1) == box.status(a2) == box.status(b1) == {"status": "sent", "error": None}
+    assert box._execute("SELECT COUNT(*) FROM attachments")[0][0] == 2
+
+def test_digest_is_due_by_size(tmp_path, clock):
+    box = ManualOutbox(tmp_path / "outbox.db", StubTransport(), digest_interval=3600, digest_size=2)
+    box.enqueue(message(to="a@example.com"), digest=True)
+    box.enqueue(message(to="b@example.com"), digest=True)
+    # Two held messages, but one per recipient: neither digest is full
+    assert box.flush_digest() == []
+    box.enqueue(message(to="a@example.com"), digest=True)
+    assert len(box.flush_digest()) == 1
+    assert box.counts() == {"digested": 2, "held": 1, "queued": 1}
+    assert len(box.flush_digest(force=True)) == 1
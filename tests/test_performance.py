@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from atmosphere import conditions, density_altitude, pressure_altitude
+from engine import aerodromes_performance
+from performance import PerformanceTable
+
+TABLE = {
+    "label": "Takeoff", "unit": "m",
+    "pressure_altitude": [0, 2000],
+    "temperature": [0, 20],
+    "mass": [550, 650],
+    "values": [[[200, 300], [240, 360]], [[260, 390], [300, 450]]],
+}
+
+def test_atmosphere_matches_the_rules_of_thumb():
+    assert pressure_altitude(1000, 1013.25) == 1000
+    assert pressure_altitude(0, 1003.25) == pytest.approx(270)
+    # ISA at 2000 ft is 11 °C: 4 °C above it is 480 ft of density altitude
+    assert density_altitude(2000, 15) == pytest.approx(2480)
+    pa, da = conditions(np.array([0.0, 2000.0]), 1013.25, np.array([15.0, 11.0]))
+    assert pa.tolist() == [0.0, 2000.0] and da.tolist() == pytest.approx([0.0, 2000.0])
+
+def test_interpolation_reproduces_grid_points_and_is_trilinear():
+    table = PerformanceTable("takeoff", TABLE)
+    assert table(2000, 20, 650) == pytest.approx(450)
+    assert table(0, 0, 550) == pytest.approx(200)
+    assert table(1000, 10, 600) == pytest.approx(np.mean(TABLE["values"]))
+    assert table(0, 10, 550) == pytest.approx(220)
+    out = table(np.array([0, 1000, 2000]), 0, 550)
+    assert out.tolist() == pytest.approx([200, 230, 260])
+
+def test_outside_the_table_is_nan_except_light_mass():
+    table = PerformanceTable("takeoff", TABLE)
+    out = table(np.array([2001, 1000, 1000]), np.array([10, -5, 25]), 600)
+    assert np.isnan(out).all()
+    assert np.isnan(table(1000, 10, 700))
+    # Lighter than the table reads the lightest column, lower than it the lowest row
+    assert table(0, 0, 400) == pytest.approx(200)
+    assert table(-300, 0, 550) == pytest.approx(200)
+
+def test_table_shape_is_checked():
+    with pytest.raises(ValueError):
+        PerformanceTable("bad", dict(TABLE, values=[[1, 2], [3, 4]]))
+    with pytest.raises(ValueError):
+        PerformanceTable("bad", dict(TABLE, temperature=[20, 0]))
+
+def test_aerodromes_get_distances_or_none(p2008):
+    ac = dict(p2008, performance={"takeoff": TABLE})
+    out = aerodromes_performance([
+        {"icao": "LPSO", "elev_ft": 0.0, "qnh": 1013.25, "temp": 0.0},
+        {"icao": "HIGH", "elev_ft": 5000.0, "qnh": 1013.25, "temp": 0.0},
+    ], ac, 550.0)
+    assert out[0]["distances"] == [{"label": "Takeoff", "unit": "m", "value": pytest.approx(200)}]
+    assert out[1]["distances"][0]["value"] is None
+
+def test_high_qnh_at_sea_level_reads_the_lowest_row(p2008):
+    ac = dict(p2008, performance={"takeoff": TABLE})
+    (out,) = aerodromes_performance([{"icao": "LPPR", "elev_ft": 0.0, "qnh": 1030.0, "temp": 0.0}], ac, 550.0)
+    assert out["pa_ft"] < 0
+    assert out["distances"][0]["value"] == pytest.approx(200)
@@ -0,0 +1,22 @@
+from engine import Loading, compute_mass_balance
+from render import render_aerodromes, render_results_panel, summary_row
+
+def test_aerodrome_fields_are_escaped():
+    html = render_aerodromes([{
+        "icao": "<script>alert(1)</script>", "elev_ft": 390.0, "qnh": 1013.0, "temp": 15.0,
+        "pa_ft": 390.0, "da_ft": 390.0,
+        "runways": [{"designator": '03"><b>', "tora_m": 1800.0, "lda_m": None}],
+        "distances": [{"label": "Takeoff", "unit": "m&", "value": 300.0}],
+    }])
+    assert "<script>" not in html and "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+    # Escaped exactly once
+    assert 'Runway 03&quot;&gt;&lt;b&gt;' in html and "TORA 1800 m" in html
+    assert "300 m&amp;" in html
+
+def test_labels_and_station_names_are_escaped(p2008):
+    assert "A &amp; B" in summary_row("A & B", "1")
+    ac = dict(p2008, stations=[dict(s, summary_label="<i>Crew</i>") if s["kind"] == "seat" else s for s in p2008["stations"]])
+    loading = Loading(ew=360.0, ew_moment=669.6, payload={"student": 70.0, "instructor": 80.0, "bag1": 10.0})
+    html = render_results_panel(ac, loading, compute_mass_balance(ac, loading))
+    assert "<i>Crew</i>" not in html and "&lt;i&gt;Crew&lt;/i&gt;" in html
+    assert "Pilot &amp; Passenger" in html
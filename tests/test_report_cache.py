@@ -0,0 +1,65 @@
+import os
+
+from engine import Loading, aerodrome_performance
+from report_cache import ReportCache, report_key
+
+def key(p2008, **changes):
+    args = dict(aircraft="Tecnam P2008", registration="CS-ABC", mission_number="1",
+                flight_datetime="2026-10-16 09:00", pilot_name="Pilot",
+                loading=Loading(ew=360.0, ew_moment=669.6, payload={"student": 70.0, "instructor": 80.0}),
+                perf_outputs=[aerodrome_performance("LPSO", 390, 1013.0, 15.0)])
+    args.update(changes)
+    return report_key(p2008, **args)
+
+def test_key_is_stable_and_covers_every_input(p2008):
+    base = key(p2008)
+    assert key(p2008) == base
+    # Float noise below the report's precision does not change the key
+    assert key(p2008, loading=Loading(ew=360.0 + 1e-9, ew_moment=669.6, payload={"instructor": 80.0, "student": 70.0})) == base
+    assert key(p2008, mission_number="2") != base
+    assert key(p2008, loading=Loading(ew=360.0, ew_moment=669.6, payload={"student": 71.0, "instructor": 80.0})) != base
+    assert key(p2008, perf_outputs=[]) != base
+
+def test_lru_evicts_by_bytes():
+    cache = ReportCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"5678")
+    assert cache.get("a") == b"1234"  # a is now the most recent
+    cache.put("c", b"9012")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234" and cache.get("c") == b"9012"
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats() == {"entries": 2, "bytes": 8, "hits": 3, "disk_hits": 0, "misses": 2, "disk_bytes": 0}
+
+def test_disk_entries_survive_a_new_cache(tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"%PDF-report"
+
+    first = ReportCache(disk_dir=tmp_path)
+    assert first.get_or_build("k", build) == b"%PDF-report"
+    assert first.get_or_build("k", build) == b"%PDF-report"
+    second = ReportCache(disk_dir=tmp_path)
+    assert second.get_or_build("k", build) == b"%PDF-report"
+    assert len(builds) == 1
+    assert (first.stats()["hits"], second.stats()["disk_hits"]) == (1, 1)
+    assert [p.name for p in tmp_path.iterdir()] == ["k.pdf"]
+
+def test_disk_tier_prunes_the_oldest_files(tmp_path):
+    cache = ReportCache(disk_dir=tmp_path, max_disk_bytes=10)
+    for n, key in enumerate("abc"):
+        cache.put(key, b"%PDF" + key.encode())
+        os.utime(tmp_path / f"{key}.pdf", ns=(n, n))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.pdf", "c.pdf"]
+    assert cache.stats()["disk_bytes"] == 10
+    # A new cache takes the directory's files oldest first; reading one makes it recent
+    again = ReportCache(disk_dir=tmp_path, max_disk_bytes=10)
+    assert again.get("b") == b"%PDFb"
+    again.put("d", b"%PDFd")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.pdf", "d.pdf"]
+    # A report bigger than the whole cap is not written
+    again.put("huge", b"x" * 11)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.pdf", "d.pdf"]
@@ -0,0 +1,53 @@
+import io
+import re
+import zlib
+
+from engine import Loading, compute_mass_balance
+from report_pack import ReportPack
+
+def page_text(data):
+    """Every content stream of a PDF, inflated and joined."""
+    streams = re.findall(rb"stream\r?\n(.*?)\r?\nendstream", data, re.S)
+    out = []
+    for s in streams:
+        try:
+            out.append(zlib.decompress(s))
+        except zlib.error:
+            out.append(s)
+    return b"\n".join(out)
+
+def test_pack_has_every_mission_and_one_shared_image(tmp_path, p2008):
+    path = tmp_path / "pack.pdf"
+    with ReportPack(path, title="Dispatch pack") as pack:
+        for n in range(4):
+            loading = Loading(ew=350.0, ew_moment=350.0 * 1.85,
+                              payload={"student": 70.0 + n, "instructor": 80.0, "bag1": 10.0})
+            pack.add(p2008, "Tecnam P2008", "CS-ABC", f"M{n}", "2026-10-16 09:00", "Dispatcher",
+                     loading, compute_mass_balance(p2008, loading), [])
+            # Finished pages are already on their way to the file, not kept in memory
+            assert not any(pack.pdf.pages[page] for page in range(1, pack.pages))
+        pages = pack.pages
+    data = path.read_bytes()
+    assert [p.name for p in tmp_path.iterdir()] == ["pack.pdf"]
+    assert data.startswith(b"%PDF-") and data.rstrip().endswith(b"%%EOF")
+    assert pages >= 4
+    assert re.findall(rb"/Count (\d+)", data) == [str(pages).encode()]
+    assert len(re.findall(rb"/Type /Page\b(?!s)", data)) == pages
+    # The loading-graph background is embedded once for all missions
+    assert len(re.findall(rb"/Subtype /Image", data)) == 1
+    text = page_text(data)
+    for n in range(4):
+        assert f"Mission Number: M{n}".encode() in text
+    # The header and limits are drawn once per graphics state they start from
+    # (the first mission starts from fpdf's defaults) and placed on every mission's page
+    assert text.count(b"(MASS & BALANCE REPORT)") == 2
+    assert text.count(b"(Operational Limits:)") == 2
+    assert len(re.findall(rb"/B\d+ Do", text)) >= 2 * 4 + pages
+
+def test_empty_pack_says_so():
+    out = io.BytesIO()
+    with ReportPack(out) as pack:
+        pass
+    data = out.getvalue()
+    assert pack.pages == 1
+    assert b"No missions in this dispatch pack." in page_text(data)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from engine import Loading, compute_mass_balance
+from service import CalculationService, MAX_HEADER
+
+MISSION = {
+    "aircraft": "Tecnam P2008",
+    "registration": "CS-ABC",
+    "mission_number": "7",
+    "ew": 360.0,
+    "ew_moment": 360.0 * 1.86,
+    "payload": {"student": 75.0, "instructor": 85.0, "bag1": 12.0},
+    "fuel_vol": 80.0,
+}
+
+async def _exchange(requests):
+    """(status, content type, body) for each (method, path, body) sent over one keep-alive connection."""
+    service = CalculationService(threads=2)
+    server = await asyncio.start_server(service.connection, "127.0.0.1", 0, limit=MAX_HEADER)
+    port = server.sockets[0].getsockname()[1]
+    answers = []
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for method, path, body in requests:
+            data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status_line, *lines = head.decode("latin-1").split("\r\n")
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines if l)}
+            payload = await reader.readexactly(int(headers["content-length"]))
+            answers.append((int(status_line.split(" ")[1]), headers["content-type"], payload))
+        writer.close()
+        await writer.wait_closed()
+    service.executor.shutdown()
+    return answers
+
+def call(*requests):
+    return asyncio.run(_exchange(requests))
+
+def test_health_single_mission_and_batch(p2008):
+    (health, single, batch) = call(
+        ("GET", "/health", None),
+        ("POST", "/mass-balance", MISSION),
+        ("POST", "/mass-balance", {"missions": [MISSION, dict(MISSION, fuel_vol=None, mission_number="8"), 5]}),
+    )
+    assert health[0] == 200 and "Tecnam P2008" in json.loads(health[2])["aircraft"]
+
+    status, content_type, body = single
+    assert (status, content_type) == (200, "application/json")
+    out = json.loads(body)
+    expected = compute_mass_balance(p2008, Loading(
+        ew=MISSION["ew"], ew_moment=MISSION["ew_moment"], payload=MISSION["payload"], fuel_vol=MISSION["fuel_vol"]))
+    assert out["total_weight"] == pytest.approx(expected.total_weight)
+    assert out["cg"] == pytest.approx(expected.cg)
+    assert out["fuel_vol"] == pytest.approx(expected.fuel_vol)
+    assert out["alerts"] == expected.alert_list
+    assert out["status"] == expected.limit_status
+    assert [i["item"] for i in out["items"]][0] == "Empty Weight"
+
+    results = json.loads(batch[2])["results"]
+    assert batch[0] == 200 and len(results) == 3
+    assert [r.get("mission_number") for r in results[:2]] == ["7", "8"]
+    assert results[0]["total_weight"] == pytest.approx(expected.total_weight)
+    assert results[1]["fuel_limit_by"] in ("Maximum Weight", "Tank Capacity", "CG Envelope")
+    assert "error" in results[2]
+
+def test_report_returns_pdf_bytes():
+    (single, pack) = call(
+        ("POST", "/report", MISSION),
+        ("POST", "/report", {"missions": [MISSION, dict(MISSION, mission_number="8")]}),
+    )
+    for status, content_type, body in (single, pack):
+        assert (status, content_type) == (200, "application/pdf")
+        assert body.startswith(b"%PDF-") and body.rstrip().endswith(b"%%EOF")
+
+@pytest.mark.parametrize("path, body", [
+    ("/aerodromes", {"aerodromes": [5]}),
+    ("/mass-balance", dict(MISSION, aerodromes=["LPSO"])),
+    ("/mass-balance", dict(MISSION, aerodromes=[{"icao": "LPSO", "qnh": "high"}])),
+    ("/aerodromes", {"aerodromes": [{"icao": "ZZZZ"}]}),
+    ("/aerodromes", {"aerodromes": [{"icao": ["LPSO"]}]}),
+    ("/mass-balance", dict(MISSION, payload=[1, 2])),
+    ("/mass-balance", dict(MISSION, ew=1e400)),
+    ("/mass-balance", b'{"aircraft": "Tecnam P2008", "ew": 360, "ew_moment": 670, "student": NaN}'),
+    ("/mass-balance", dict(MISSION, aircraft="Unknown")),
+    ("/report", dict(MISSION, fuel_vol=float("inf"))),
+    ("/mass-balance", b"not json"),
+])
+def test_bad_requests_are_400(path, body):
+    ((status, content_type, payload),) = call(("POST", path, body))
+    assert (status, content_type) == (400, "application/json")
+    assert json.loads(payload)["error"]
+
+def test_aerodrome_objects_are_not_split_on_separators():
+    ((status, _, body),) = call(("POST", "/aerodromes", {"aerodromes": [{"icao": "LPSO;LPBG:x", "elev_ft": 100}]}))
+    assert status == 200
+    (out,) = json.loads(body)["aerodromes"]
+    assert out["icao"] == "LPSO;LPBG:X"
+
+def test_wrong_method_and_path():
+    (get_post, missing) = call(("GET", "/mass-balance", None), ("POST", "/nope", {}))
+    assert get_post[0] == 405
+    assert missing[0] == 404
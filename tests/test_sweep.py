@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from batch import evaluate_batch
+from engine import Loading
+from sweep import SweepCache, axis_values, base_key
+
+LOADING = Loading(ew=360.0, ew_moment=669.6, payload={"student": 70.0, "instructor": 80.0, "bag1": 10.0})
+
+def sweep(cache, ac, loading, xs, ys):
+    key = base_key("Tecnam P2008", loading, "student", "bag1")
+    return cache.evaluate(ac, key, loading, "student", xs, "bag1", ys)
+
+def test_cells_match_evaluate_batch(p2008):
+    xs, ys = axis_values(50, 120, 10), axis_values(0, 20, 5)
+    out = sweep(SweepCache(), p2008, LOADING, xs, ys)
+    assert out["cg"].shape == (len(ys), len(xs)) and out["computed"] == xs.size * ys.size
+    xx, yy = np.meshgrid(xs, ys)
+    direct = evaluate_batch(p2008, 360.0, 669.6, {"student": xx.ravel(), "instructor": 80.0, "bag1": yy.ravel()})
+    assert out["cg"].ravel().tolist() == pytest.approx(direct["cg"].tolist())
+    assert out["alerts"].ravel().tolist() == direct["alerts"].tolist()
+
+def test_cells_are_reused_per_base(p2008):
+    cache = SweepCache()
+    ys = axis_values(0, 20, 5)
+    assert sweep(cache, p2008, LOADING, axis_values(50, 100, 10), ys)["computed"] == 30
+    # Panning: only the new student column is evaluated
+    assert sweep(cache, p2008, LOADING, axis_values(60, 110, 10), ys)["computed"] == 5
+    # Another fixed input is another base; coming back to the first reuses it
+    other = Loading(ew=360.0, ew_moment=669.6, payload={"student": 0.0, "instructor": 90.0, "bag1": 0.0})
+    assert sweep(cache, p2008, other, axis_values(50, 100, 10), ys)["computed"] == 30
+    assert sweep(cache, p2008, LOADING, axis_values(50, 110, 10), ys)["computed"] == 0
+    # The swept keys' own values are not part of the base
+    moved = Loading(ew=360.0, ew_moment=669.6, payload={"student": 99.0, "instructor": 80.0, "bag1": 3.0})
+    assert sweep(cache, p2008, moved, axis_values(50, 110, 10), ys)["computed"] == 0
+    assert cache.stats() == {"bases": 2, "cells": 65, "hits": 25 + 35 + 35, "misses": 65}
+
+def test_eviction_drops_least_recently_used_cells(p2008):
+    cache = SweepCache(max_cells=40)
+    xs, ys = axis_values(50, 100, 10), axis_values(0, 20, 5)
+    sweep(cache, p2008, LOADING, xs, ys)
+    other = Loading(ew=360.0, ew_moment=669.6, payload={"instructor": 90.0})
+    sweep(cache, p2008, other, xs, ys)
+    # The older base gives up 20 of its 30 cells
+    assert cache.stats()["bases"] == 2 and len(cache) == 40
+    assert sweep(cache, p2008, other, xs, ys)["computed"] == 0
+    assert sweep(cache, p2008, LOADING, xs, ys)["computed"] == 20
+
+def test_panning_one_base_stays_within_max_cells(p2008):
+    cache = SweepCache(max_cells=40)
+    ys = axis_values(0, 20, 5)
+    for start in range(0, 200, 10):
+        sweep(cache, p2008, LOADING, axis_values(start, start + 50, 10), ys)
+        assert len(cache) <= 40
+    assert cache.stats()["bases"] == 1
+    # The latest window's cells are the ones kept
+    assert sweep(cache, p2008, LOADING, axis_values(190, 240, 10), ys)["computed"] == 0
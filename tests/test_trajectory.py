@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from engine import Loading, compute_mass_balance
+from trajectory import fuel_trajectory
+
+LOADING = Loading(ew=360.0, ew_moment=669.6, payload={"student": 80.0, "instructor": 90.0, "bag1": 5.0}, fuel_vol=100.0)
+
+def test_reserve_ends_the_trajectory_early(p2008):
+    result = compute_mass_balance(p2008, LOADING)
+    traj = fuel_trajectory(p2008, LOADING, result, burn_rate=20.0, flight_time=6.0, reserve_vol=20.0)
+    assert traj.reached_reserve and traj.end_time == pytest.approx(4.0)
+    assert traj.fuel_vol[-1] == pytest.approx(20.0)
+    assert traj.total_weight[0] == pytest.approx(result.total_weight)
+    assert traj.total_weight[-1] == pytest.approx(result.total_weight - 80.0 * p2008["fuel_density"])
+
+    short = fuel_trajectory(p2008, LOADING, result, burn_rate=20.0, flight_time=1.5, reserve_vol=20.0)
+    assert not short.reached_reserve and short.end_time == pytest.approx(1.5)
+
+def test_outside_from_is_the_first_sample_past_the_limit(p2008):
+    result = compute_mass_balance(p2008, LOADING)
+    assert result.cg > p2008["cg_limits"][0]
+    # Fuel sits aft of the CG, so burning it moves the CG forward
+    inside = fuel_trajectory(p2008, LOADING, result, burn_rate=20.0, flight_time=3.0)
+    assert inside.outside_from is None and np.all(np.diff(inside.cg) < 0)
+
+    ac = dict(p2008, cg_limits=(float(inside.cg[30]), p2008["cg_limits"][1]))
+    traj = fuel_trajectory(ac, LOADING, compute_mass_balance(ac, LOADING), burn_rate=20.0, flight_time=3.0)
+    assert traj.outside_from == pytest.approx(float(traj.time_h[31]))
+    assert traj.inside[:31].all() and not traj.inside[31:].any()
+    assert traj.fwd_limit.tolist() == pytest.approx([ac["cg_limits"][0]] * len(traj.time_h))
@@ -0,0 +1,40 @@
+import pytest
+
+from engine import Loading
+from trip import TripPlanner, trip_alerts
+
+LOADING = Loading(ew=360.0, ew_moment=669.6, payload={"student": 70.0, "instructor": 80.0, "bag1": 10.0}, fuel_vol=100.0)
+
+def stops(qnh=1013.0, burn=(20.0, 30.0)):
+    return [
+        {"icao": "LPSO", "elev_ft": 390.0, "qnh": 1013.0, "temp": 15.0},
+        {"icao": "LPEV", "elev_ft": 807.0, "qnh": qnh, "temp": 15.0, "burn_vol": burn[0]},
+        {"icao": "LPCS", "elev_ft": 326.0, "qnh": 1013.0, "temp": 15.0, "burn_vol": burn[1]},
+    ]
+
+def test_only_dependent_nodes_recompute(p2008):
+    planner = TripPlanner(p2008)
+    first = planner.update(LOADING, stops())
+    assert len(planner.recomputed) == 9
+    assert first[1]["arrival"].fuel_vol == pytest.approx(80.0)
+    assert first[2]["arrival"].fuel_vol == pytest.approx(50.0)
+    assert first[0]["arrival"] is None and first[2]["departure"] is None
+
+    planner.update(LOADING, stops())
+    assert planner.recomputed == []
+    # A stop's QNH only touches that stop's atmosphere and distances
+    planner.update(LOADING, stops(qnh=1000.0))
+    assert planner.recomputed == ["atmosphere:1", "distances:1"]
+    # A leg burn redoes that landing and everything after it
+    out = planner.update(LOADING, stops(qnh=1000.0, burn=(25.0, 30.0)))
+    assert planner.recomputed == ["landing:1", "distances:1", "landing:2", "distances:2"]
+    assert out[2]["arrival"].fuel_vol == pytest.approx(45.0)
+    # The loading redoes the mass chain but not the atmosphere
+    planner.update(Loading(**dict(vars(LOADING), fuel_vol=90.0)), stops(qnh=1000.0, burn=(25.0, 30.0)))
+    assert not any(name.startswith("atmosphere") for name in planner.recomputed)
+    assert "takeoff:0" in planner.recomputed and "landing:2" in planner.recomputed
+
+def test_fuel_shortage_is_flagged(p2008):
+    out = TripPlanner(p2008).update(LOADING, stops(burn=(60.0, 60.0)))
+    assert out[2]["arrival"].fuel_short and out[2]["arrival"].fuel_vol == 0.0
+    assert trip_alerts(out) == ["Not enough fuel for the leg to LPCS."]
@@ -0,0 +1,42 @@
+"""Process-wide rerun timings per page section.
+
+Wrap a section in `with timed("name"):`; every (fragment) rerun of that
+section is recorded. Set MB_TIMINGS=1 to also print each timing, and use
+timing_report() to compare full-page reruns against fragment reruns.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_stats = {}
+
+@contextmanager
+def timed(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(section, time.perf_counter() - start)
+
+def record(section, seconds):
+    with _lock:
+        s = _stats.setdefault(section, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        s["count"] += 1
+        s["total"] += seconds
+        s["last"] = seconds
+        s["max"] = max(s["max"], seconds)
+    if os.environ.get("MB_TIMINGS"):
+        print(f"[timing] {section}: {seconds * 1000:.1f} ms")
+
+def timing_report():
+    with _lock:
+        return {
+            name: dict(s, mean=s["total"] / s["count"] if s["count"] else 0.0)
+            for name, s in _stats.items()
+        }
+
+def reset_timings():
+    with _lock:
+        _stats.clear()
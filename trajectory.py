@@ -0,0 +1,72 @@
+"""Weight and CG from takeoff to landing as fuel burns off.
+
+Fuel leaves every tank in proportion to its capacity (the same split as
+loading), so burning it moves the loading along a straight line in
+weight/moment space. The trajectory samples that line from the takeoff
+result until the flight time ends or the fuel reaches the reserve,
+whichever comes first.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from envelope import get_envelope
+from stations import station_table
+
+@dataclass
+class Trajectory:
+    burn_rate: float
+    flight_time: float
+    reserve_vol: float
+    time_h: np.ndarray
+    fuel_vol: np.ndarray
+    total_weight: np.ndarray
+    cg: np.ndarray
+    fwd_limit: np.ndarray = None
+    aft_limit: np.ndarray = None
+    inside: np.ndarray = None
+
+    @property
+    def end_time(self):
+        return float(self.time_h[-1])
+
+    @property
+    def reached_reserve(self):
+        """True when the fuel hits the reserve before the planned flight time."""
+        return self.end_time < self.flight_time
+
+    @property
+    def outside_from(self):
+        """First sampled time (h) with the CG outside the envelope, or None."""
+        if self.inside is None or self.inside.all():
+            return None
+        return float(self.time_h[np.argmin(self.inside)])
+
+    def rows(self, count=7):
+        """(time, fuel, weight, cg) at count evenly spaced samples, for tables."""
+        idx = np.unique(np.linspace(0, len(self.time_h) - 1, count).round().astype(int))
+        return list(zip(self.time_h[idx].tolist(), self.fuel_vol[idx].tolist(),
+                        self.total_weight[idx].tolist(), self.cg[idx].tolist()))
+
+def fuel_trajectory(ac, loading, result, burn_rate, flight_time, reserve_vol=0.0, samples=61):
+    """Sample weight and CG from takeoff (result) as fuel burns at burn_rate L/h."""
+    table = station_table(ac)
+    density = ac['fuel_density']
+    usable_vol = max(0.0, result.fuel_vol - reserve_vol)
+    end_time = min(flight_time, usable_vol / burn_rate) if burn_rate > 0 else flight_time
+    time_h = np.linspace(0.0, max(0.0, end_time), samples)
+    burned = time_h * burn_rate * density
+    total_weight = result.total_weight - burned
+    total_moment = result.total_moment - burned * table.fuel_arm
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cg = np.where(total_weight > 0, total_moment / total_weight, 0.0)
+    traj = Trajectory(
+        burn_rate=burn_rate, flight_time=flight_time, reserve_vol=reserve_vol,
+        time_h=time_h, fuel_vol=result.fuel_vol - burned / density,
+        total_weight=total_weight, cg=cg,
+    )
+    env = get_envelope(ac, loading.category)
+    if env is not None:
+        traj.fwd_limit, traj.aft_limit = env.cg_limits(total_weight)
+        traj.inside = env.contains(cg, total_weight)
+    return traj
@@ -0,0 +1,159 @@
+"""Multi-leg trips: departure, stops and destination with fuel burn per leg.
+
+Every takeoff and landing result is a node in a small dependency graph:
+
+    loading -> takeoff 0 -> landing 1 -> landing 2 -> ...    (mass & fuel)
+    burn i  -> landing i                                      (leg i-1 -> i)
+    aerodrome i -> atmosphere i -> distances at stop i        (performance)
+
+A node keeps the versions of the inputs and nodes it was computed from. It
+is recomputed only when one of those changed. Changing one stop's QNH redoes
+that stop's PA/DA and distances, and changing one leg's burn redoes that
+landing and the ones after it. Everything else is reused. There is no
+refuelling at the stops: an aircraft takes off again with the fuel it
+landed with.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from atmosphere import conditions
+from engine import compute_mass_balance
+from limits import limit_rules
+from performance import performance_tables
+from stations import station_table
+
+@dataclass
+class MassState:
+    fuel_vol: float
+    total_weight: float
+    total_moment: float
+    cg: float
+    cg_status: str = "ok"
+    fuel_short: bool = False
+
+class TripPlanner:
+    """Incremental trip results for one aircraft type; keep one per session."""
+
+    def __init__(self, ac):
+        self.ac = ac
+        self._inputs = {}     # name -> (value, version)
+        self._nodes = {}      # name -> (value, version, dependency versions)
+        self.recomputed = []  # nodes computed by the last update(), in order
+
+    def _set(self, name, value):
+        old = self._inputs.get(name)
+        if old is None or old[0] != value:
+            self._inputs[name] = (value, (old[1] + 1) if old else 1)
+
+    def _version(self, name):
+        entry = self._inputs.get(name) or self._nodes.get(name)
+        return entry[1] if entry else 0
+
+    def _value(self, name):
+        entry = self._inputs.get(name) or self._nodes.get(name)
+        return entry[0]
+
+    def _node(self, name, deps, compute):
+        seen = tuple(self._version(d) for d in deps)
+        node = self._nodes.get(name)
+        if node is None or node[2] != seen:
+            value = compute(*(self._value(d) for d in deps))
+            self._nodes[name] = (value, (node[1] + 1) if node else 1, seen)
+            self.recomputed.append(name)
+        return self._nodes[name][0]
+
+    def update(self, loading, aerodromes):
+        """Results per stop for the current loading and aerodromes.
+
+        aerodromes are the page's dicts (icao, elev_ft, qnh, temp, and
+        burn_vol for the leg into each stop after the first). Returns one dict
+        per stop with "arrival" and "departure" MassStates (None where it does
+        not apply), "pa_ft", "da_ft" and "distances".
+        """
+        self.recomputed = []
+        self._set("loading", loading)
+        for i, a in enumerate(aerodromes):
+            self._set(f"aerodrome:{i}", (float(a["elev_ft"]), float(a["qnh"]), float(a["temp"])))
+            if i:
+                self._set(f"burn:{i}", float(a.get("burn_vol") or 0.0))
+        # Forget stops that were removed so a re-added one starts fresh
+        for name in [n for n in list(self._inputs) + list(self._nodes) if ":" in n and int(n.rsplit(":", 1)[1]) >= len(aerodromes)]:
+            self._inputs.pop(name, None)
+            self._nodes.pop(name, None)
+
+        self._node("takeoff:0", ["loading"], self._takeoff)
+        stops = []
+        last = len(aerodromes) - 1
+        for i, a in enumerate(aerodromes):
+            # Mass state on the ground at stop i: takeoff 0 at departure, then each landing
+            state = "takeoff:0" if i == 0 else f"landing:{i}"
+            if i:
+                previous = "takeoff:0" if i == 1 else f"landing:{i - 1}"
+                self._node(state, [previous, f"burn:{i}"], self._landing)
+            self._set(f"role:{i}", (i > 0, i < last))
+            pa_da = self._node(f"atmosphere:{i}", [f"aerodrome:{i}"], self._atmosphere)
+            distances = self._node(f"distances:{i}", [f"role:{i}", f"aerodrome:{i}", f"atmosphere:{i}", state], self._distances)
+            ground = self._value(state)
+            stops.append({
+                "icao": a["icao"],
+                "arrival": ground if i else None,
+                "departure": ground if i < last else None,
+                "burn_vol": float(a.get("burn_vol") or 0.0) if i else None,
+                "pa_ft": pa_da[0],
+                "da_ft": pa_da[1],
+                "distances": distances,
+            })
+        return stops
+
+    # --- node computations ---
+
+    def _state(self, fuel_vol, total_weight, total_moment, fuel_short=False):
+        cg = total_moment / total_weight if total_weight > 0 else 0.0
+        status = limit_rules(self.ac).check("cg", cg, total_weight, self._value("loading").category)
+        return MassState(fuel_vol, total_weight, total_moment, cg, status, fuel_short)
+
+    def _takeoff(self, loading):
+        result = compute_mass_balance(self.ac, loading)
+        return self._state(result.fuel_vol, result.total_weight, result.total_moment)
+
+    def _landing(self, previous, burn_vol):
+        # More burn than fuel on board: land with empty tanks and flag it
+        fuel_short = previous.fuel_short or burn_vol > previous.fuel_vol
+        burn_vol = min(burn_vol, previous.fuel_vol)
+        burned = burn_vol * self.ac["fuel_density"]
+        return self._state(
+            previous.fuel_vol - burn_vol,
+            previous.total_weight - burned,
+            previous.total_moment - burned * station_table(self.ac).fuel_arm,
+            fuel_short,
+        )
+
+    def _atmosphere(self, aerodrome):
+        elev_ft, qnh, temp = aerodrome
+        pa_ft, da_ft = conditions(elev_ft, qnh, temp)
+        return float(pa_ft), float(da_ft)
+
+    def _distances(self, role, aerodrome, pa_da, state):
+        """{"takeoff"/"landing": {label, unit, value}} from the POH tables of those names."""
+        tables = performance_tables(self.ac)
+        arrives, departs = role
+        out = {}
+        for kind, applies in (("takeoff", departs), ("landing", arrives)):
+            if not applies or kind not in tables:
+                continue
+            value = tables[kind](pa_da[0], aerodrome[2], state.total_weight)
+            out[kind] = {"label": tables[kind].label, "unit": tables[kind].unit,
+                         "value": None if np.isnan(value) else float(value)}
+        return out
+
+def trip_alerts(stops):
+    """Alert texts for the stops returned by TripPlanner.update()."""
+    alerts = []
+    for s in stops:
+        for state in (s["arrival"], s["departure"]):
+            if state is not None and state.cg_status == "bad":
+                alerts.append(f"CG outside the envelope at {s['icao'] or 'stop'}.")
+        if s["arrival"] is not None and s["arrival"].fuel_short:
+            alerts.append(f"Not enough fuel for the leg to {s['icao'] or 'stop'}.")
+    return list(dict.fromkeys(alerts))